@@ -8,9 +8,25 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
 import os
+import re
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from store.sse import store_events  # noqa: E402  (needs the app registry)
+
+STORE_EVENTS_PATH = re.compile(r'^/api/stores/(?P<store_id>\d+)/events/$')
+
+
+async def application(scope, receive, send):
+    """Serve store event streams directly and everything else through Django"""
+    if scope['type'] == 'http':
+        match = STORE_EVENTS_PATH.match(scope['path'])
+        if match:
+            return await store_events(
+                scope, receive, send, int(match.group('store_id'))
+            )
+    return await django_application(scope, receive, send)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -32,7 +34,9 @@ CORS_ORIGIN_ALLOW_ALL = True
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Admin modules are discovered by the URLconf (see app/urls.py), so
+    # management commands and other processes without URLs skip them.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -46,6 +50,12 @@ INSTALLED_APPS = [
     'store',
     'product',
     'transaction',
+    'change',
+    'stockcount',
+    'reservation',
+    'category',
+    'purchasing',
+    'audit',
 ]
 
 MIDDLEWARE = [
@@ -57,6 +67,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.PinPrimaryAfterWriteMiddleware',
+    'core.middleware.AuditActorMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -98,6 +110,64 @@ DATABASES = {
     }
 }
 
+# Read replicas, as a comma separated list of hosts serving the same database.
+# Safe reads of views using core.mixins.ReplicaReadMixin are sent to them, except
+# for users who wrote within the last REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+# Default cache. Set CACHE_LOCATION to a memcached "host:port" (comma separated
+# for several servers) to share it between worker processes. Without it each
+# process has its own local-memory cache, so what must act across workers
+# (the replica pin, the versioned caches and the API throttles below) is
+# refused or off by default.
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_LOCATION.split(','),
+    } if CACHE_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# A pin kept in one worker's cache is missed by the others, which would then
+# serve the user's next read from a replica that may not have the write yet.
+if DATABASE_REPLICAS and not CACHE_LOCATION:
+    raise ImproperlyConfigured('DB_REPLICA_HOSTS needs CACHE_LOCATION for the read-your-writes pin')
+
+# Store availability answers are cached per stock version (see store.availability).
+# Writes in one worker only invalidate answers cached by the others through a
+# shared cache, so the default is 0 (not cached) without CACHE_LOCATION.
+AVAILABILITY_CACHE_SECONDS = int(os.environ.get('AVAILABILITY_CACHE_SECONDS', 300 if CACHE_LOCATION else 0))
+
+# Barcode lookups are cached per catalog version (see product.lookup), and
+# likewise not cached by default without CACHE_LOCATION.
+BARCODE_CACHE_SECONDS = int(os.environ.get('BARCODE_CACHE_SECONDS', 3600 if CACHE_LOCATION else 0))
+
+# How long a price quote (GET /api/products/<id>/quote/) stays valid. A transaction
+# carrying one is priced when it was issued, so a price change does not break
+# transactions quoted just before it.
+PRICE_QUOTE_SECONDS = int(os.environ.get('PRICE_QUOTE_SECONDS', 900))
+
+# Audit records are written by a background thread once their change commits,
+# off the request path (see core.audit). Set AUDIT_WRITE_BEHIND=0 to write them
+# in the committing thread instead.
+AUDIT_WRITE_BEHIND = os.environ.get('AUDIT_WRITE_BEHIND', '1') == '1'
+
+# How long each process reuses its last /readyz database and migration check.
+READINESS_CACHE_SECONDS = float(os.environ.get('READINESS_CACHE_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -137,3 +207,38 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 AUTH_USER_MODEL = 'core.User'
+
+
+# Store event streams
+# 'local' fans events out inside this process, 'postgres' uses LISTEN/NOTIFY
+# so subscribers connected to any worker receive them.
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+# Set FAST_JSON_RENDERER=1 to render JSON with orjson when it is installed.
+FAST_JSON_RENDERER = os.environ.get('FAST_JSON_RENDERER') == '1'
+
+# Requests allowed per user (or anonymous IP), with separate buckets for
+# reads and writes, as "number/period" (period: sec, min, hour or day). The
+# buckets live in the default cache, so without a shared CACHE_LOCATION every
+# worker would grant the full rate: the throttles are off by default then, and
+# setting a rate without CACHE_LOCATION is refused.
+THROTTLE_READ_RATE = os.environ.get('THROTTLE_READ_RATE', '1200/min' if CACHE_LOCATION else None)
+THROTTLE_WRITE_RATE = os.environ.get('THROTTLE_WRITE_RATE', '300/min' if CACHE_LOCATION else None)
+if (THROTTLE_READ_RATE or THROTTLE_WRITE_RATE) and not CACHE_LOCATION:
+    raise ImproperlyConfigured('THROTTLE_READ_RATE and THROTTLE_WRITE_RATE need CACHE_LOCATION')
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer' if FAST_JSON_RENDERER else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': THROTTLE_READ_RATE,
+        'write': THROTTLE_WRITE_RATE,
+    },
+}
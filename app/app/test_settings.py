@@ -0,0 +1,34 @@
+"""Settings for running the test suite
+
+Used by `manage.py test` unless DJANGO_SETTINGS_MODULE is set. Passwords
+are hashed with MD5, which is insecure but hundreds of times faster than
+the production hasher, and set TEST_DATABASE=sqlite to run against an
+in-memory SQLite database instead of Postgres. Postgres-only tests are
+skipped there.
+"""
+from app.settings import *  # noqa: F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+if os.environ.get('TEST_DATABASE') == 'sqlite':  # noqa: F405
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        },
+    }
+    DATABASE_REPLICAS = []
+
+# Tests run in one process, so the local-memory cache acts as a shared one
+AVAILABILITY_CACHE_SECONDS = 300
+BARCODE_CACHE_SECONDS = 3600
+
+# Audit records are written in the test's transaction and roll back with it
+AUDIT_WRITE_BEHIND = False
+
+# Buckets outlive the per-test rollback; throttling is left to its own tests
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}  # noqa: F405
+
+TEST_RUNNER = 'core.test_runner.TimedTestRunner'
+# Number of slowest tests listed after a run (override with --slowest).
+TEST_SLOWEST = int(os.environ.get('TEST_SLOWEST', 10))  # noqa: F405
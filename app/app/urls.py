@@ -16,11 +16,23 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core import health
+
+admin.autodiscover()
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('healthz', health.healthz),
+    path('readyz', health.readyz),
     path('api/user/', include('user.urls')),
     path('api/stores/', include('store.urls')),
     path('api/products/', include('product.urls')),
     path('api/transactions/', include('transaction.urls')),
+    path('api/changes/', include('change.urls')),
+    path('api/counts/', include('stockcount.urls')),
+    path('api/reservations/', include('reservation.urls')),
+    path('api/categories/', include('category.urls')),
+    path('api/purchase-orders/', include('purchasing.urls')),
+    path('api/audit/', include('audit.urls')),
 
 ]
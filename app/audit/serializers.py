@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+from core.models import AuditRecord
+from core.serializers import ValuesSerializer
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    """Validates the object and time window of an audit trail query
+
+    Stock records are looked up by store and product, price records by
+    product and cash records by store.
+    """
+    kind = serializers.ChoiceField(
+        choices=(AuditRecord.STOCK, AuditRecord.PRICE, AuditRecord.CASH)
+    )
+    store = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False)
+    since = serializers.DateTimeField(required=False)
+    before = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        kind = attrs['kind']
+        if kind != AuditRecord.PRICE and 'store' not in attrs:
+            raise serializers.ValidationError(
+                {'store': f'This parameter is required for {kind} records.'}
+            )
+        if kind != AuditRecord.CASH and 'product' not in attrs:
+            raise serializers.ValidationError(
+                {'product': f'This parameter is required for {kind} records.'}
+            )
+        return attrs
+
+
+class AuditRecordValuesSerializer(ValuesSerializer):
+    """Serializes AuditRecords"""
+    model = AuditRecord
+    fields = (
+        'id',
+        'kind',
+        'store_id',
+        'product_id',
+        'old_value',
+        'new_value',
+        'actor_id',
+        'created_at',
+    )
@@ -0,0 +1,265 @@
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import audit
+from core.models import AuditRecord, Change, ProductPrice, StoreProduct
+from core.tests import factories
+
+AUDIT_URL = reverse('audit:audit-list')
+TRANSACTION_URL = reverse('transaction:transaction-list')
+TRANSFER_URL = reverse('transaction:transaction-transfer')
+
+
+def product_url(product_id):
+    return reverse('product:product-detail', args=[product_id])
+
+
+def store_url(store_id):
+    return reverse('store:store-detail', args=[store_id])
+
+
+class AuditTrailTests(TestCase):
+    """Test the audit trail of stock, price and cash changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_user('Admin', is_staff=True)
+        cls.supplier = factories.create_user('Supplier')
+        cls.store_a = factories.create_store(name='Store#A', cash='1000.00')
+        cls.store_b = factories.create_store(name='Store#B', cash='1000.00')
+        cls.product = factories.create_product(
+            cls.supplier, name='Laptop', price='10.00'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post_transaction(self, trx_type, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(TRANSACTION_URL, {
+                'trx_type': trx_type,
+                'store': self.store_a.id,
+                'created_by': self.admin.id,
+                'party': self.supplier.id,
+                'product_id': self.product.id,
+                'amount': str(10 * quantity),
+                'quantity': quantity,
+            })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def trail(self, **params):
+        res = self.client.get(AUDIT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def stock_trail(self, store):
+        records = self.trail(
+            kind='stock', store=store.id, product=self.product.id
+        )['records']
+        return [
+            (Decimal(record['old_value']), Decimal(record['new_value']))
+            for record in records
+        ]
+
+    def test_transactions_are_audited_with_their_actor(self):
+        self.post_transaction('IN', 5)
+        self.post_transaction('OUT', 2)
+
+        records = self.trail(
+            kind='stock', store=self.store_a.id, product=self.product.id
+        )['records']
+
+        self.assertEqual(self.stock_trail(self.store_a), [(5, 3), (0, 5)])
+        self.assertEqual(
+            {record['actor_id'] for record in records}, {self.admin.id}
+        )
+
+    def test_records_are_written_at_commit_in_one_query(self):
+        StoreProduct.objects.create(
+            store_id=self.store_a, product_id=self.product, quantity=10
+        )
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(TRANSFER_URL, {
+                'created_by': self.admin.id,
+                'from_store': self.store_a.id,
+                'to_store': self.store_b.id,
+                'lines': [{'product_id': self.product.id, 'quantity': 4}],
+            }, format='json')
+        self.assertFalse(AuditRecord.objects.exists())
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                if isinstance(callback, audit.Buffer):
+                    callback()
+
+        self.assertEqual(self.stock_trail(self.store_a), [(10, 6)])
+        self.assertEqual(self.stock_trail(self.store_b), [(0, 4)])
+
+    def test_rolled_back_savepoint_drops_its_records(self):
+        store_product = StoreProduct(
+            store_id=self.store_a, product_id=self.product, quantity=7
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                audit.record([audit.stock_change(store_product, 1)])
+                try:
+                    with transaction.atomic():
+                        audit.record([audit.stock_change(store_product, 2)])
+                        raise ValueError
+                except ValueError:
+                    pass
+                audit.record([audit.stock_change(store_product, 3)])
+
+        self.assertEqual(
+            sorted(AuditRecord.objects.values_list('old_value', flat=True)),
+            [1, 3],
+        )
+
+    def test_price_and_cash_changes_are_audited(self):
+        self.client.force_authenticate(self.supplier)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(product_url(self.product.id), {'price': '12.50'})
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(store_url(self.store_a.id), {'cash': '900.00'})
+
+        price = self.trail(kind='price', product=self.product.id)['records']
+        cash = self.trail(kind='cash', store=self.store_a.id)['records']
+
+        self.assertEqual(
+            [(r['old_value'], r['new_value'], r['actor_id']) for r in price],
+            [('10.0000', '12.5000', self.supplier.id)],
+        )
+        self.assertEqual(
+            [(r['old_value'], r['new_value']) for r in cash],
+            [('1000.0000', '900.0000')],
+        )
+
+    def test_admin_price_and_cash_edits_are_audited(self):
+        superuser = factories.create_superuser()
+        client = Client()
+        client.force_login(superuser)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                reverse('admin:core_product_change', args=[self.product.id]),
+                {
+                    'supplier_id': self.supplier.id,
+                    'name': 'Laptop',
+                    'price': '11.00',
+                    'image': '',
+                },
+            )
+            client.post(
+                reverse('admin:core_store_change', args=[self.store_a.id]),
+                {
+                    'name': 'Store#A',
+                    'city': 'Cairo',
+                    'cash': '800.00',
+                },
+            )
+
+        price = self.trail(kind='price', product=self.product.id)['records']
+        cash = self.trail(kind='cash', store=self.store_a.id)['records']
+
+        self.assertEqual(
+            [(r['old_value'], r['new_value'], r['actor_id']) for r in price],
+            [('10.0000', '11.0000', superuser.id)],
+        )
+        self.assertEqual(
+            [(r['old_value'], r['new_value'], r['actor_id']) for r in cash],
+            [('1000.0000', '800.0000', superuser.id)],
+        )
+        self.assertEqual(
+            ProductPrice.objects.filter(product=self.product)
+            .latest('effective_from')
+            .price,
+            Decimal('11.00'),
+        )
+        self.assertTrue(
+            Change.objects.filter(
+                kind=Change.PRODUCT,
+                product_id=self.product.id,
+                price=Decimal('11.00'),
+            ).exists()
+        )
+
+    def test_writer_batches_records_by_database(self):
+        writer = audit.Writer()
+        records = [
+            audit.cash_change(self.store_a, 1),
+            audit.cash_change(self.store_b, 2),
+        ]
+        with patch('core.audit.write', return_value=True) as write:
+            writer.start()
+            writer.submit('default', records[:1])
+            writer.submit('default', records[1:])
+            self.assertTrue(writer.flush(5))
+
+        write.assert_called_once_with('default', records)
+
+    def test_trail_pages_back_in_time(self):
+        for _ in range(5):
+            self.post_transaction('IN', 1)
+
+        first = self.trail(
+            kind='stock',
+            store=self.store_a.id,
+            product=self.product.id,
+            limit=3,
+        )
+        rest = self.trail(
+            kind='stock',
+            store=self.store_a.id,
+            product=self.product.id,
+            before=first['next'],
+        )
+
+        values = [
+            record['new_value']
+            for record in first['records'] + rest['records']
+        ]
+        self.assertEqual(
+            values, ['5.0000', '4.0000', '3.0000', '2.0000', '1.0000']
+        )
+        self.assertIsNone(rest['next'])
+
+    def test_trail_needs_the_object(self):
+        res = self.client.get(
+            AUDIT_URL, {'kind': 'stock', 'store': self.store_a.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trail_is_admin_only(self):
+        self.client.force_authenticate(self.supplier)
+        res = self.client.get(
+            AUDIT_URL, {'kind': 'cash', 'store': self.store_a.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @skipUnless(
+        connection.vendor == 'postgresql',
+        'The append-only trigger is Postgres only',
+    )
+    def test_records_are_append_only(self):
+        record = AuditRecord.objects.create(
+            kind=AuditRecord.CASH, store_id=self.store_a.id, new_value=1
+        )
+
+        for change in (
+            lambda: AuditRecord.objects.filter(pk=record.pk).update(
+                new_value=2
+            ),
+            record.delete,
+        ):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                change()
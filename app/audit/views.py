@@ -0,0 +1,56 @@
+from django.db.models import Q
+from rest_framework import generics
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.models import AuditRecord
+
+from audit import serializers
+
+MAX_LIMIT = 1000
+
+
+class AuditTrailView(generics.GenericAPIView):
+    """List the audit records of a stock row, price or cash, newest first
+
+    Clients page back in time by passing `next` as `before`.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+    queryset = AuditRecord.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        query = serializers.AuditQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        limit = min(params.get('limit', MAX_LIMIT), MAX_LIMIT)
+
+        # Match all columns of audit_object_idx, keeping the scan to the object
+        queryset = self.get_queryset().filter(
+            kind=params['kind'],
+            store_id=params.get('store'),
+            product_id=params.get('product'),
+        )
+        if 'since' in params:
+            queryset = queryset.filter(created_at__gte=params['since'])
+        if 'before' in params:
+            last = (
+                queryset.filter(pk=params['before'])
+                .values_list('created_at', flat=True)
+                .first()
+            )
+            if last is None:
+                return Response({'records': [], 'next': None})
+            queryset = queryset.filter(
+                Q(created_at__lt=last)
+                | Q(created_at=last, pk__lt=params['before'])
+            )
+
+        records = serializers.AuditRecordValuesSerializer(
+            queryset.order_by('-created_at', '-pk')[:limit]
+        ).data
+        return Response({
+            'records': records,
+            'next': records[-1]['id'] if len(records) == limit else None,
+        })
@@ -0,0 +1,63 @@
+from rest_framework import serializers
+
+from core.models import Category, Store
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    """Serializes Category objects, moving the subtree when the parent changes
+    """
+
+    class Meta:
+        model = Category
+        fields = ('id', 'name', 'parent', 'path', 'depth')
+        read_only_fields = ('id', 'path', 'depth')
+
+    def create(self, validated_data):
+        return Category.objects.add(
+            validated_data['name'], validated_data.get('parent')
+        )
+
+    def update(self, instance, validated_data):
+        if (
+            'parent' in validated_data
+            and validated_data['parent'] != instance.parent
+        ):
+            try:
+                instance = Category.objects.move(
+                    instance, validated_data['parent']
+                )
+            except ValueError as error:
+                raise serializers.ValidationError({'parent': str(error)})
+        if 'name' in validated_data:
+            instance.name = validated_data['name']
+            instance.save(update_fields=['name'])
+        return instance
+
+
+class CategoryQuerySerializer(serializers.Serializer):
+    """Validates the ?store= and ?since= filters of the subtree reports"""
+    store = serializers.PrimaryKeyRelatedField(
+        queryset=Store.objects.all(), required=False
+    )
+    since = serializers.DateTimeField(required=False)
+
+
+class CategoryRollupSerializer(serializers.ModelSerializer):
+    """Serializes a category with the stock and sales of its subtree"""
+    stock_units = serializers.IntegerField()
+    stock_value = serializers.DecimalField(max_digits=16, decimal_places=4)
+    sales_units = serializers.IntegerField()
+
+    class Meta:
+        model = Category
+        fields = (
+            'id',
+            'name',
+            'parent',
+            'path',
+            'depth',
+            'stock_units',
+            'stock_value',
+            'sales_units',
+        )
+        read_only_fields = fields
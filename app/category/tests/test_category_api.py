@@ -0,0 +1,207 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Category, StoreProduct, Transaction, TransactionProduct
+from core.tests import factories
+
+CATEGORIES_URL = reverse('category:category-list')
+
+
+def detail_url(category_id):
+    return reverse('category:category-detail', args=[category_id])
+
+
+def products_url(category_id):
+    return reverse('category:category-products', args=[category_id])
+
+
+def rollup_url(category_id):
+    return reverse('category:category-rollup', args=[category_id])
+
+
+class CategoryApiTest(TestCase):
+    """Test the category tree API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_superuser()
+        cls.store = factories.create_store()
+        cls.other_store = factories.create_store(name='Store#2')
+        cls.food = Category.objects.add('Food')
+        cls.drinks = Category.objects.add('Drinks', cls.food)
+        cls.juice = Category.objects.add('Juice', cls.drinks)
+        cls.tools = Category.objects.add('Tools')
+        cls.bread = factories.create_product(
+            cls.admin, name='Bread', category=cls.food
+        )
+        cls.cola = factories.create_product(
+            cls.admin, name='Cola', category=cls.drinks
+        )
+        cls.orange = factories.create_product(
+            cls.admin, name='Orange', category=cls.juice
+        )
+        cls.hammer = factories.create_product(
+            cls.admin, name='Hammer', category=cls.tools
+        )
+        StoreProduct.objects.bulk_create([
+            StoreProduct(
+                store_id=cls.store,
+                product_id=cls.bread,
+                quantity=5,
+                fifo_value='50.0000',
+            ),
+            StoreProduct(
+                store_id=cls.store,
+                product_id=cls.cola,
+                quantity=3,
+                reserved=3,
+            ),
+            StoreProduct(
+                store_id=cls.store,
+                product_id=cls.orange,
+                quantity=2,
+                fifo_value='8.0000',
+            ),
+            StoreProduct(
+                store_id=cls.store, product_id=cls.hammer, quantity=9
+            ),
+            StoreProduct(
+                store_id=cls.other_store,
+                product_id=cls.cola,
+                quantity=4,
+                fifo_value='12.0000',
+            ),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_create_category(self):
+        res = self.client.post(
+            CATEGORIES_URL, {'name': 'Soda', 'parent': self.drinks.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        category = Category.objects.get(pk=res.data['id'])
+        self.assertEqual(
+            category.path, f'{self.food.id}/{self.drinks.id}/{category.id}/'
+        )
+        self.assertEqual(category.depth, 2)
+        self.assertEqual(res.data['path'], category.path)
+
+    def test_list_in_tree_order(self):
+        res = self.client.get(CATEGORIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [category['name'] for category in res.data],
+            ['Food', 'Drinks', 'Juice', 'Tools'],
+        )
+
+    def test_subtree_products_in_one_query(self):
+        with self.assertNumQueries(1):
+            products = list(
+                Category.objects.products(self.food, self.store).order_by('id')
+            )
+
+        self.assertEqual(products, [self.bread, self.orange])
+
+    def test_subtree_products_api(self):
+        res = self.client.get(products_url(self.drinks.id))
+        res_store = self.client.get(
+            products_url(self.drinks.id), {'store': self.other_store.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [product['name'] for product in res.data], ['Cola', 'Orange']
+        )
+        self.assertEqual(
+            [product['name'] for product in res_store.data], ['Cola']
+        )
+
+    def test_move_subtree(self):
+        """Test moving a category rewrites its subtree in bounded queries"""
+        with self.assertNumQueries(5):
+            Category.objects.move(self.drinks, self.tools)
+
+        self.juice.refresh_from_db()
+        self.assertEqual(
+            self.juice.path,
+            f'{self.tools.id}/{self.drinks.id}/{self.juice.id}/',
+        )
+        self.assertEqual(self.juice.depth, 2)
+        self.assertEqual(
+            list(Category.objects.products(self.tools).order_by('id')),
+            [self.cola, self.orange, self.hammer],
+        )
+
+    def test_move_to_root_api(self):
+        res = self.client.patch(
+            detail_url(self.juice.id), {'parent': None}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['path'], f'{self.juice.id}/')
+        self.assertEqual(res.data['depth'], 0)
+
+    def test_move_under_descendant_rejected(self):
+        res = self.client.patch(
+            detail_url(self.food.id), {'parent': self.juice.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.path, f'{self.food.id}/')
+
+    def test_delete_leaf_category(self):
+        res = self.client.delete(detail_url(self.juice.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.orange.refresh_from_db()
+        self.assertIsNone(self.orange.category)
+
+    def test_delete_category_with_children_rejected(self):
+        res = self.client.delete(detail_url(self.drinks.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Category.objects.filter(pk=self.drinks.id).exists())
+
+    def test_rollup(self):
+        trx = Transaction.objects.create(
+            created_by=self.admin,
+            party=self.admin,
+            store=self.store,
+            trx_type='OUT',
+            amount='10.00',
+        )
+        TransactionProduct.objects.create(
+            trx_id=trx, product_id=self.orange, quantity=2
+        )
+        TransactionProduct.objects.create(
+            trx_id=trx, product_id=self.bread, quantity=1
+        )
+
+        res = self.client.get(
+            rollup_url(self.food.id), {'store': self.store.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = {row['name']: row for row in res.data}
+        self.assertEqual(list(rows), ['Food', 'Drinks'])
+        self.assertEqual(rows['Food']['stock_units'], 10)
+        self.assertEqual(rows['Food']['stock_value'], '58.0000')
+        self.assertEqual(rows['Food']['sales_units'], 3)
+        self.assertEqual(rows['Drinks']['stock_units'], 5)
+        self.assertEqual(rows['Drinks']['sales_units'], 2)
+
+    def test_rollup_all_stores(self):
+        res = self.client.get(rollup_url(self.drinks.id))
+
+        rows = {row['name']: row for row in res.data}
+        self.assertEqual(rows['Drinks']['stock_units'], 9)
+        self.assertEqual(rows['Juice']['stock_units'], 2)
+        self.assertEqual(rows['Juice']['sales_units'], 0)
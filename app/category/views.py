@@ -0,0 +1,60 @@
+from django.db.models import ProtectedError
+from rest_framework import viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from category import serializers
+from core.models import Category
+from core.permissions import IsAuthenticatedOrReadOnly
+from core.versions import bump_catalog_version
+from product.serializers import ProductValuesSerializer
+
+
+class CategoryViewSet(viewsets.ModelViewSet):
+    """Manage the category tree, listed in tree (path) order"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    queryset = Category.objects.order_by('path')
+    serializer_class = serializers.CategorySerializer
+
+    def perform_destroy(self, instance):
+        """Delete a leaf category, leaving its products uncategorized"""
+        try:
+            instance.delete()
+        except ProtectedError:
+            raise ValidationError(
+                {'detail': 'Only categories without children can be deleted.'}
+            )
+        bump_catalog_version()
+
+    def get_filters(self):
+        serializer = serializers.CategoryQuerySerializer(
+            data=self.request.query_params
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @action(detail=True)
+    def products(self, request, pk=None):
+        """List the products of a category subtree, in ?store= if given"""
+        products = Category.objects.products(
+            self.get_object(), self.get_filters().get('store')
+        )
+        return Response(ProductValuesSerializer(products.order_by('id')).data)
+
+    @action(detail=True)
+    def rollup(self, request, pk=None):
+        """Total the stock and sales of a category and its children
+
+        Stock is counted in ?store= or all stores, sales since ?since=.
+        """
+        filters = self.get_filters()
+        categories = Category.objects.rollup(
+            self.get_object(), filters.get('store'), filters.get('since')
+        )
+        return Response(
+            serializers.CategoryRollupSerializer(categories, many=True).data
+        )
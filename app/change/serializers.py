@@ -0,0 +1,18 @@
+from core.models import Change
+from core.serializers import ValuesSerializer
+
+
+class ChangeValuesSerializer(ValuesSerializer):
+    """Serializes Change log entries"""
+    model = Change
+    fields = (
+        'seq',
+        'commit_seq',
+        'kind',
+        'action',
+        'store_id',
+        'product_id',
+        'quantity',
+        'price',
+        'created_at',
+    )
@@ -0,0 +1,230 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.urls import reverse
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Change, Product, Store
+from core.tests.factories import stamp_changes_on_insert
+
+CHANGES_URL = reverse('change:change-list')
+TRANSACTION_URL = reverse('transaction:transaction-list')
+PRODUCTS_URL = reverse('product:product-list')
+
+
+class PublicChangeApiTest(TestCase):
+    """Test the public change feed API"""
+
+    def test_login_required(self):
+        res = APIClient().get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateChangeApiTest(TestCase):
+    """Test the authorized change feed API"""
+
+    def setUp(self):
+        stamp_changes_on_insert()
+        self.admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'admin123'
+        )
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        self.store = Store.objects.create(
+            name='Store#1', city='Cairo', cash=10000
+        )
+        self.product = Product.objects.create(
+            supplier_id=self.supplier, name='TestProduct', price='1000.00'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.supplier)
+
+    def post_transaction(self, trx_type, quantity):
+        return self.client.post(TRANSACTION_URL, {
+            'trx_type': trx_type,
+            'store': self.store.id,
+            'created_by': self.admin.id,
+            'party': self.supplier.id,
+            'product_id': self.product.id,
+            'amount': str(1000 * quantity),
+            'quantity': quantity,
+        })
+
+    def test_transactions_record_stock_changes(self):
+        """Test that each transaction records the new store product quantity"""
+        self.post_transaction('IN', 3)
+        self.post_transaction('OUT', 1)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [change['quantity'] for change in res.data['changes']], [3, 2]
+        )
+        self.assertEqual(res.data['changes'][0]['kind'], Change.STOCK)
+        self.assertEqual(res.data['changes'][0]['store_id'], self.store.id)
+        self.assertEqual(
+            res.data['next'], res.data['changes'][-1]['commit_seq']
+        )
+
+    def test_since_returns_only_newer_changes(self):
+        """Test that passing `next` back as `since` returns only newer changes
+        """
+        self.post_transaction('IN', 3)
+        since = self.client.get(CHANGES_URL).data['next']
+
+        res_empty = self.client.get(CHANGES_URL, {'since': since})
+        self.post_transaction('IN', 2)
+        res = self.client.get(CHANGES_URL, {'since': since})
+
+        self.assertEqual(res_empty.data['changes'], [])
+        self.assertEqual(res_empty.data['next'], since)
+        self.assertEqual(
+            [change['quantity'] for change in res.data['changes']], [5]
+        )
+
+    def test_product_writes_record_price_changes(self):
+        """Test that creating and updating a product records its price"""
+        res = self.client.post(
+            PRODUCTS_URL, {'name': 'LAPTOP', 'price': '100.00', 'image': ''}
+        )
+        self.client.patch(
+            reverse('product:product-detail', args=[res.data['id']]),
+            {'price': '90.00'},
+        )
+
+        changes = self.client.get(CHANGES_URL).data['changes']
+
+        self.assertEqual(
+            [change['price'] for change in changes], ['100.00', '90.00']
+        )
+        self.assertTrue(
+            all(change['product_id'] == res.data['id'] for change in changes)
+        )
+
+    def test_invalid_since_fails(self):
+        res = self.client.get(CHANGES_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compact_changes_keeps_latest_entry_per_row(self):
+        """Test compaction drops only old entries superseded by a newer one"""
+        self.post_transaction('IN', 3)
+        self.post_transaction('IN', 2)
+        self.post_transaction('OUT', 1)
+        Change.objects.update(created_at=timezone.now() - timedelta(days=30))
+
+        call_command('compact_changes', days=7, stdout=StringIO())
+
+        self.assertEqual(
+            list(Change.objects.values_list('quantity', flat=True)), [4]
+        )
+
+    def test_long_poll_wakes_on_commit(self):
+        """Test a long-poll waits for a commit instead of polling the DB"""
+        def commit_change(generation, timeout):
+            Change.objects.create(
+                kind=Change.PRODUCT, product_id=self.product.id, price='1.00'
+            )
+            return True
+
+        with patch(
+            'core.events.changes.wait', side_effect=commit_change
+        ) as wait:
+            res = self.client.get(CHANGES_URL, {'wait': 30})
+
+        wait.assert_called_once()
+        self.assertEqual(
+            [change['price'] for change in res.data['changes']], ['1.00']
+        )
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Concurrent commits need Postgres'
+)
+class ChangeCommitOrderTest(TransactionTestCase):
+    """Test the change feed follows commit order, not insert order"""
+
+    def setUp(self):
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.supplier)
+
+    def feed(self, since, **params):
+        return self.client.get(CHANGES_URL, {'since': since, **params}).data
+
+    def test_late_commit_is_not_skipped(self):
+        inserted, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    Change.objects.create(
+                        kind=Change.PRODUCT, product_id=1, price='1.00'
+                    )
+                    inserted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        inserted.wait(10)
+        Change.objects.create(kind=Change.PRODUCT, product_id=2, price='2.00')
+
+        first = self.feed(0)
+        release.set()
+        writer.join()
+        second = self.feed(first['next'])
+
+        self.assertEqual(
+            [change['product_id'] for change in first['changes']], [2]
+        )
+        self.assertEqual(
+            [change['product_id'] for change in second['changes']], [1]
+        )
+        self.assertLess(
+            second['changes'][0]['seq'], first['changes'][0]['seq']
+        )
+
+    def test_pages_end_at_transaction_boundaries(self):
+        with transaction.atomic():
+            Change.objects.bulk_create(
+                Change(
+                    kind=Change.PRODUCT, product_id=product_id, price='1.00'
+                )
+                for product_id in (1, 2)
+            )
+        with transaction.atomic():
+            Change.objects.bulk_create(
+                Change(
+                    kind=Change.PRODUCT, product_id=product_id, price='1.00'
+                )
+                for product_id in (3, 4)
+            )
+
+        first = self.feed(0, limit=1)
+        second = self.feed(first['next'], limit=3)
+
+        self.assertEqual(
+            [change['product_id'] for change in first['changes']], [1, 2]
+        )
+        self.assertTrue(first['more'])
+        self.assertEqual(
+            [change['product_id'] for change in second['changes']], [3, 4]
+        )
+        self.assertFalse(second['more'])
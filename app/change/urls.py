@@ -0,0 +1,9 @@
+from django.urls import path
+
+from change import views
+
+app_name = 'change'
+
+urlpatterns = [
+    path('', views.ChangeFeedView.as_view(), name='change-list'),
+]
@@ -0,0 +1,91 @@
+import time
+
+from django.db import connection
+from rest_framework import generics
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core import events
+from core.models import Change
+
+from change import serializers
+
+MAX_LIMIT = 1000
+MAX_WAIT = 30
+
+
+class ChangeFeedView(generics.GenericAPIView):
+    """List change log entries after `since`, waiting `wait` s for new ones
+
+    Clients store `next` and pass it back as `since`. Entries come in
+    commit order, with whole transactions per page, so an entry is never
+    skipped because a transaction that started earlier commits later.
+    Starting from since=0 returns the latest state of every stock row and
+    product, since compaction only drops entries that a newer entry
+    supersedes. A long-poll waits for a commit notification, not a timer,
+    and does not hold a database connection while it waits.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = Change.objects.all()
+
+    def get_int_param(self, name, default, maximum=None):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'Must be an integer.'})
+        if value < 0:
+            raise ValidationError({name: 'Must not be negative.'})
+        return min(value, maximum) if maximum is not None else value
+
+    def get_changes(self, since, limit):
+        """Return up to `limit` entries after `since` and whether more remain
+
+        The page is cut at a transaction boundary.
+        """
+        queryset = (
+            self.get_queryset()
+            .filter(commit_seq__gt=since)
+            .order_by('commit_seq', 'seq')
+        )
+        changes = serializers.ChangeValuesSerializer(queryset[:limit + 1]).data
+        if len(changes) <= limit:
+            return changes, False
+        changes, following = changes[:limit], changes[limit]
+        split = following['commit_seq']
+        if changes[-1]['commit_seq'] == split:
+            # Leave the split transaction for the next page, unless it is the
+            # only one and bigger than the limit
+            changes = [
+                change for change in changes if change['commit_seq'] != split
+            ]
+            if not changes:
+                changes = serializers.ChangeValuesSerializer(
+                    queryset.filter(commit_seq=split)
+                ).data
+        return changes, True
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_int_param('since', 0)
+        limit = max(self.get_int_param('limit', MAX_LIMIT, MAX_LIMIT), 1)
+        wait = self.get_int_param('wait', 0, MAX_WAIT)
+
+        if wait:
+            events.ensure_listener()
+        generation = events.changes.generation
+        changes, more = self.get_changes(since, limit)
+        deadline = time.monotonic() + wait
+        while not changes and time.monotonic() < deadline:
+            if not connection.in_atomic_block:
+                connection.close()
+            events.changes.wait(generation, deadline - time.monotonic())
+            generation = events.changes.generation
+            changes, more = self.get_changes(since, limit)
+
+        return Response({
+            'changes': changes,
+            'next': changes[-1]['commit_seq'] if changes else since,
+            'more': more,
+        })
@@ -1,13 +1,74 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
-from core import models
+from core import edits, models
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """Return the planner's row estimate for `queryset` over its partitions
+
+    Reads pg_class.reltuples, which VACUUM and ANALYZE keep up to date,
+    instead of counting every row. Returns None off Postgres.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT SUM(GREATEST(c.reltuples, 0)) FROM pg_class c '
+            "WHERE c.relkind = 'r' AND (c.oid = %s::regclass OR c.oid IN ("
+            'SELECT inhrelid FROM pg_inherits '
+            'WHERE inhparent = %s::regclass))',
+            [table, table],
+        )
+        estimate = cursor.fetchone()[0]
+    return int(estimate) if estimate is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates large unfiltered changelists, not counting"""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin for tables too large to count on every changelist page"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ViewOnlyAdmin(LargeTableAdmin):
+    """Admin for ledger tables, written only through the API and its effects"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class UserAdmin(BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name', 'user_type']
+    search_fields = ['email', 'name']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('personal Info'), {'fields': ('name', 'user_type')}),
@@ -21,7 +82,94 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+
+class StoreAdmin(admin.ModelAdmin):
+    ordering = ['name']
+    list_display = ['name', 'city', 'cash', 'updated_at']
+    search_fields = ['name']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            edits.store_updated(obj, form.initial['cash'])
+
+
+class ProductAdmin(LargeTableAdmin):
+    ordering = ['-id']
+    list_display = ['id', 'name', 'supplier_id', 'price', 'updated_at']
+    list_select_related = ['supplier_id']
+    search_fields = ['name']
+    raw_id_fields = ['supplier_id', 'category']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            edits.product_updated(obj, form.initial['price'])
+        else:
+            edits.product_created(obj)
+
+    def delete_model(self, request, obj):
+        edits.product_deleted(obj)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for product in queryset:
+            edits.product_deleted(product)
+        super().delete_queryset(request, queryset)
+
+
+class TransactionAdmin(ViewOnlyAdmin):
+    ordering = ['-created_at', '-id']
+    list_display = [
+        'id',
+        'trx_type',
+        'store',
+        'created_by',
+        'party',
+        'amount',
+        'created_at',
+    ]
+    list_select_related = ['store', 'created_by', 'party']
+    list_filter = ['trx_type']
+
+
+class TransactionProductAdmin(ViewOnlyAdmin):
+    ordering = ['-id']
+    list_display = ['id', 'trx_id', 'product_id', 'quantity', 'created_at']
+    list_select_related = ['trx_id', 'product_id']
+
+
+class StoreProductAdmin(LargeTableAdmin):
+    """Stock moves only by transactions, so only the reorder point is edited"""
+    ordering = ['store_id', 'product_id']
+    list_display = [
+        'store_id',
+        'product_id',
+        'quantity',
+        'reserved',
+        'reorder_point',
+    ]
+    list_select_related = ['store_id', 'product_id']
+    readonly_fields = [
+        'store_id',
+        'product_id',
+        'quantity',
+        'reserved',
+        'average_cost',
+        'fifo_value',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Store)
-admin.site.register(models.Product)
-admin.site.register(models.Transaction)
+admin.site.register(models.Store, StoreAdmin)
+admin.site.register(models.Product, ProductAdmin)
+admin.site.register(models.Transaction, TransactionAdmin)
+admin.site.register(models.TransactionProduct, TransactionProductAdmin)
+admin.site.register(models.StoreProduct, StoreProductAdmin)
@@ -0,0 +1,226 @@
+"""Audit trail of stock, price and cash changes
+
+Write paths hand unsaved AuditRecords to record(), which keeps them in
+memory until the surrounding transaction commits. Records made inside a
+savepoint that is rolled back are dropped with it, like any other
+on_commit callback. The acting user is taken from the request being served
+(see core.middleware.AuditActorMiddleware).
+
+With AUDIT_WRITE_BEHIND the committed records are queued for a background
+thread, which gathers them for up to BATCH_SECONDS and writes them with
+one bulk_create, so neither the INSERT nor its per-statement overhead is
+paid per request. Queued records are flushed when the process exits
+normally; a process killed in between loses them.
+"""
+import atexit
+import contextlib
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.models import AuditRecord
+
+logger = logging.getLogger(__name__)
+
+# Switched off by benchmark_audit to measure the overhead of the trail
+ENABLED = True
+# Set by benchmark_audit to drop the records of its rolled back transactions
+ROLLBACK_WRITES = False
+# How long the writer gathers records before inserting them together
+BATCH_SECONDS = 0.2
+FLUSH_AT_EXIT_SECONDS = 5
+
+_request = contextvars.ContextVar('audit_request', default=None)
+
+
+@contextlib.contextmanager
+def serving(request):
+    """Make the user of `request` the actor of the records made in the block"""
+    token = _request.set(request)
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def current_actor_id():
+    """Return the id of the user making the current request, if any
+
+    DRF sets the user it authenticates on the Django request, so this also
+    sees token-authenticated users.
+    """
+    request = _request.get()
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def write(using, records):
+    """Insert `records`, returning whether they were written"""
+    try:
+        if ROLLBACK_WRITES:
+            with transaction.atomic(using=using):
+                AuditRecord.objects.using(using).bulk_create(
+                    records, batch_size=5000
+                )
+                transaction.set_rollback(True, using=using)
+        else:
+            AuditRecord.objects.using(using).bulk_create(
+                records, batch_size=5000
+            )
+    except Exception:
+        # The change itself is committed already; losing its audit records must
+        # not fail the request
+        logger.exception('Could not write %d audit records', len(records))
+        return False
+    return True
+
+
+class Writer(threading.Thread):
+    """Background thread writing committed audit records in batches"""
+
+    def __init__(self):
+        super().__init__(name='audit-writer', daemon=True)
+        self.queue = queue.SimpleQueue()
+
+    def submit(self, using, records):
+        self.queue.put((using, records))
+
+    def flush(self, timeout=None):
+        """Wait until the records submitted so far are written, or time out"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def collect(self):
+        """Return the next item and those queued within BATCH_SECONDS of it
+
+        Collecting stops early at a flush.
+        """
+        items = [self.queue.get()]
+        deadline = time.monotonic() + BATCH_SECONDS
+        while not isinstance(items[-1], threading.Event):
+            try:
+                items.append(
+                    self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                )
+            except queue.Empty:
+                break
+        return items
+
+    def run(self):
+        while True:
+            items = self.collect()
+            batches, flushes = defaultdict(list), []
+            for item in items:
+                if isinstance(item, threading.Event):
+                    flushes.append(item)
+                else:
+                    batches[item[0]].extend(item[1])
+            for using, records in batches.items():
+                if not write(using, records):
+                    # Reconnect on the next batch if the connection was lost
+                    connections[using].close()
+            for done in flushes:
+                done.set()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the audit writer of this process, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = Writer()
+            _writer.start()
+            atexit.register(_writer.flush, FLUSH_AT_EXIT_SECONDS)
+        return _writer
+
+
+class Buffer:
+    """Audit records waiting for a transaction to commit, written when it does
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.records = []
+
+    def __call__(self):
+        if settings.AUDIT_WRITE_BEHIND:
+            get_writer().submit(self.using, self.records)
+        else:
+            write(self.using, self.records)
+
+
+def pending_buffer(using=DEFAULT_DB_ALIAS):
+    """Return the buffer flushed when the current transaction commits
+
+    Django keeps on_commit callbacks with the savepoints they were registered
+    in and drops them on rollback, so a buffer is reused only while its
+    callback is still registered at the current savepoint depth.
+    """
+    connection = transaction.get_connection(using)
+    savepoints = set(connection.savepoint_ids)
+    for entry in reversed(connection.run_on_commit):
+        callback_savepoints, callback = entry[0], entry[1]
+        if isinstance(callback, Buffer) and callback_savepoints == savepoints:
+            return callback
+    buffer = Buffer(using)
+    transaction.on_commit(buffer, using=using)
+    return buffer
+
+
+def record(records, using=DEFAULT_DB_ALIAS):
+    """Write the unsaved AuditRecords `records` once the transaction commits"""
+    records = list(records) if ENABLED else []
+    if not records:
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        buffer = Buffer(using)
+        buffer.records = records
+        buffer()
+        return
+    pending_buffer(using).records.extend(records)
+
+
+def stock_change(store_product, old_quantity, actor_id=None):
+    """Return the record of a StoreProduct quantity change"""
+    return AuditRecord(
+        kind=AuditRecord.STOCK,
+        store_id=store_product.store_id_id,
+        product_id=store_product.product_id_id,
+        old_value=old_quantity,
+        new_value=store_product.quantity,
+        actor_id=actor_id or current_actor_id(),
+    )
+
+
+def price_change(product_id, old_price, new_price, actor_id=None):
+    """Return the record of a Product price change"""
+    return AuditRecord(
+        kind=AuditRecord.PRICE,
+        product_id=product_id,
+        old_value=old_price,
+        new_value=new_price,
+        actor_id=actor_id or current_actor_id(),
+    )
+
+
+def cash_change(store, old_cash, actor_id=None):
+    """Return the record of a Store cash change"""
+    return AuditRecord(
+        kind=AuditRecord.CASH,
+        store_id=store.id,
+        old_value=old_cash,
+        new_value=store.cash,
+        actor_id=actor_id or current_actor_id(),
+    )
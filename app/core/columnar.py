@@ -0,0 +1,408 @@
+"""Columnar on-disk archive of historical transactions
+
+An archive is a directory with a `manifest.json` and, per table, chunks of
+at most CHUNK_ROWS rows stored as one `.npy` array per column:
+
+    <archive>/manifest.json
+    <archive>/lines/00000001/created_at.npy
+    <archive>/lines/00000001/product_id.npy
+    ...
+
+`created_at` is stored as int64 microseconds since the epoch (UTC), money as
+int64 cents and `trx_type` as uint8 codes into a dictionary kept in the
+manifest. Every chunk records the min/max of each column (its zone map), so
+scans skip chunks that cannot match a time range or id filter and memory-map
+only the columns they need.
+"""
+import datetime
+import json
+import os
+import shutil
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+
+from core import retention
+from core.models import Transaction, TransactionProduct
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+MANIFEST = 'manifest.json'
+CHUNK_ROWS = 1_000_000
+DENSE_GROUPS = 1 << 22
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+TABLES = {
+    'transactions': {
+        'id': 'int64',
+        'created_at': 'int64',
+        'store_id': 'int32',
+        'created_by_id': 'int32',
+        'party_id': 'int32',
+        'trx_type': 'uint8',
+        'amount': 'int64',
+    },
+    'lines': {
+        'id': 'int64',
+        'trx_id': 'int64',
+        'created_at': 'int64',
+        'store_id': 'int32',
+        'trx_type': 'uint8',
+        'product_id': 'int32',
+        'quantity': 'int32',
+    },
+}
+DICTIONARY_COLUMNS = ('trx_type',)
+CENTS_COLUMNS = ('amount',)
+
+
+def to_microseconds(value):
+    """Return an aware datetime as microseconds since the epoch"""
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def from_microseconds(value):
+    return EPOCH + datetime.timedelta(microseconds=int(value))
+
+
+class ColumnarArchive:
+    """Append-only columnar archive of the transaction tables"""
+
+    def __init__(self, path):
+        if np is None:
+            raise ImproperlyConfigured('The columnar archive requires numpy.')
+        self.path = path
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest:
+                self.manifest = json.load(manifest)
+        else:
+            self.manifest = {
+                'version': 1,
+                'until': None,
+                'dictionaries': {column: [] for column in DICTIONARY_COLUMNS},
+                'tables': {table: [] for table in TABLES},
+            }
+
+    @property
+    def until(self):
+        """The end of the exported created_at range, as an aware datetime"""
+        until = self.manifest['until']
+        return from_microseconds(until) if until is not None else None
+
+    def save(self, until=None):
+        """Write the manifest atomically, publishing the chunks appended so far
+        """
+        if until is not None:
+            self.manifest['until'] = to_microseconds(until)
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp_path, 'w') as manifest:
+            json.dump(self.manifest, manifest)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+    def encode(self, column, values):
+        """Return dictionary codes for `values`, adding the unseen ones"""
+        dictionary = self.manifest['dictionaries'][column]
+        codes = {value: code for code, value in enumerate(dictionary)}
+        for value in values:
+            if value not in codes:
+                codes[value] = len(dictionary)
+                dictionary.append(value)
+        if len(dictionary) > np.iinfo(TABLES['lines'][column]).max + 1:
+            raise ValueError(
+                f'Too many distinct {column} values for the archive.'
+            )
+        return [codes[value] for value in values]
+
+    def code(self, column, value):
+        """Return the dictionary code of `value`, or None if it never occurs"""
+        dictionary = self.manifest['dictionaries'][column]
+        return dictionary.index(value) if value in dictionary else None
+
+    def append(self, table, columns):
+        """Write `columns` ({name: sequence}) of `table` as a new chunk
+
+        The chunk only becomes visible to readers once save() is called.
+        """
+        schema = TABLES[table]
+        arrays = {
+            name: np.asarray(columns[name], dtype=dtype)
+            for name, dtype in schema.items()
+        }
+        rows = len(arrays['id'])
+        if rows == 0:
+            return None
+
+        chunks = self.manifest['tables'][table]
+        name = f'{len(chunks) + 1:08d}'
+        directory = os.path.join(self.path, table, name)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        for column, array in arrays.items():
+            np.save(os.path.join(directory, f'{column}.npy'), array)
+
+        chunk = {
+            'name': name,
+            'rows': rows,
+            'zones': {
+                column: [int(array.min()), int(array.max())]
+                for column, array in arrays.items()
+            },
+        }
+        chunks.append(chunk)
+        return chunk
+
+    def chunks(self, table, start=None, end=None, filters=None):
+        """Return the chunks of `table` whose zone maps match the query"""
+        start = to_microseconds(start) if start is not None else None
+        end = to_microseconds(end) if end is not None else None
+        selected = []
+        for chunk in self.manifest['tables'][table]:
+            low, high = chunk['zones']['created_at']
+            if start is not None and high < start:
+                continue
+            if end is not None and low >= end:
+                continue
+            zones = chunk['zones']
+            if any(
+                value is None
+                or not zones[column][0] <= value <= zones[column][1]
+                for column, value in (filters or {}).items()
+            ):
+                continue
+            selected.append(chunk)
+        return selected
+
+    def scan(self, table, columns, start=None, end=None, **filters):
+        """Yield {column: array} for rows of `table` in [start, end)
+
+        Only rows matching `filters` are yielded.
+
+        Filters are equality matches on columns; dictionary columns take the
+        decoded value (e.g. trx_type='OUT').
+        """
+        filters = {
+            column: self.code(column, value)
+            if column in DICTIONARY_COLUMNS else value
+            for column, value in filters.items()
+        }
+        needed = set(columns) | set(filters)
+        if start is not None or end is not None:
+            needed.add('created_at')
+
+        for chunk in self.chunks(table, start, end, filters):
+            directory = os.path.join(self.path, table, chunk['name'])
+            arrays = {
+                column: np.load(
+                    os.path.join(directory, f'{column}.npy'), mmap_mode='r'
+                )
+                for column in needed
+            }
+            low, high = chunk['zones']['created_at']
+            mask = None
+            conditions = [
+                (arrays[column] == value) for column, value in filters.items()
+                if chunk['zones'][column] != [value, value]
+            ]
+            if start is not None and low < to_microseconds(start):
+                conditions.append(
+                    arrays['created_at'] >= to_microseconds(start)
+                )
+            if end is not None and high >= to_microseconds(end):
+                conditions.append(arrays['created_at'] < to_microseconds(end))
+            for condition in conditions:
+                mask = condition if mask is None else mask & condition
+            if mask is None:
+                yield {column: arrays[column] for column in columns}
+            elif mask.any():
+                yield {column: arrays[column][mask] for column in columns}
+
+    def aggregate(
+        self, table, by, value=None, start=None, end=None, **filters
+    ):
+        """Return [{**group, 'count': n, value: total}] grouped by `by`
+
+        Group keys are packed into one int64 per row; when the key space is
+        small enough the groups are counted with bincount, otherwise each
+        chunk is reduced with unique() and the partial results are merged.
+        """
+        by = tuple(by)
+        chunks = self.manifest['tables'][table]
+        if not chunks:
+            return []
+        dims = tuple(
+            max(chunk['zones'][column][1] for chunk in chunks) + 1
+            for column in by
+        )
+        groups = int(np.prod(dims, dtype=np.float64)) if by else 1
+        if groups >= 1 << 62:
+            raise ValueError(f'Too many possible groups for {by}.')
+
+        dense = groups <= DENSE_GROUPS
+        counts = np.zeros(groups, dtype=np.int64) if dense else []
+        totals = np.zeros(groups, dtype=np.int64) if dense else []
+        keys = []
+        columns = by + ((value,) if value else ()) or ('id',)
+        for arrays in self.scan(table, columns, start, end, **filters):
+            if by:
+                key = np.ravel_multi_index(
+                    tuple(arrays[column].astype(np.int64) for column in by),
+                    dims,
+                )
+            else:
+                key = np.zeros(len(arrays[columns[0]]), dtype=np.int64)
+            weights = arrays[value].astype(np.int64) if value else None
+            if dense:
+                counts += np.bincount(key, minlength=groups)
+                if value:
+                    totals += np.bincount(
+                        key, weights=weights, minlength=groups
+                    ).astype(np.int64)
+            else:
+                chunk_keys, inverse = np.unique(key, return_inverse=True)
+                keys.append(chunk_keys)
+                counts.append(np.bincount(inverse))
+                totals.append(
+                    np.bincount(inverse, weights=weights).astype(np.int64)
+                    if value else None
+                )
+
+        if dense:
+            group_keys = np.flatnonzero(counts)
+            counts, totals = counts[group_keys], totals[group_keys]
+        elif keys:
+            group_keys, inverse = np.unique(
+                np.concatenate(keys), return_inverse=True
+            )
+            counts = np.bincount(
+                inverse, weights=np.concatenate(counts)
+            ).astype(np.int64)
+            if value:
+                totals = np.bincount(
+                    inverse, weights=np.concatenate(totals)
+                ).astype(np.int64)
+        else:
+            return []
+
+        output = {}
+        for column, values in zip(
+            by, np.unravel_index(group_keys, dims) if by else ()
+        ):
+            values = values.tolist()
+            if column in DICTIONARY_COLUMNS:
+                dictionary = self.manifest['dictionaries'][column]
+                values = [dictionary[code] for code in values]
+            output[column] = values
+        output['count'] = counts.tolist()
+        if value:
+            totals = totals.tolist()
+            if value in CENTS_COLUMNS:
+                totals = [Decimal(total).scaleb(-2) for total in totals]
+            output[value] = totals
+        results = [dict(zip(output, row)) for row in zip(*output.values())]
+        return results
+
+
+def export_transactions(archive, before, chunk_rows=CHUNK_ROWS, delete=False):
+    """Append the transactions created before `before` not archived yet
+
+    Rows are read in created_at order and written in chunks of `chunk_rows`,
+    so every chunk covers a narrow time range. With `delete` the exported
+    rows are removed from the database once the manifest is saved, and the
+    rows referencing them are deleted or detached as their on_delete says;
+    transactions whose cost layers still hold stock are refused with a
+    ValueError before anything is written. Returns the number of exported
+    transactions and lines.
+    """
+    ranges = {'created_at__lt': before}
+    if archive.until is not None:
+        ranges['created_at__gte'] = archive.until
+
+    if delete:
+        retention.check_releasable(
+            Transaction.objects.filter(**ranges).values('id')
+        )
+
+    sources = {
+        'transactions': Transaction.objects.filter(**ranges)
+        .order_by('created_at', 'id')
+        .values_list(
+            'id',
+            'created_at',
+            'store_id',
+            'created_by_id',
+            'party_id',
+            'trx_type',
+            'amount',
+        ),
+        'lines': TransactionProduct.objects.filter(**ranges)
+        .order_by('created_at', 'id')
+        .values_list(
+            'id',
+            'trx_id_id',
+            'created_at',
+            'trx_id__store_id',
+            'trx_id__trx_type',
+            'product_id_id',
+            'quantity',
+        ),
+    }
+    exported = {}
+    with transaction.atomic():
+        for table, queryset in sources.items():
+            exported[table] = 0
+            rows = []
+            for row in queryset.iterator(chunk_size=10000):
+                rows.append(row)
+                if len(rows) == chunk_rows:
+                    exported[table] += write_chunk(archive, table, rows)
+                    rows = []
+            exported[table] += write_chunk(archive, table, rows)
+        archive.save(
+            until=max(before, archive.until) if archive.until else before
+        )
+
+        if delete:
+            retention.release_transactions(
+                Transaction.objects.filter(**ranges).values('id')
+            )
+            where = ' AND '.join(
+                f'created_at {">=" if lookup.endswith("gte") else "<"} %s'
+                for lookup in ranges
+            )
+            params = [
+                connection.ops.adapt_datetimefield_value(value)
+                for value in ranges.values()
+            ]
+            with connection.cursor() as cursor:
+                for model in (TransactionProduct, Transaction):
+                    cursor.execute(
+                        f'DELETE FROM {model._meta.db_table} WHERE {where}',
+                        params,
+                    )
+    return exported['transactions'], exported['lines']
+
+
+def write_chunk(archive, table, rows):
+    """Convert DB rows of `table` to typed columns and append them to `archive`
+    """
+    if not rows:
+        return 0
+    columns = dict(zip(TABLES[table], map(list, zip(*rows))))
+    columns['created_at'] = [
+        to_microseconds(value) for value in columns['created_at']
+    ]
+    for column in DICTIONARY_COLUMNS:
+        columns[column] = archive.encode(column, columns[column])
+    for column in CENTS_COLUMNS:
+        if column in columns:
+            columns[column] = [int(value * 100) for value in columns[column]]
+    archive.append(table, columns)
+    return len(rows)
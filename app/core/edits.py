@@ -0,0 +1,44 @@
+"""Side effects of editing products and stores
+
+The API and the admin both save through these, so an edit from either
+records price history, audit records and changes, and invalidates cached
+answers the same way.
+"""
+from django.db import transaction
+
+from core import audit, events
+from core.models import Change, ProductPrice
+from core.versions import bump_catalog_version
+
+
+def product_created(product):
+    """Record the initial price of a new Product"""
+    ProductPrice.objects.record(product, effective_from=product.created_at)
+    Change.objects.record_product(product)
+    audit.record([audit.price_change(product.id, None, product.price)])
+
+
+def product_updated(product, previous_price):
+    """Record a saved Product, and its price if it is not `previous_price`"""
+    if product.price != previous_price:
+        ProductPrice.objects.record(product)
+        audit.record(
+            [audit.price_change(product.id, previous_price, product.price)]
+        )
+    Change.objects.record_product(product)
+    bump_catalog_version()
+
+
+def product_deleted(product):
+    """Record the deletion of a Product, before it is deleted"""
+    Change.objects.record_product(product, deleted=True)
+    bump_catalog_version()
+
+
+def store_updated(store, previous_cash):
+    """Audit a saved Store's cash if it is not `previous_cash`, publish it"""
+    if store.cash != previous_cash:
+        audit.record([audit.cash_change(store, previous_cash)])
+    transaction.on_commit(
+        lambda: events.publish(store.id, events.cash_event(store))
+    )
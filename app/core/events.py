@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'store_events'
+CHANGES_CHANNEL = 'changes'
+QUEUE_SIZE = 1000
+
+
+class Broker:
+    """In-process fan-out of store events to asyncio subscriber queues
+
+    Publishers may run in any thread; events are handed to each
+    subscriber's event loop with call_soon_threadsafe. A subscriber that
+    falls QUEUE_SIZE events behind receives None and should disconnect, so
+    the client reconnects and replays from its Last-Event-ID.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, store_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[store_id].add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue
+
+    def unsubscribe(self, store_id, queue):
+        with self._lock:
+            subscribers = self._subscribers[store_id]
+            subscribers.difference_update(
+                {item for item in subscribers if item[1] is queue}
+            )
+            if not subscribers:
+                del self._subscribers[store_id]
+
+    def dispatch(self, store_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(store_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+            event = None
+        queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+class ChangeSignal:
+    """Wakes threads waiting for change log rows to be committed
+
+    Waiters read `generation` before looking for changes and then wait for
+    it to move on. A commit that lands between the two is not missed.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        with self._condition:
+            return self._generation
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Wait `timeout` s for a commit after `generation`, True if it came"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._generation != generation, timeout
+            )
+
+
+changes = ChangeSignal()
+
+
+def publish(store_id, event):
+    """Send `event` to the subscribers of `store_id` in every worker"""
+    if settings.EVENTS_BACKEND == 'postgres':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [NOTIFY_CHANNEL, json.dumps([store_id, event])],
+            )
+    else:
+        broker.dispatch(store_id, event)
+
+
+def publish_changes():
+    """Tell change feed long-polls in every worker that changes committed"""
+    if settings.EVENTS_BACKEND == 'postgres':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANGES_CHANNEL, ''])
+    else:
+        changes.notify()
+
+
+def publish_stock(changes):
+    """Publish the stock events of committed `changes` with their commit_seq"""
+    changes = [change for change in changes if change.seq is not None]
+    if not changes:
+        return
+    stamps = dict(
+        type(changes[0])
+        .objects.filter(seq__in=[change.seq for change in changes])
+        .values_list('seq', 'commit_seq')
+    )
+    for change in changes:
+        change.commit_seq = stamps.get(change.seq)
+        publish(change.store_id, stock_event(change))
+
+
+def event_id(change):
+    """Return the SSE event id of a Change, in change log commit order"""
+    return f'{change.commit_seq}-{change.seq}'
+
+
+def parse_event_id(value):
+    """Return the (commit_seq, seq) of an SSE event id, or None if invalid"""
+    commit_seq, _, seq = value.partition('-')
+    if not (commit_seq.isdigit() and seq.isdigit()):
+        return None
+    return int(commit_seq), int(seq)
+
+
+def stock_event(change):
+    """Return the event for a stock Change"""
+    return {
+        'id': event_id(change),
+        'event': 'stock',
+        'data': {
+            'product_id': change.product_id,
+            'quantity': int(change.quantity),
+        },
+    }
+
+
+def cash_event(store):
+    """Return the event for a Store cash balance"""
+    return {'event': 'cash', 'data': {'cash': '{:f}'.format(store.cash)}}
+
+
+class PostgresListener(threading.Thread):
+    """LISTEN for what any worker publishes and dispatch it locally"""
+
+    def __init__(self):
+        super().__init__(name='store-events-listener', daemon=True)
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception('Store events listener failed, reconnecting')
+                threading.Event().wait(1)
+
+    def listen(self):
+        db = connections['default']
+        conn = db.get_new_connection(db.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                cursor.execute(f'LISTEN {CHANGES_CHANNEL}')
+            while True:
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    if notify.channel == CHANGES_CHANNEL:
+                        changes.notify()
+                        continue
+                    store_id, event = json.loads(notify.payload)
+                    broker.dispatch(store_id, event)
+        finally:
+            conn.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Start the LISTEN thread once per process when Postgres fan-out is on
+
+    Notifications sent before the thread is listening are lost, so callers
+    must not rely on a wakeup arriving and should re-check when they time out.
+    """
+    global _listener
+    if settings.EVENTS_BACKEND != 'postgres':
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = PostgresListener()
+            _listener.start()
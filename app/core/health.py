@@ -0,0 +1,88 @@
+"""Database readiness checks and the /healthz and /readyz endpoints
+
+/healthz only proves the process serves requests and never touches the
+database. /readyz checks the database and pending migrations at most once
+every READINESS_CACHE_SECONDS per process, so load balancers can probe it
+as often as they like.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import DatabaseError
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+_readiness = {'checked_at': None, 'result': None}
+_readiness_lock = threading.Lock()
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """Run SELECT 1, raising OperationalError if the database is unreachable"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def reset_connection(alias=DEFAULT_DB_ALIAS):
+    """Drop a connection that failed, so the next check opens a new one"""
+    connection = connections[alias]
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    """Return the names of the migrations not applied to the database yet"""
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [f'{migration.app_label}.{migration.name}' for migration, _ in plan]
+
+
+def readiness():
+    """Return (ready, details), reusing the last result for a while
+
+    Results are reused for READINESS_CACHE_SECONDS.
+    """
+    with _readiness_lock:
+        now = time.monotonic()
+        checked_at = _readiness['checked_at']
+        if (
+            checked_at is not None
+            and now - checked_at < settings.READINESS_CACHE_SECONDS
+        ):
+            return _readiness['result']
+
+        details = {'database': True, 'migrations': True}
+        try:
+            check_database()
+            pending = pending_migrations()
+            if pending:
+                details['migrations'] = False
+                details['pending'] = pending
+        except DatabaseError as error:
+            details.update(
+                database=False, migrations=False, error=str(error).strip()
+            )
+            reset_connection()
+        result = (details['database'] and details['migrations'], details)
+        _readiness.update(checked_at=now, result=result)
+        return result
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    ready, details = readiness()
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', **details},
+        status=200 if ready else 503,
+    )
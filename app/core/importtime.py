@@ -0,0 +1,129 @@
+"""Measure where process startup time goes
+
+Run as `python -m core.importtime` in a fresh interpreter (the
+`profile_startup` command does this) and print a JSON report on stdout.
+Module execution is timed by wrapping the exec_module of the source and
+extension module loaders, which, unlike `-X importtime`, also sees the
+modules Django imports with importlib (app configs, models, admin
+modules, URLconfs). Django's setup is split per app into creating the
+app config, importing its models and running its ready().
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from importlib import machinery
+
+_stack = []
+modules = {}
+
+
+def _timed_exec(exec_module):
+    def wrapper(self, module):
+        _stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return exec_module(self, module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            modules[module.__name__] = {
+                'self': elapsed - children,
+                'cumulative': elapsed,
+            }
+    return wrapper
+
+
+def install():
+    """Start timing every module executed from now on"""
+    for loader in (
+        machinery.SourceFileLoader,
+        machinery.SourcelessFileLoader,
+        machinery.ExtensionFileLoader,
+    ):
+        loader.exec_module = _timed_exec(loader.exec_module)
+
+
+def _timed_app_phase(phases, phase, label, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            phases.setdefault(label, {})[phase] = time.perf_counter() - started
+    return wrapper
+
+
+def profile_setup(urlconf=False):
+    """Run django.setup() (and import the URLconf), timing each phase"""
+    import django
+    from django.apps import AppConfig
+    from django.conf import settings
+
+    apps = {}
+    create = AppConfig.create.__func__
+    import_models = AppConfig.import_models
+
+    def create_config(cls, entry):
+        started = time.perf_counter()
+        app_config = create(cls, entry)
+        apps.setdefault(app_config.label, {})['config'] = (
+            time.perf_counter() - started
+        )
+        app_config.ready = _timed_app_phase(
+            apps, 'ready', app_config.label, app_config.ready
+        )
+        return app_config
+
+    def import_app_models(app_config):
+        return _timed_app_phase(
+            apps, 'models', app_config.label, import_models
+        )(app_config)
+
+    AppConfig.create = classmethod(create_config)
+    AppConfig.import_models = import_app_models
+
+    phases = {}
+    started = time.perf_counter()
+    settings.INSTALLED_APPS
+    phases['settings'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    django.setup()
+    phases['setup'] = time.perf_counter() - started
+
+    if urlconf:
+        started = time.perf_counter()
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+        phases['urlconf'] = time.perf_counter() - started
+    return phases, apps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--urlconf', action='store_true')
+    parser.add_argument(
+        '--import', dest='imports', action='append', default=[]
+    )
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    install()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    phases, apps = profile_setup(urlconf=args.urlconf)
+    for name in args.imports:
+        import_started = time.perf_counter()
+        importlib.import_module(name)
+        phases[f'import {name}'] = time.perf_counter() - import_started
+    phases['total'] = time.perf_counter() - started
+
+    json.dump({'phases': phases, 'apps': apps, 'modules': modules}, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
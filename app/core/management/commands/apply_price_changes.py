@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import ProductPrice
+
+
+class Command(BaseCommand):
+    """Django command to apply scheduled prices that are now in effect"""
+
+    help = (
+        'Set Product.price to the price in effect now for every product whose '
+        'scheduled price has started'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        applied = ProductPrice.objects.apply()
+        self.stdout.write(
+            self.style.SUCCESS(f'Applied {applied} price changes.')
+        )
@@ -0,0 +1,72 @@
+import datetime
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitions, retention
+from core.models import Transaction
+
+
+class Command(BaseCommand):
+    """Django command to move old transaction partitions to compressed files"""
+
+    help = (
+        'Detach monthly transaction partitions older than --before and archive'
+        ' them as gzip files'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            required=True,
+            help='Archive months before this one, as YYYY-MM',
+        )
+        parser.add_argument(
+            '--dir', required=True, help='Directory to write the archives to'
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.supports_partitioning(connection):
+            raise CommandError(
+                'Partitioning is only supported on Postgres 11 or later.'
+            )
+
+        before = datetime.datetime.strptime(options['before'], '%Y-%m').date()
+        os.makedirs(options['dir'], exist_ok=True)
+
+        with connection.cursor() as cursor:
+            months = sorted({
+                month
+                for table in partitions.PARTITIONED_TABLES
+                for month in partitions.list_partitions(cursor, table)
+                if month < before
+            })
+            for month in months:
+                with transaction.atomic():
+                    start, end = (
+                        datetime.datetime.combine(
+                            bound, datetime.time(), datetime.timezone.utc
+                        )
+                        for bound in (month, partitions.add_months(month, 1))
+                    )
+                    try:
+                        retention.release_transactions(
+                            Transaction.objects.filter(
+                                created_at__gte=start, created_at__lt=end
+                            ).values('id')
+                        )
+                    except ValueError as exc:
+                        raise CommandError(f'{month:%Y-%m}: {exc}')
+                    for table in partitions.PARTITIONED_TABLES:
+                        if month not in partitions.list_partitions(
+                            cursor, table
+                        ):
+                            continue
+                        path, rows = partitions.archive_partition(
+                            cursor, table, month, options['dir']
+                        )
+                        self.stdout.write(f'Archived {rows} rows to {path}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {len(months)} months.')
+        )
@@ -0,0 +1,113 @@
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import audit
+from core.models import Product, Store
+from transaction.views import TransactionViewSet
+
+
+class Command(BaseCommand):
+    """Django command to measure the audit trail overhead on transactions"""
+
+    help = (
+        'Benchmark TransactionViewSet.perform_create with and without audit '
+        'records'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        enabled = audit.ENABLED
+        timings = {False: [], True: []}
+        with transaction.atomic():
+            admin, supplier = self.populate()
+            audit.ROLLBACK_WRITES = True
+            try:
+                # Interleave the runs, each on a store of its own, so neither
+                # sees the other's stock
+                for round in range(options['rounds']):
+                    for audited in (
+                        (False, True) if round % 2 else (True, False)
+                    ):
+                        audit.ENABLED = audited
+                        timings[audited].append(
+                            self.measure(
+                                admin, supplier, f'{round}-{audited}', requests
+                            )
+                        )
+                        if settings.AUDIT_WRITE_BEHIND:
+                            # Let the writer finish before the next run, which
+                            # it would otherwise slow down
+                            audit.get_writer().flush()
+            finally:
+                audit.ENABLED = enabled
+                audit.ROLLBACK_WRITES = False
+            transaction.set_rollback(True)
+
+        plain = statistics.median(timings[False])
+        audited = statistics.median(timings[True])
+        # Each round's pair of runs is back to back, so their ratio cancels
+        # drift between rounds
+        ratios = [a / p for a, p in zip(timings[True], timings[False])]
+        overhead = statistics.median(ratios) - 1
+        write_behind = 'on' if settings.AUDIT_WRITE_BEHIND else 'off'
+        self.stdout.write(
+            f'{requests} transactions | '
+            f'without audit {plain / requests * 1000:.3f} ms/request | '
+            f'with audit {audited / requests * 1000:.3f} ms/request '
+            f'({overhead * 100:+.1f}%) | '
+            f'write-behind {write_behind}'
+        )
+
+    def populate(self):
+        """Return the admin making the transactions and their supplier"""
+        User = get_user_model()
+        admin = User.objects.create(
+            email='bench-admin@bench.local', user_type='Admin'
+        )
+        supplier = User.objects.create(
+            email='bench-supplier@bench.local', user_type='Supplier'
+        )
+        return admin, supplier
+
+    def measure(self, admin, supplier, label, requests):
+        """Time `requests` one-unit IN transactions and their on_commit work"""
+        store = Store.objects.create(
+            name=f'bench-store-{label}', city='Cairo', cash='100000.00'
+        )
+        product = Product.objects.create(
+            supplier_id=supplier, name=f'bench-product-{label}', price='1.00'
+        )
+        request = SimpleNamespace(
+            user=admin,
+            data={
+                'trx_type': 'IN',
+                'store': store.id,
+                'created_by': admin.id,
+                'party': supplier.id,
+                'product_id': product.id,
+                'amount': '1.00',
+                'quantity': 1,
+            },
+        )
+        view = TransactionViewSet(request=request, format_kwarg=None)
+        start = time.perf_counter()
+        with audit.serving(request):
+            for _ in range(requests):
+                view.perform_create(None)
+                callbacks, connection.run_on_commit = (
+                    connection.run_on_commit,
+                    [],
+                )
+                for entry in callbacks:
+                    entry[1]()
+        return time.perf_counter() - start
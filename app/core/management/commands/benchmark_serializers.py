@@ -0,0 +1,119 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Product, Store, Transaction
+from core.renderers import FastJSONRenderer
+from product.serializers import ProductSerializer, ProductValuesSerializer
+from store.serializers import StoreSerializer, StoreValuesSerializer
+from transaction.serializers import (
+    TransactionSerializer, TransactionValuesSerializer,
+)
+
+
+class Command(BaseCommand):
+    """Django command to compare list serialization throughput"""
+
+    help = 'Benchmark DRF list serializers against the values_list() fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        self.repeat = options['repeat']
+        with transaction.atomic():
+            self.populate(rows)
+            cases = (
+                (
+                    'stores',
+                    Store.objects.order_by('-name'),
+                    StoreSerializer,
+                    StoreValuesSerializer,
+                ),
+                (
+                    'products',
+                    Product.objects.all(),
+                    ProductSerializer,
+                    ProductValuesSerializer,
+                ),
+                (
+                    'transactions',
+                    Transaction.objects.all(),
+                    TransactionSerializer,
+                    TransactionValuesSerializer,
+                ),
+            )
+            for case in cases:
+                self.compare(*case)
+            transaction.set_rollback(True)
+
+    def populate(self, rows):
+        """Create `rows` stores, products and transactions to serialize"""
+        user_model = get_user_model()
+        admin = user_model.objects.create(
+            email='bench-admin@bench.local', user_type='Admin'
+        )
+        supplier = user_model.objects.create(
+            email='bench-supplier@bench.local', user_type='Supplier'
+        )
+        Store.objects.bulk_create(
+            Store(name=f'bench-store-{i}', city='Cairo', cash='1000.00')
+            for i in range(rows)
+        )
+        stores = list(Store.objects.filter(name__startswith='bench-store-'))
+        Product.objects.bulk_create(
+            Product(
+                supplier_id=supplier, name=f'bench-product-{i}', price='10.50'
+            )
+            for i in range(rows)
+        )
+        Transaction.objects.bulk_create(
+            Transaction(
+                created_by=admin,
+                party=supplier,
+                store=stores[i % len(stores)],
+                trx_type='IN',
+                amount='10.50',
+            )
+            for i in range(rows)
+        )
+
+    def compare(
+        self, name, queryset, serializer_class, values_serializer_class
+    ):
+        count = queryset.count()
+        slow = self.measure(
+            lambda: JSONRenderer().render(
+                serializer_class(queryset.all(), many=True).data
+            )
+        )
+        fast = self.measure(
+            lambda: JSONRenderer().render(
+                values_serializer_class(queryset.all()).data
+            )
+        )
+        faster = self.measure(
+            lambda: FastJSONRenderer().render(
+                values_serializer_class(queryset.all()).data
+            )
+        )
+        self.stdout.write(
+            f'{name}: {count} rows | serializer {count / slow:,.0f} rows/s | '
+            f'values {count / fast:,.0f} rows/s ({slow / fast:.1f}x) | '
+            f'values+fast renderer {count / faster:,.0f} rows/s '
+            f'({slow / faster:.1f}x)'
+        )
+
+    def measure(self, func):
+        """Return the best of `repeat` timings, so stalls do not skew ratios"""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
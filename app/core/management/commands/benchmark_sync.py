@@ -0,0 +1,110 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Change, Product, Store, StoreProduct
+from change.serializers import ChangeValuesSerializer
+from product.serializers import ProductValuesSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare change feed sync against a full re-download"""
+
+    help = (
+        'Benchmark incremental sync from the change log against downloading '
+        'all stock'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', type=int, default=20)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--changes', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            since = self.populate(
+                options['stores'], options['products'], options['changes']
+            )
+
+            full_seconds, full_bytes = self.measure(self.full_download)
+            delta_seconds, delta_bytes = self.measure(
+                lambda: self.delta_download(since)
+            )
+
+            self.stdout.write(
+                f'full re-download: {full_bytes:,} bytes '
+                f'in {full_seconds * 1000:.1f} ms'
+            )
+            self.stdout.write(
+                f'change feed: {delta_bytes:,} bytes '
+                f'in {delta_seconds * 1000:.1f} ms '
+                f'({full_bytes / delta_bytes:.1f}x fewer bytes, '
+                f'{full_seconds / delta_seconds:.1f}x faster)'
+            )
+            transaction.set_rollback(True)
+
+    def populate(self, stores, products, changes):
+        """Create stock for every store and product, then `changes` changes"""
+        supplier = get_user_model().objects.create(
+            email='bench-supplier@bench.local', user_type='Supplier'
+        )
+        Store.objects.bulk_create(
+            Store(name=f'bench-store-{i}', city='Cairo') for i in range(stores)
+        )
+        Product.objects.bulk_create(
+            Product(
+                supplier_id=supplier, name=f'bench-product-{i}', price='10.00'
+            )
+            for i in range(products)
+        )
+        store_ids = list(
+            Store.objects.filter(name__startswith='bench-store-').values_list(
+                'id', flat=True
+            )
+        )
+        product_ids = list(
+            Product.objects.filter(supplier_id=supplier).values_list(
+                'id', flat=True
+            )
+        )
+        StoreProduct.objects.bulk_create(
+            StoreProduct(
+                store_id_id=store_id, product_id_id=product_id, quantity=100
+            )
+            for store_id in store_ids
+            for product_id in product_ids
+        )
+
+        latest = Change.objects.order_by('-seq').values_list('seq', flat=True)
+        since = latest.first() or 0
+        Change.objects.bulk_create(
+            Change(
+                kind=Change.STOCK,
+                store_id=store_ids[i % len(store_ids)],
+                product_id=product_ids[i % len(product_ids)],
+                quantity=99,
+            )
+            for i in range(changes)
+        )
+        return since
+
+    def full_download(self):
+        products = ProductValuesSerializer(Product.objects.all()).data
+        stock = list(
+            StoreProduct.objects.values('store_id', 'product_id', 'quantity')
+        )
+        return JSONRenderer().render({'products': products, 'stock': stock})
+
+    def delta_download(self, since):
+        changes = ChangeValuesSerializer(
+            Change.objects.filter(seq__gt=since).order_by('seq')
+        ).data
+        return JSONRenderer().render({'changes': changes})
+
+    def measure(self, func):
+        start = time.perf_counter()
+        body = func()
+        return time.perf_counter() - start, len(body)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+
+from core import throttling
+
+
+class Command(BaseCommand):
+    """Django command to measure the overhead of the API throttle"""
+
+    help = (
+        'Benchmark the token-bucket throttle with and without its process-'
+        'local fast path'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000)
+        parser.add_argument('--capacity', type=int, default=1200)
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        capacity = options['capacity']
+        # A refill rate that never runs dry, so every request takes the path
+        # being measured
+        rate = requests * 10.0
+        lease_fraction = throttling.LEASE_FRACTION
+        try:
+            fast = self.measure('benchmark:fast', capacity, rate, requests)
+            throttling.LEASE_FRACTION = 0
+            shared = self.measure('benchmark:shared', capacity, rate, requests)
+        finally:
+            throttling.LEASE_FRACTION = lease_fraction
+            cache.delete_many(['benchmark:fast', 'benchmark:shared'])
+
+        backend = caches['default'].__class__.__name__
+        self.stdout.write(
+            f'{requests} requests | {backend} | '
+            f'fast path {fast / requests * 1e6:.2f} us/request | '
+            f'shared cache only {shared / requests * 1e6:.2f} us/request '
+            f'({shared / fast:.1f}x)'
+        )
+
+    def measure(self, key, capacity, rate, requests):
+        throttling._buckets.pop(key, None)
+        start = time.perf_counter()
+        for _ in range(requests):
+            throttling.allow(key, capacity, rate)
+        return time.perf_counter() - start
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Change
+
+
+class Command(BaseCommand):
+    """Django command to drop superseded change log entries"""
+
+    help = (
+        'Delete change log entries older than --days that a newer entry for '
+        'the same row supersedes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        latest = (
+            Change.objects.values('kind', 'store_id', 'product_id')
+            .annotate(last=Max('seq'))
+            .values('last')
+        )
+        deleted, _ = (
+            Change.objects.filter(created_at__lt=cutoff)
+            .exclude(seq__in=latest)
+            .delete()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Compacted {deleted} change log entries.')
+        )
@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    """Django command to create upcoming monthly transaction partitions"""
+
+    help = 'Create monthly partitions of the transaction tables ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='First month to create, as YYYY-MM (default: this month)',
+        )
+        parser.add_argument('--months', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if not partitions.supports_partitioning(connection):
+            raise CommandError(
+                'Partitioning is only supported on Postgres 11 or later.'
+            )
+
+        if options['start']:
+            start = datetime.datetime.strptime(
+                options['start'], '%Y-%m'
+            ).date()
+        else:
+            start = partitions.month_start(datetime.date.today())
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table in partitions.PARTITIONED_TABLES:
+                for offset in range(options['months']):
+                    partitions.create_partition(
+                        cursor, table, partitions.add_months(start, offset)
+                    )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Partitions ready for {options["months"]} months '
+                f'from {start:%Y-%m}.'
+            )
+        )
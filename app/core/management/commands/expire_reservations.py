@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Reservation
+
+
+class Command(BaseCommand):
+    """Django command to release the stock of expired reservations"""
+
+    help = (
+        'Expire overdue reservations in batches; with --loop keep sweeping '
+        'every --loop seconds'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--loop', type=float, help='Seconds to wait between sweeps'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = 0
+            while True:
+                batch = Reservation.objects.expire(
+                    batch_size=options['batch_size']
+                )
+                expired += batch
+                if batch < options['batch_size']:
+                    break
+            self.stdout.write(f'Expired {expired} reservations.')
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
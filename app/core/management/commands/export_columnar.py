@@ -0,0 +1,60 @@
+import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core import columnar
+
+
+class Command(BaseCommand):
+    """Django command to move cold transactions to the columnar archive"""
+
+    help = (
+        'Export transactions created before --before to a columnar archive '
+        'directory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            required=True,
+            help='Archive directory, created if missing',
+        )
+        parser.add_argument(
+            '--before',
+            required=True,
+            help='Export rows created before this date, as YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--chunk-rows', type=int, default=columnar.CHUNK_ROWS
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the exported rows from the database',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            archive = columnar.ColumnarArchive(options['dir'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        before = datetime.datetime.strptime(
+            options['before'], '%Y-%m-%d'
+        ).replace(tzinfo=datetime.timezone.utc)
+
+        try:
+            transactions, lines = columnar.export_transactions(
+                archive,
+                before,
+                chunk_rows=options['chunk_rows'],
+                delete=options['delete'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Exported {transactions} transactions and {lines} lines '
+                f'to {options["dir"]}.'
+            )
+        )
@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from store import forecasting
+
+
+class Command(BaseCommand):
+    """Django command to recompute reorder suggestions from OUT history"""
+
+    help = (
+        'Forecast demand and write reorder suggestions for every store, or '
+        'only the given --store ids'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store',
+            type=int,
+            action='append',
+            dest='stores',
+            help='Store id, repeatable',
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            written = forecasting.run_forecast(
+                options['stores'], workers=options['workers']
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote {written} reorder suggestions in {elapsed:.1f}s.'
+            )
+        )
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Django command to report where process startup time goes"""
+
+    help = (
+        'Start a fresh interpreter, run django.setup() (and optionally import '
+        'the URLconf) and report the time of each setup phase per app, import '
+        'time aggregated per package and the slowest modules.'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--urlconf',
+            action='store_true',
+            help='Also import the URLconf, as a web worker does',
+        )
+        parser.add_argument(
+            '--import',
+            dest='imports',
+            action='append',
+            default=[],
+            help='Also import this module',
+        )
+        parser.add_argument(
+            '--depth',
+            type=int,
+            default=1,
+            help='Package depth to aggregate import time at',
+        )
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument(
+            '--json', action='store_true', help='Print the raw report as JSON'
+        )
+
+    def handle(self, *args, **options):
+        command = [sys.executable, '-m', 'core.importtime']
+        if options['urlconf']:
+            command.append('--urlconf')
+        for name in options['imports']:
+            command += ['--import', name]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+        }
+        process = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(f'Profiling failed:\n{process.stderr}')
+        report = json.loads(process.stdout)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write('Phases (ms)')
+        for phase, elapsed in report['phases'].items():
+            self.stdout.write(f'  {phase:<40} {elapsed * 1000:9.1f}')
+
+        self.stdout.write(
+            f'\n{"Apps (ms)":<42}{"config":>10}{"models":>10}{"ready":>10}'
+        )
+        for label, phases in sorted(
+            report['apps'].items(), key=lambda item: -sum(item[1].values())
+        ):
+            columns = ''.join(
+                f' {phases.get(phase, 0) * 1000:9.1f}'
+                for phase in ('config', 'models', 'ready')
+            )
+            self.stdout.write(f'  {label:<40}{columns}')
+
+        packages = defaultdict(lambda: [0.0, 0])
+        for name, times in report['modules'].items():
+            package = packages['.'.join(name.split('.')[:options['depth']])]
+            package[0] += times['self']
+            package[1] += 1
+        self.stdout.write(
+            f'\nPackages by import time (ms, {len(report["modules"])} modules)'
+        )
+        for package, (elapsed, count) in sorted(
+            packages.items(), key=lambda item: -item[1][0]
+        )[:options['limit']]:
+            self.stdout.write(
+                f'  {package:<40} {elapsed * 1000:9.1f} {count:6d} modules'
+            )
+
+        self.stdout.write(
+            f'\n{"Slowest modules (ms)":<42}{"self":>10}{"cumulative":>13}'
+        )
+        slowest = sorted(
+            report['modules'].items(), key=lambda item: -item[1]['self']
+        )[:options['limit']]
+        for name, times in slowest:
+            self_ms, cumulative_ms = (
+                times['self'] * 1000, times['cumulative'] * 1000
+            )
+            self.stdout.write(
+                f'  {name:<40} {self_ms:9.1f}   {cumulative_ms:9.1f}'
+            )
@@ -0,0 +1,145 @@
+from collections import defaultdict, deque
+from decimal import Decimal
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import (
+    CostLayer, CountSession, GoodsReceipt, Product, ProductPrice, StoreProduct,
+    TransactionProduct,
+)
+
+
+class Command(BaseCommand):
+    """Django command to rebuild cost layers by replaying the ledger"""
+
+    help = (
+        'Recompute every cost layer and the average/FIFO costs of every '
+        'StoreProduct from the transaction history. Run it while no '
+        'transactions are being written.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        store_products = {
+            (row.store_id_id, row.product_id_id): row
+            for row in StoreProduct.objects.select_for_update()
+        }
+        for store_product in store_products.values():
+            store_product.average_cost = Decimal(0)
+            store_product.fifo_value = Decimal(0)
+        prices = dict(Product.objects.values_list('id', 'price'))
+        # Receipts were costed at their order lines and count overages at the
+        # average cost when they were posted
+        receipt_lines = GoodsReceipt.objects.values_list(
+            'trx_id', 'order__lines__product_id', 'order__lines__unit_cost'
+        )
+        receipt_costs = {
+            (trx_id, product_id): unit_cost
+            for trx_id, product_id, unit_cost in receipt_lines
+        }
+        count_adjustments = set(
+            CountSession.objects.filter(
+                adjustment_in__isnull=False
+            ).values_list('adjustment_in_id', flat=True)
+        )
+
+        on_hand = defaultdict(int)
+        open_layers = defaultdict(deque)
+        transfer_portions = {}
+        layers = []
+
+        history = (
+            TransactionProduct.objects.order_by('created_at', 'trx_id', 'id')
+            .values_list(
+                'trx_id',
+                'trx_id__store_id',
+                'trx_id__trx_type',
+                'trx_id__amount',
+                'trx_id__counterpart_id',
+                'product_id',
+                'quantity',
+                'created_at',
+            )
+            .iterator(chunk_size=options['batch_size'])
+        )
+
+        for trx_id, lines in groupby(history, key=lambda line: line[0]):
+            lines = list(lines)
+            for line in lines:
+                (_, store_id, trx_type, amount, counterpart_id, product_id,
+                 quantity, created_at) = line
+                key = (store_id, product_id)
+                store_product = store_products.get(key)
+                if store_product is None:
+                    store_product = store_products[key] = StoreProduct(
+                        store_id_id=store_id, product_id_id=product_id,
+                        quantity=0,
+                    )
+                if trx_type == 'OUT':
+                    portions = CostLayer.objects.take(
+                        store_product, open_layers[key], quantity
+                    )
+                    while (
+                        open_layers[key] and not open_layers[key][0].remaining
+                    ):
+                        open_layers[key].popleft()
+                    if counterpart_id is not None:
+                        transfer_portions[(trx_id, product_id)] = portions
+                    on_hand[key] -= quantity
+                    continue
+
+                if (
+                    counterpart_id is not None
+                    and (counterpart_id, product_id) in transfer_portions
+                ):
+                    portions = transfer_portions.pop(
+                        (counterpart_id, product_id)
+                    )
+                elif (trx_id, product_id) in receipt_costs:
+                    portions = [
+                        (receipt_costs[(trx_id, product_id)], quantity)
+                    ]
+                elif trx_id in count_adjustments:
+                    unit_cost = store_product.average_cost
+                    if not unit_cost:
+                        unit_cost = ProductPrice.objects.prices_at(
+                            [product_id], created_at
+                        )[product_id]
+                    portions = [(unit_cost, quantity)]
+                elif len(lines) == 1 and quantity:
+                    portions = [(amount / quantity, quantity)]
+                else:
+                    portions = [(prices[product_id], quantity)]
+                for unit_cost, portion in portions:
+                    if not portion:
+                        continue
+                    layer = CostLayer.objects.add_layer(
+                        store_product,
+                        on_hand[key],
+                        trx_id,
+                        created_at,
+                        portion,
+                        unit_cost,
+                    )
+                    layers.append(layer)
+                    open_layers[key].append(layer)
+                    on_hand[key] += portion
+
+        CostLayer.objects.all().delete()
+        CostLayer.objects.bulk_create(layers, batch_size=options['batch_size'])
+        StoreProduct.objects.bulk_update(
+            [row for row in store_products.values() if row.pk is not None],
+            ['average_cost', 'fifo_value'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {len(layers)} cost layers '
+                f'for {len(store_products)} store products.'
+            )
+        )
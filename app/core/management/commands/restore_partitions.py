@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    """Django command to re-attach partitions written by archive_partitions"""
+
+    help = 'Restore archived monthly transaction partitions from gzip files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='Archive files written by archive_partitions',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.supports_partitioning(connection):
+            raise CommandError(
+                'Partitioning is only supported on Postgres 11 or later.'
+            )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for path in options['files']:
+                table, month, rows = partitions.restore_partition(cursor, path)
+                self.stdout.write(
+                    f'Restored {rows} rows into {table} for {month:%Y-%m}'
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f'Restored {len(options["files"])} partitions.')
+        )
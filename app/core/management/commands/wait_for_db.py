@@ -1,20 +1,50 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import check_database, reset_connection
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
+    # System checks import the whole URLconf; skip them to start fast
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before giving up',
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
 
-    def handle(self, *args, **options ):
+    def handle(self, *args, **options):
+        """Run SELECT 1 until it succeeds, backing off exponentially"""
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting for 1 second...')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Database available!'))
\ No newline at end of file
+                check_database(options['database'])
+                break
+            except OperationalError as error:
+                reset_connection(options['database'])
+                # Equal jitter: wait between half and all of the current delay
+                pause = delay / 2 + random.uniform(0, delay / 2)
+                if time.monotonic() + pause > deadline:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]:g} '
+                        f'seconds: {error}'
+                    )
+                self.stdout.write(
+                    f'Database unavailable, waiting {pause:.2f} seconds...'
+                )
+                time.sleep(pause)
+                delay = min(delay * 2, options['max_delay'])
+        self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,29 @@
+from core import audit
+from core.mixins import pin_to_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PinPrimaryAfterWriteMiddleware:
+    """Pin users to the primary database for a while after a successful write
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+        return response
+
+
+class AuditActorMiddleware:
+    """Make the user of the current request the actor of its audit records"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit.serving(request):
+            return self.get_response(request)
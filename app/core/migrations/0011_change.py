@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_auto_20261019_1651'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=10)),
+                ('action', models.CharField(default='upsert', max_length=10)),
+                ('store_id', models.IntegerField(null=True)),
+                ('product_id', models.IntegerField()),
+                ('quantity', models.IntegerField(null=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'store_id', 'product_id', 'seq'], name='core_change_kind_a04eca_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeproduct',
+            name='reorder_point',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reorder_point', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.store')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(fields=['store', '-created_at'], name='core_stocka_store_i_12c346_idx'),
+        ),
+    ]
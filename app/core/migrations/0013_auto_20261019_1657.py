@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:57
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+
+def merge_duplicate_store_products(apps, schema_editor):
+    """Sum the quantities of duplicate (store, product) rows into the oldest one"""
+    StoreProduct = apps.get_model('core', 'StoreProduct')
+    duplicates = (
+        StoreProduct.objects.values('store_id', 'product_id')
+        .annotate(rows=Count('id'), keep=Min('id'), quantity=Sum('quantity'), reorder_point=Max('reorder_point'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = StoreProduct.objects.filter(store_id=duplicate['store_id'], product_id=duplicate['product_id'])
+        rows.filter(id=duplicate['keep']).update(
+            quantity=duplicate['quantity'], reorder_point=duplicate['reorder_point'],
+        )
+        rows.exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_auto_20261019_1655'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='counterpart',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.transaction'),
+        ),
+        migrations.RunPython(merge_duplicate_store_products, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='storeproduct',
+            constraint=models.UniqueConstraint(fields=('store_id', 'product_id'), name='unique_store_product'),
+        ),
+    ]
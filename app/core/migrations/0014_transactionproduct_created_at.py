@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:04
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def copy_transaction_dates(apps, schema_editor):
+    """Give existing transaction products the created_at of their transaction"""
+    Transaction = apps.get_model('core', 'Transaction')
+    TransactionProduct = apps.get_model('core', 'TransactionProduct')
+    TransactionProduct.objects.update(
+        created_at=Subquery(Transaction.objects.filter(pk=OuterRef('trx_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_auto_20261019_1657'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionproduct',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='counterpart',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.transaction'),
+        ),
+        migrations.AlterField(
+            model_name='transactionproduct',
+            name='trx_id',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='core.transaction'),
+        ),
+        migrations.RunPython(copy_transaction_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from core import partitions
+
+
+def partition_tables(apps, schema_editor):
+    """Rebuild the transaction tables as monthly partitioned tables on Postgres 11 or later"""
+    if not partitions.supports_partitioning(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in partitions.PARTITIONED_TABLES:
+            partitions.partition_by_created_at(cursor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_transactionproduct_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_partition_transactions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField()),
+                ('moving_average', models.FloatField()),
+                ('forecast', models.FloatField()),
+                ('safety_stock', models.IntegerField()),
+                ('reorder_point', models.IntegerField()),
+                ('suggested_quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.store')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reordersuggestion',
+            index=models.Index(fields=['store', '-suggested_quantity'], name='core_reorde_store_i_269df8_idx'),
+        ),
+    ]
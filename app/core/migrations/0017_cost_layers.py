@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_reordersuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeproduct',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='storeproduct',
+            name='fifo_value',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=16),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('remaining', models.IntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.store')),
+                ('trx', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.transaction')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='costlayer',
+            index=models.Index(condition=models.Q(('remaining__gt', 0)), fields=['store', 'product', 'created_at', 'id'], name='costlayer_open_idx'),
+        ),
+    ]
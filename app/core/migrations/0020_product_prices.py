@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_current_prices(apps, schema_editor):
+    """Start the price history of existing products with their current price"""
+    Product = apps.get_model('core', 'Product')
+    ProductPrice = apps.get_model('core', 'ProductPrice')
+    ProductPrice.objects.bulk_create(
+        (
+            ProductPrice(product_id=product_id, price=price, effective_from=created_at, created_at=created_at)
+            for product_id, price, created_at in Product.objects.values_list('id', 'price', 'created_at').iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPrice',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('effective_from', models.DateTimeField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='core.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productprice',
+            constraint=models.UniqueConstraint(fields=('product', 'effective_from'), include=('price',), name='unique_product_price_effective_from'),
+        ),
+        migrations.RunPython(record_current_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:39
+
+from django.db import migrations
+
+INDEX = 'unique_product_price_effective_from'
+
+
+def add_unique_without_include(apps, schema_editor):
+    """Enforce unique prices where the covering unique constraint of 0020 was skipped
+
+    Django leaves out a UniqueConstraint with `include` on databases without
+    covering indexes, such as the SQLite test database. The same columns
+    are made unique there without the included price. Postgres keeps the
+    covering constraint.
+    """
+    if schema_editor.connection.features.supports_covering_indexes:
+        return
+    schema_editor.execute(f'CREATE UNIQUE INDEX {INDEX} ON core_productprice (product_id, effective_from)')
+
+
+def drop_unique_without_include(apps, schema_editor):
+    if schema_editor.connection.features.supports_covering_indexes:
+        return
+    schema_editor.execute(f'DROP INDEX {INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_product_prices'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_unique_without_include, drop_unique_without_include),
+    ]
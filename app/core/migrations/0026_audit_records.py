@@ -0,0 +1,57 @@
+# Generated by Django 3.2.25 on 2026-10-19 18:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def make_append_only(apps, schema_editor):
+    """Reject UPDATE and DELETE of audit records on Postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE FUNCTION core_auditrecord_append_only() RETURNS trigger AS $$ "
+        "BEGIN RAISE EXCEPTION 'audit records are append-only'; END; $$ LANGUAGE plpgsql"
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER core_auditrecord_append_only BEFORE UPDATE OR DELETE ON core_auditrecord '
+        'FOR EACH ROW EXECUTE PROCEDURE core_auditrecord_append_only()'
+    )
+
+
+def drop_append_only(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TRIGGER core_auditrecord_append_only ON core_auditrecord')
+    schema_editor.execute('DROP FUNCTION core_auditrecord_append_only()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_purchase_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('store_id', models.IntegerField(null=True)),
+                ('product_id', models.IntegerField(null=True)),
+                ('old_value', models.DecimalField(decimal_places=4, max_digits=16, null=True)),
+                ('new_value', models.DecimalField(decimal_places=4, max_digits=16)),
+                ('actor_id', models.IntegerField(null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='auditrecord',
+            index=models.Index(fields=['kind', 'store_id', 'product_id', 'created_at'], name='audit_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditrecord',
+            index=models.Index(fields=['created_at'], name='audit_created_at_idx'),
+        ),
+        migrations.RunPython(make_append_only, drop_append_only),
+    ]
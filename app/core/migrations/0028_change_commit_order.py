@@ -0,0 +1,89 @@
+# Generated by Django 3.2.25 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+# Advisory lock serializing the commits of transactions that write change log rows
+COMMIT_LOCK = 280028
+
+
+def stamp_commits(apps, schema_editor):
+    """Stamp change log rows with a sequence number taken as their transaction commits
+
+    On Postgres a deferred constraint trigger runs at commit. It takes
+    COMMIT_LOCK, which is held until the commit completes, draws one
+    commit_seq and stamps every unstamped row of the transaction with it.
+    Later row triggers of the same transaction skip rows that are already
+    stamped. If constraints are set IMMEDIATE, each row is stamped as it is
+    inserted. SQLite runs one writer at a time, so seq already follows
+    commit order there.
+    """
+    schema_editor.execute('UPDATE core_change SET commit_seq = seq')
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE TRIGGER core_change_stamp_commit AFTER INSERT ON core_change BEGIN '
+            'UPDATE core_change SET commit_seq = NEW.seq WHERE seq = NEW.seq; END'
+        )
+        return
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE SEQUENCE core_change_commit_seq')
+    schema_editor.execute(
+        "SELECT setval('core_change_commit_seq', COALESCE(MAX(seq), 0) + 1, false) FROM core_change"
+    )
+    schema_editor.execute(f"""
+        CREATE FUNCTION core_change_stamp_commit() RETURNS trigger AS $$
+        DECLARE
+            stamped bigint := COALESCE(NULLIF(current_setting('core.change_stamped', true), '')::bigint, 0);
+            stamp bigint;
+        BEGIN
+            IF NEW.seq <= stamped THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_advisory_xact_lock({COMMIT_LOCK});
+            stamp := nextval('core_change_commit_seq');
+            WITH updated AS (
+                UPDATE core_change SET commit_seq = stamp WHERE commit_seq IS NULL RETURNING seq
+            )
+            SELECT MAX(seq) INTO stamped FROM updated;
+            PERFORM set_config('core.change_stamped', stamped::text, true);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute(
+        'CREATE CONSTRAINT TRIGGER core_change_stamp_commit AFTER INSERT ON core_change '
+        'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE PROCEDURE core_change_stamp_commit()'
+    )
+
+
+def drop_commit_stamps(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TRIGGER core_change_stamp_commit')
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TRIGGER core_change_stamp_commit ON core_change')
+        schema_editor.execute('DROP FUNCTION core_change_stamp_commit()')
+        schema_editor.execute('DROP SEQUENCE core_change_commit_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_transaction_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='commit_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['commit_seq', 'seq'], name='change_commit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(condition=models.Q(('commit_seq', None)), fields=['seq'], name='change_uncommitted_idx'),
+        ),
+        migrations.RunPython(stamp_commits, drop_commit_stamps),
+    ]
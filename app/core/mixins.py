@@ -0,0 +1,124 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from core.routers import replica_reads
+
+
+class FastListModelMixin:
+    """Serve list() through a ValuesSerializer instead of the model serializer
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.values_serializer_class(queryset)
+        rows = serializer.prepare(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+
+        return Response(serializer.to_representation(rows))
+
+
+def pin_key(user):
+    return f'db-pinned:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Keep `user` reading from the primary for a while after a write
+
+    The pin lasts REPLICA_PIN_SECONDS.
+    """
+    if user.is_authenticated and settings.DATABASE_REPLICAS:
+        cache.set(pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and cache.get(pin_key(user), False)
+
+
+class ReplicaReadMixin:
+    """Run `replica_actions` on a replica unless the user wrote recently"""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_reads = None
+        pinned = is_pinned_to_primary(request.user)
+        if self.action in self.replica_actions and not pinned:
+            self._replica_reads = replica_reads()
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_reads_block = getattr(self, '_replica_reads', None)
+        if replica_reads_block is not None:
+            self._replica_reads = None
+            replica_reads_block.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match on list() and retrieve()
+
+    The version of a queryset is its row count plus the latest value of
+    each of `version_fields`, read with a single aggregate query, so a
+    304 is returned before anything is serialized. No Last-Modified is
+    sent: a delete or a second write within the same second leaves the
+    latest timestamp unchanged, so If-Modified-Since would serve stale lists.
+    """
+    version_fields = ('updated_at',)
+
+    def get_version(self, queryset):
+        """Return the ETag of `queryset`"""
+        aggregates = {
+            f'max_{i}': Max(field)
+            for i, field in enumerate(self.version_fields)
+        }
+        version = queryset.order_by().aggregate(
+            count=Count('pk'), **aggregates
+        )
+        if not version['count']:
+            return None
+
+        stamps = [
+            version[key] for key in aggregates if version[key] is not None
+        ]
+        key = ':'.join(str(value) for value in (
+            self.request.user.pk,
+            self.request.accepted_renderer.format,
+            version['count'],
+            *stamps,
+        ))
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def conditional(self, queryset, handler, *args, **kwargs):
+        etag = self.get_version(queryset)
+        response = get_conditional_response(self.request, etag=etag)
+        if response is not None:
+            return response
+
+        response = handler(self.request, *args, **kwargs)
+        if response.status_code == 200 and etag:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional(queryset, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional(queryset, super().retrieve, *args, **kwargs)
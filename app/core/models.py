@@ -1,6 +1,16 @@
+from collections import defaultdict
+from decimal import Decimal
+
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser, PermissionsMixin
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Exists, F, Func, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.conf import settings
+from django.utils import timezone
+
+from core import events
+from core.bulk import update_from_values
+from core.versions import bump_catalog_version, bump_stock_version
 
 
 class UserManager(BaseUserManager):
@@ -39,6 +49,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     user_type = models.CharField(max_length=10)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
@@ -50,17 +61,160 @@ class Store(models.Model):
     name = models.CharField(max_length=255, unique=True)
     city = models.CharField(max_length=25)
     cash = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'{self.city} - {self.name}'
 
 
+class CategoryManager(models.Manager):
+    """Maintain the materialized paths of the category tree
+
+    The path of a category is the ids of its ancestors and its own id, each
+    followed by '/', so a subtree is every category whose path starts with
+    the path of its root, one prefix scan of the path index.
+    """
+
+    def add(self, name, parent=None):
+        """Create a category under `parent` (a root category if None)"""
+        with transaction.atomic():
+            category = self.create(
+                name=name,
+                parent=parent,
+                depth=parent.depth + 1 if parent else 0,
+            )
+            category.path = f'{parent.path if parent else ""}{category.pk}/'
+            self.filter(pk=category.pk).update(path=category.path)
+            return category
+
+    def move(self, category, parent):
+        """Move `category` and its subtree under `parent` with one UPDATE"""
+        with transaction.atomic():
+            locked = {
+                row.pk: row for row in self.select_for_update().filter(
+                    pk__in=[category.pk] + ([parent.pk] if parent else [])
+                ).order_by('pk')
+            }
+            category = locked[category.pk]
+            parent = locked[parent.pk] if parent else None
+            if parent is not None and parent.path.startswith(category.path):
+                raise ValueError(
+                    'A category cannot be moved under itself or its '
+                    'descendants.'
+                )
+
+            path = f'{parent.path if parent else ""}{category.pk}/'
+            depth = parent.depth + 1 if parent else 0
+            self.filter(path__startswith=category.path).update(
+                path=Concat(
+                    Value(path), Substr('path', len(category.path) + 1)
+                ),
+                depth=F('depth') + (depth - category.depth),
+            )
+            self.filter(pk=category.pk).update(parent=parent)
+            category.parent, category.path, category.depth = (
+                parent,
+                path,
+                depth,
+            )
+            return category
+
+    def products(self, category, store=None):
+        """Return the products in the subtree of `category`
+
+        Only those available to promise in `store` are returned if it is given.
+        """
+        products = Product.objects.filter(
+            category__path__startswith=category.path
+        )
+        if store is not None:
+            products = products.filter(
+                storeproduct__store_id=store,
+                storeproduct__quantity__gt=F('storeproduct__reserved'),
+            )
+        return products
+
+    def rollup(self, category, store=None, since=None):
+        """Return `category` and its children with subtree stock and sales
+
+        Each row carries `stock_units` and `stock_value` (FIFO) on hand, in
+        `store` or all stores, and `sales_units` sold since `since`, computed
+        by correlated subqueries in the same query.
+        """
+        in_subtree = Q(product_id__category__path__startswith=OuterRef('path'))
+        stock = StoreProduct.objects.filter(in_subtree)
+        sales = TransactionProduct.objects.filter(
+            in_subtree, trx_id__trx_type='OUT'
+        )
+        if store is not None:
+            stock = stock.filter(store_id=store)
+            sales = sales.filter(trx_id__store=store)
+        if since is not None:
+            sales = sales.filter(created_at__gte=since)
+
+        def total(queryset, field):
+            return Subquery(
+                queryset.annotate(total=Func(F(field), function='SUM')).values(
+                    'total'
+                )[:1]
+            )
+
+        return (
+            self.filter(Q(pk=category.pk) | Q(parent=category))
+            .annotate(
+                stock_units=Coalesce(total(stock, 'quantity'), 0),
+                stock_value=Coalesce(
+                    total(stock, 'fifo_value'),
+                    Value(Decimal(0)),
+                    output_field=models.DecimalField(),
+                ),
+                sales_units=Coalesce(total(sales, 'quantity'), 0),
+            )
+            .order_by('path')
+        )
+
+
+class Category(models.Model):
+    """Product category, a node of the category tree"""
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='children',
+    )
+    path = models.CharField(max_length=255, default='')
+    depth = models.IntegerField(default=0)
+
+    objects = CategoryManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['path'],
+                name='category_path_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Product(models.Model):
     """product Model"""
     supplier_id = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    category = models.ForeignKey(
+        Category,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='products',
+    )
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     image = models.CharField(max_length=255, blank=True)
@@ -68,21 +222,210 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
 
+class ProductVariant(models.Model):
+    """Sellable size/color of a product, identified by its barcode
+
+    Barcodes are stored as 14-digit GTINs, so the UPC-A, EAN-13 and GTIN-14
+    forms of the same code are one entry of the barcode unique index.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='variants'
+    )
+    size = models.CharField(max_length=25, blank=True)
+    color = models.CharField(max_length=25, blank=True)
+    barcode = models.CharField(max_length=14)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['barcode'], name='unique_variant_barcode'
+            ),
+            models.UniqueConstraint(
+                fields=['product', 'size', 'color'],
+                name='unique_product_variant',
+            ),
+        ]
+
+
+class ProductPriceManager(models.Manager):
+    """Look up and change effective-dated product prices
+
+    Product.price always holds the price in effect now; products without
+    any price row fall back to it.
+    """
+
+    def price_at(self, product_ref, at):
+        """Return an expression for the price of `product_ref` at `at`
+
+        Both arguments may be OuterRefs, so a queryset of many products or
+        transaction lines is priced in one query, each row reading a single
+        entry of the (product, effective_from) index.
+        """
+        prices = self.filter(
+            product=product_ref, effective_from__lte=at
+        ).order_by('-effective_from')
+        return Subquery(prices.values('price')[:1])
+
+    def prices_at(self, product_ids, at):
+        """Return {product id: price in effect at `at`} for `product_ids`"""
+        return dict(
+            Product.objects.filter(id__in=product_ids).annotate(
+                price_at=Coalesce(self.price_at(OuterRef('pk'), at), 'price'),
+            ).values_list('id', 'price_at')
+        )
+
+    def record(self, product, effective_from=None):
+        """Record the price of `product` from `effective_from` (default now)"""
+        return self.create(
+            product=product,
+            price=product.price,
+            effective_from=effective_from or timezone.now(),
+        )
+
+    def reprice(self, products, percent, effective_from=None):
+        """Change the price of every product in `products` by `percent`
+
+        The new price rows are written with one INSERT ... SELECT; prices
+        that are already in effect are then applied to Product.price.
+        Returns the number of products repriced.
+        """
+        now = timezone.now()
+        effective_from = effective_from or now
+        factor = (Decimal(100) + Decimal(percent)) / 100
+        rows = (
+            products.order_by()
+            .annotate(
+                new_price=Func(
+                    F('price') * Value(
+                        factor, output_field=models.DecimalField()
+                    ),
+                    Value(2),
+                    function='ROUND',
+                    output_field=models.DecimalField(
+                        max_digits=8, decimal_places=2
+                    ),
+                ),
+                effective=Value(
+                    effective_from, output_field=models.DateTimeField()
+                ),
+                recorded=Value(now, output_field=models.DateTimeField()),
+            )
+            .values_list('id', 'new_price', 'effective', 'recorded')
+        )
+        sql, params = rows.query.sql_with_params()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {self.model._meta.db_table} '
+                    f'(product_id, price, effective_from, created_at) {sql} '
+                    'ON CONFLICT (product_id, effective_from) '
+                    'DO UPDATE SET price = EXCLUDED.price',
+                    params,
+                )
+                repriced = cursor.rowcount
+            if effective_from <= now:
+                self.apply(now, products)
+        return repriced
+
+    def apply(self, now=None, products=None):
+        """Bring Product.price in line with the prices in effect at `now`
+
+        Run periodically to apply prices scheduled for the future.
+        """
+        from core import audit
+
+        now = now or timezone.now()
+        products = Product.objects.all() if products is None else products
+        changed = list(
+            products.annotate(current=self.price_at(OuterRef('pk'), now))
+            .exclude(current=None)
+            .exclude(current=F('price'))
+            .values_list('id', 'price', 'current')
+        )
+        if not changed:
+            return 0
+        updated = [
+            Product(id=product_id, price=price, updated_at=now)
+            for product_id, _, price in changed
+        ]
+        update_from_values(Product, updated, ['price', 'updated_at'])
+        Change.objects.bulk_create(
+            Change(
+                kind=Change.PRODUCT, product_id=product.id, price=product.price
+            )
+            for product in updated
+        )
+        audit.record(
+            audit.price_change(product_id, old, price)
+            for product_id, old, price in changed
+        )
+        bump_catalog_version()
+        return len(updated)
+
+
+class ProductPrice(models.Model):
+    """Price of a product from `effective_from` until the product's next row"""
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='prices'
+    )
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+    effective_from = models.DateTimeField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ProductPriceManager()
+
+    class Meta:
+        constraints = [
+            # Lets Postgres answer price_at() with an index-only probe.
+            # Databases without INCLUDE skip it, so migration 0021 adds a plain
+            # unique index there.
+            models.UniqueConstraint(
+                fields=['product', 'effective_from'],
+                include=['price'],
+                name='unique_product_price_effective_from',
+            ),
+        ]
+
+
 class Transaction(models.Model):
     """Transaction Model"""
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE, related_name='admin_user')
     party = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='party_user')
     store = models.ForeignKey(Store, on_delete=models.CASCADE)
     trx_type = models.CharField(max_length=10)
-    amount = models.DecimalField(max_digits=8, decimal_places=2)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    counterpart = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name='+',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'], name='transaction_created_idx'
+            ),
+        ]
+
+
+# Largest amount Transaction.amount can hold
+MAX_TRANSACTION_AMOUNT = Decimal('999999999999.99')
 
 
 class TransactionProduct(models.Model):
     """TransactionProduct Model"""
-    trx_id = models.ForeignKey(Transaction, on_delete=models.CASCADE)
+    trx_id = models.ForeignKey(
+        Transaction, on_delete=models.CASCADE, db_constraint=False
+    )
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
 
 
 class StoreProduct(models.Model):
@@ -90,4 +433,700 @@ class StoreProduct(models.Model):
     store_id = models.ForeignKey(Store, on_delete=models.CASCADE)
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
+    reorder_point = models.IntegerField(null=True, blank=True)
+    average_cost = models.DecimalField(
+        max_digits=12, decimal_places=4, default=0
+    )
+    fifo_value = models.DecimalField(
+        max_digits=16, decimal_places=4, default=0
+    )
+    reserved = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store_id', 'product_id'], name='unique_store_product'
+            ),
+        ]
+
+
+COST_PLACES = Decimal('0.0001')
+
+
+class CostLayerManager(models.Manager):
+    """Maintain FIFO cost layers and the running costs kept on StoreProduct
+
+    Callers pass StoreProducts whose quantity does not include the change
+    yet; the average cost and FIFO value are updated in memory and saved by
+    the caller together with the new quantity.
+    """
+
+    def receive(self, store_product, trx, quantity, unit_cost):
+        """Add a layer for `quantity` units received at `unit_cost`"""
+        return self.receive_many(
+            trx, [(store_product, [(unit_cost, quantity)])]
+        )[0]
+
+    def receive_many(self, trx, receipts):
+        """Add layers for [(store_product, [(cost, units), ...]), ...]"""
+        layers = []
+        for store_product, portions in receipts:
+            on_hand = store_product.quantity
+            for unit_cost, quantity in portions:
+                layers.append(
+                    self.add_layer(
+                        store_product,
+                        on_hand,
+                        trx.id,
+                        trx.created_at,
+                        quantity,
+                        unit_cost,
+                    )
+                )
+                on_hand += quantity
+        return self.bulk_create(layers)
+
+    def consume(self, store_product, quantity):
+        """Consume `quantity` units from the oldest open layers
+
+        Returns [(unit_cost, quantity), ...].
+        """
+        taken = self.consume_many([(store_product, quantity)])
+        return taken[store_product.product_id_id]
+
+    def consume_many(self, demands):
+        """Consume [(store_product, quantity), ...] of one store with one query
+
+        Returns {product id: [(unit_cost, quantity), ...]}.
+        """
+        open_layers = defaultdict(list)
+        for layer in (
+            self.select_for_update()
+            .filter(
+                store_id=demands[0][0].store_id_id,
+                product_id__in=[
+                    store_product.product_id_id for store_product, _ in demands
+                ],
+                remaining__gt=0,
+            )
+            .order_by('product_id', 'created_at', 'id')
+        ):
+            open_layers[layer.product_id].append(layer)
+
+        consumed, changed = {}, []
+        for store_product, quantity in demands:
+            layers = open_layers[store_product.product_id_id]
+            remaining = [layer.remaining for layer in layers]
+            consumed[store_product.product_id_id] = self.take(
+                store_product, layers, quantity
+            )
+            changed.extend(
+                layer
+                for layer, before in zip(layers, remaining)
+                if layer.remaining != before
+            )
+        if changed:
+            update_from_values(self.model, changed, ['remaining'])
+        return consumed
+
+    def add_layer(
+        self, store_product, on_hand, trx_id, created_at, quantity, unit_cost
+    ):
+        """Return an unsaved layer and fold it into `store_product`'s costs"""
+        unit_cost = Decimal(unit_cost).quantize(COST_PLACES)
+        on_hand = max(on_hand, 0)
+        if on_hand + quantity > 0:
+            store_product.average_cost = (
+                (store_product.average_cost * on_hand + unit_cost * quantity)
+                / (on_hand + quantity)
+            ).quantize(COST_PLACES)
+        store_product.fifo_value += unit_cost * quantity
+        return self.model(
+            store_id=store_product.store_id_id,
+            product_id=store_product.product_id_id,
+            trx_id=trx_id,
+            quantity=quantity,
+            remaining=quantity,
+            unit_cost=unit_cost,
+            created_at=created_at,
+        )
+
+    def take(self, store_product, layers, quantity):
+        """Consume `quantity` units from `layers`, oldest first, in memory
+
+        Units not covered by any layer (stock that predates cost tracking)
+        are costed at the average cost.
+        """
+        portions = []
+        for layer in layers:
+            if not quantity:
+                break
+            if not layer.remaining:
+                continue
+            taken = min(quantity, layer.remaining)
+            layer.remaining -= taken
+            quantity -= taken
+            portions.append((layer.unit_cost, taken))
+        store_product.fifo_value -= sum(
+            (unit_cost * taken for unit_cost, taken in portions), Decimal(0)
+        )
+        if quantity:
+            portions.append((store_product.average_cost, quantity))
+            store_product.fifo_value = Decimal(0)
+        return portions
+
+
+class CostLayer(models.Model):
+    """Units of a product received into a store at one cost, oldest first"""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    trx = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+    )
+    quantity = models.IntegerField()
+    remaining = models.IntegerField()
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = CostLayerManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['store', 'product', 'created_at', 'id'],
+                condition=models.Q(remaining__gt=0),
+                name='costlayer_open_idx',
+            ),
+        ]
+
+
+class LotManager(models.Manager):
+    """Track the lots (batches with an expiry date) making up a store's stock
+
+    Units are consumed first-expiry-first-out. Units not covered by any lot
+    (stock received without a lot code) are consumed after the lots run out.
+    """
+
+    def receive_many(self, store_id, receipts):
+        """Add [(product id, code, expires_on, quantity), ...] to store lots
+
+        Units received under an existing lot code are added to that lot; a
+        different expiry date for it raises ValueError. Existing lots are
+        locked and updated with one query; new lots are inserted with another.
+        """
+        receipts = [receipt for receipt in receipts if receipt[3] > 0]
+        if not receipts:
+            return []
+        existing = {
+            (lot.product_id, lot.code): lot
+            for lot in self.select_for_update()
+            .filter(
+                store_id=store_id,
+                product_id__in={
+                    product_id for product_id, _, _, _ in receipts
+                },
+                code__in={code for _, code, _, _ in receipts},
+            )
+            .order_by('id')
+        }
+        new = {}
+        for product_id, code, expires_on, quantity in receipts:
+            lot = existing.get((product_id, code)) or new.get(
+                (product_id, code)
+            )
+            if lot is None:
+                new[(product_id, code)] = self.model(
+                    store_id=store_id,
+                    product_id=product_id,
+                    code=code,
+                    expires_on=expires_on,
+                    quantity=quantity,
+                )
+            elif expires_on is not None and expires_on != lot.expires_on:
+                raise ValueError(
+                    f'Lot {code} of product {product_id} expires on '
+                    f'{lot.expires_on}, not {expires_on}.'
+                )
+            else:
+                lot.quantity += quantity
+        if existing:
+            update_from_values(self.model, existing.values(), ['quantity'])
+        return list(existing.values()) + self.bulk_create(list(new.values()))
+
+    def consume(self, store_product, quantity):
+        """Consume `quantity` units from the lots expiring first
+
+        Returns [(lot, quantity), ...].
+        """
+        taken = self.consume_many([(store_product, quantity)])
+        return taken[store_product.product_id_id]
+
+    def consume_many(self, demands):
+        """Consume [(store_product, quantity), ...] of one store with one query
+
+        Lots are read in (product, expiry, id) order along the FEFO index.
+        Returns {product id: [(lot, quantity taken), ...]}.
+        """
+        open_lots = defaultdict(list)
+        for lot in (
+            self.select_for_update()
+            .filter(
+                store_id=demands[0][0].store_id_id,
+                product_id__in=[
+                    store_product.product_id_id for store_product, _ in demands
+                ],
+                quantity__gt=0,
+            )
+            .order_by('product_id', F('expires_on').asc(nulls_last=True), 'id')
+        ):
+            open_lots[lot.product_id].append(lot)
+
+        consumed, changed = {}, []
+        for store_product, quantity in demands:
+            portions = []
+            for lot in open_lots[store_product.product_id_id]:
+                if not quantity:
+                    break
+                if not lot.quantity:
+                    continue
+                taken = min(quantity, lot.quantity)
+                lot.quantity -= taken
+                quantity -= taken
+                portions.append((lot, taken))
+                changed.append(lot)
+            consumed[store_product.product_id_id] = portions
+        if changed:
+            update_from_values(self.model, set(changed), ['quantity'])
+        return consumed
+
+    def expiring(self, store, before):
+        """Return the lots of `store` with stock expiring before `before`"""
+        return self.filter(
+            store=store, quantity__gt=0, expires_on__lt=before
+        ).order_by('expires_on', 'id')
+
+
+class Lot(models.Model):
+    """Units of a product in a store sharing a lot code and expiry date"""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    code = models.CharField(max_length=50)
+    expires_on = models.DateField(null=True, blank=True)
+    quantity = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = LotManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'product', 'code'],
+                name='unique_store_product_lot',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['store', 'product', 'expires_on', 'id'],
+                condition=models.Q(quantity__gt=0),
+                name='lot_fefo_idx',
+            ),
+            models.Index(
+                fields=['store', 'expires_on'],
+                condition=models.Q(quantity__gt=0),
+                name='lot_expiry_idx',
+            ),
+        ]
+
+
+class StockAlertManager(models.Manager):
+    """Record low-stock alerts"""
+
+    def record_crossing(self, store_product, previous_quantity):
+        """Record an alert if this change took stock to its reorder point"""
+        reorder_point = store_product.reorder_point
+        if (
+            reorder_point is None
+            or not previous_quantity > reorder_point >= store_product.quantity
+        ):
+            return None
+        return self.create(
+            store_id=store_product.store_id_id,
+            product_id=store_product.product_id_id,
+            quantity=store_product.quantity,
+            reorder_point=reorder_point,
+        )
+
+
+class StockAlert(models.Model):
+    """Low-stock alert raised when a StoreProduct crosses its reorder point"""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+    reorder_point = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockAlertManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-created_at']),
+        ]
+
+
+class ReorderSuggestion(models.Model):
+    """Forecast demand and suggested reorder quantity of a product in a store
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    on_hand = models.IntegerField()
+    moving_average = models.FloatField()
+    forecast = models.FloatField()
+    safety_stock = models.IntegerField()
+    reorder_point = models.IntegerField()
+    suggested_quantity = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-suggested_quantity']),
+        ]
+
+
+
+class ReservationManager(models.Manager):
+    """Hold stock for pending orders, keeping StoreProduct.reserved in step
+
+    Reservations are locked before their StoreProduct rows everywhere, so
+    reserving, committing, releasing and expiring cannot deadlock.
+    """
+
+    def reserve(self, store, product, quantity, created_by, ttl):
+        """Reserve `quantity` units if available to promise, else None"""
+        with transaction.atomic():
+            reserved = StoreProduct.objects.filter(
+                store_id=store,
+                product_id=product,
+                quantity__gte=F('reserved') + quantity,
+            ).update(reserved=F('reserved') + quantity)
+            if not reserved:
+                return None
+            bump_stock_version(store.pk)
+            return self.create(
+                store=store,
+                product=product,
+                quantity=quantity,
+                created_by=created_by,
+                expires_at=timezone.now() + ttl,
+            )
+
+    def commit(self, reservation_id, store, product, party):
+        """Turn an active reservation of `party` into part of an OUT
+
+        Must run inside the transaction that removes the stock.
+        """
+        return self._close(
+            self.filter(
+                pk=reservation_id,
+                store=store,
+                product=product,
+                created_by=party,
+                expires_at__gt=timezone.now(),
+            ),
+            Reservation.COMMITTED,
+        )
+
+    def release(self, reservation):
+        """Give the stock of an active reservation back, returning it or None
+        """
+        with transaction.atomic():
+            return self._close(
+                self.filter(pk=reservation.pk), Reservation.RELEASED
+            )
+
+    def _close(self, queryset, status):
+        reservation = (
+            queryset.select_for_update()
+            .filter(status=Reservation.ACTIVE)
+            .first()
+        )
+        if reservation is None:
+            return None
+        StoreProduct.objects.filter(
+            store_id=reservation.store_id, product_id=reservation.product_id
+        ).update(reserved=F('reserved') - reservation.quantity)
+        bump_stock_version(reservation.store_id)
+        reservation.status = status
+        reservation.save(update_fields=['status'])
+        return reservation
+
+    def expire(self, now=None, batch_size=1000):
+        """Expire up to `batch_size` overdue reservations, returning how many
+
+        Walks the partial expiry index and skips reservations locked by a
+        concurrent commit or release. Counters are decremented with one
+        UPDATE per batch.
+        """
+        with transaction.atomic():
+            rows = list(
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    status=Reservation.ACTIVE,
+                    expires_at__lte=now or timezone.now(),
+                )
+                .order_by('expires_at')
+                .values_list('id', 'store_id')[:batch_size]
+            )
+            if not rows:
+                return 0
+            ids, store_ids = zip(*rows)
+            expired = self.filter(
+                id__in=ids,
+                store=OuterRef('store_id'),
+                product=OuterRef('product_id'),
+            )
+            totals = (
+                expired.values('store', 'product')
+                .annotate(total=Sum('quantity'))
+                .values('total')
+            )
+            StoreProduct.objects.filter(Exists(expired)).update(
+                reserved=F('reserved') - Subquery(totals)
+            )
+            self.filter(id__in=ids).update(status=Reservation.EXPIRED)
+            bump_stock_version(*store_ids)
+            return len(ids)
+
+
+class Reservation(models.Model):
+    """Stock held for a pending order until committed, released or expired"""
+    ACTIVE = 'active'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+    EXPIRED = 'expired'
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    quantity = models.IntegerField()
+    status = models.CharField(max_length=10, default=ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    objects = ReservationManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(status='active'),
+                name='reservation_expiry_idx',
+            ),
+        ]
+
+
+class CountSession(models.Model):
+    """Physical stock count of a store, posted as bulk adjustments"""
+    OPEN = 'open'
+    POSTED = 'posted'
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    status = models.CharField(max_length=10, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_at = models.DateTimeField(null=True, blank=True)
+    adjustment_in = models.ForeignKey(
+        Transaction,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name='+',
+    )
+    adjustment_out = models.ForeignKey(
+        Transaction,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name='+',
+    )
+
+
+class CountLine(models.Model):
+    """Counted quantity of one product in a count session"""
+    session = models.ForeignKey(
+        CountSession, on_delete=models.CASCADE, related_name='lines'
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    counted = models.IntegerField()
+    expected = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session', 'product'], name='unique_count_line'
+            ),
+        ]
+
+
+class PurchaseOrder(models.Model):
+    """Order of products from a supplier, delivered to a store"""
+    OPEN = 'open'
+    PARTIAL = 'partial'
+    RECEIVED = 'received'
+
+    supplier = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    status = models.CharField(max_length=10, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class PurchaseOrderLine(models.Model):
+    """Ordered and received quantities of one product of a purchase order"""
+    order = models.ForeignKey(
+        PurchaseOrder, on_delete=models.CASCADE, related_name='lines'
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+    received = models.IntegerField(default=0)
+    unit_cost = models.DecimalField(max_digits=8, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'product'], name='unique_purchase_order_line'
+            ),
+        ]
+
+
+class GoodsReceipt(models.Model):
+    """Delivery received against a purchase order, posted as one IN transaction
+    """
+    order = models.ForeignKey(
+        PurchaseOrder, on_delete=models.CASCADE, related_name='receipts'
+    )
+    trx = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ChangeManager(models.Manager):
+    """Record change log entries and wake change feed long-polls on commit"""
+
+    def create(self, **kwargs):
+        change = super().create(**kwargs)
+        transaction.on_commit(events.publish_changes, using=self.db)
+        return change
+
+    def bulk_create(self, objs, *args, **kwargs):
+        changes = super().bulk_create(objs, *args, **kwargs)
+        if changes:
+            transaction.on_commit(events.publish_changes, using=self.db)
+        return changes
+
+    def record_stock(self, store_product):
+        """Record the new quantity of a StoreProduct"""
+        return self.create(
+            kind=Change.STOCK,
+            store_id=store_product.store_id_id,
+            product_id=store_product.product_id_id,
+            quantity=store_product.quantity,
+        )
+
+    def record_product(self, product, deleted=False):
+        """Record a created, updated or deleted Product"""
+        return self.create(
+            kind=Change.PRODUCT,
+            action=Change.DELETE if deleted else Change.UPSERT,
+            product_id=product.id,
+            price=product.price,
+        )
+
+
+class Change(models.Model):
+    """Change log used for incremental sync, ordered by commit
+
+    `seq` is taken when a row is inserted, so a transaction that commits
+    late can hold seqs below ones already read. `commit_seq` is stamped on
+    all rows of a transaction as it commits, under a lock that is held
+    until the commit completes (see migration 0028). Readers therefore
+    never see a commit_seq below one they have already read. Rows are
+    ordered by (commit_seq, seq).
+    """
+    STOCK = 'stock'
+    PRODUCT = 'product'
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    seq = models.BigAutoField(primary_key=True)
+    commit_seq = models.BigIntegerField(null=True, editable=False)
+    kind = models.CharField(max_length=10)
+    action = models.CharField(max_length=10, default=UPSERT)
+    store_id = models.IntegerField(null=True)
+    product_id = models.IntegerField()
+    quantity = models.IntegerField(null=True)
+    price = models.DecimalField(max_digits=8, decimal_places=2, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = ChangeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'store_id', 'product_id', 'seq']),
+            models.Index(
+                fields=['commit_seq', 'seq'], name='change_commit_idx'
+            ),
+            models.Index(
+                fields=['seq'],
+                condition=Q(commit_seq=None),
+                name='change_uncommitted_idx',
+            ),
+        ]
+
+
+class AuditRecord(models.Model):
+    """Append-only record of who changed a stock, price or cash, and when
+
+    Stock records carry the store and product, price records the product
+    and cash records the store; the other id is null.
+    """
+    STOCK = 'stock'
+    PRICE = 'price'
+    CASH = 'cash'
+
+    kind = models.CharField(max_length=10)
+    store_id = models.IntegerField(null=True)
+    product_id = models.IntegerField(null=True)
+    old_value = models.DecimalField(max_digits=16, decimal_places=4, null=True)
+    new_value = models.DecimalField(max_digits=16, decimal_places=4)
+    actor_id = models.IntegerField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['kind', 'store_id', 'product_id', 'created_at'],
+                name='audit_object_idx',
+            ),
+            models.Index(fields=['created_at'], name='audit_created_at_idx'),
+        ]
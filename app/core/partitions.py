@@ -0,0 +1,221 @@
+"""Monthly range partitioning of the transaction tables on Postgres
+
+Both tables are partitioned by `created_at` into one partition per UTC
+month named `<table>_yYYYYmMM`, plus a `<table>_default` partition that
+catches rows outside every monthly range.
+"""
+import datetime
+import gzip
+import os
+import re
+
+PARTITIONED_TABLES = ('core_transaction', 'core_transactionproduct')
+PARTITION_NAME = re.compile(
+    r'^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$'
+)
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_y{month.year:04d}m{month.month:02d}'
+
+
+def parse_partition_name(name):
+    """Return (table, month) for a monthly partition name"""
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        raise ValueError(f'{name} is not a monthly partition name.')
+    return match.group('table'), datetime.date(
+        int(match.group('year')), int(match.group('month')), 1
+    )
+
+
+def month_bounds(month):
+    return (
+        f'{month.isoformat()} 00:00:00+00',
+        f'{add_months(month, 1).isoformat()} 00:00:00+00',
+    )
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table p '
+        'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+        [table],
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table):
+    """Return the monthly partitions of `table` as {month: name}"""
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'JOIN pg_class p ON p.oid = i.inhparent '
+        'WHERE p.relname = %s',
+        [table],
+    )
+    partitions = {}
+    for name, in cursor.fetchall():
+        if PARTITION_NAME.match(name):
+            partitions[parse_partition_name(name)[1]] = name
+    return partitions
+
+
+def supports_partitioning(connection):
+    """Return whether `connection` can partition the transaction tables
+
+    Default partitions, primary keys and indexes on partitioned tables need
+    Postgres 11 or later.
+    """
+    return (
+        connection.vendor == 'postgresql' and connection.pg_version >= 110000
+    )
+
+
+def create_partition(cursor, table, month):
+    """Create the partition of `table` for `month` unless it already exists
+
+    Rows of that month already caught by the default partition are moved
+    into the new one, since Postgres refuses to add a partition whose range
+    the default partition holds rows of.
+    """
+    name = partition_name(table, month)
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    if cursor.fetchone()[0] is not None:
+        return
+    start, end = month_bounds(month)
+    default = f'{table}_default'
+    # Hold off writes to the default partition until the month's rows move
+    cursor.execute(f'LOCK TABLE {default} IN EXCLUSIVE MODE')
+    in_month = 'created_at >= %s AND created_at < %s'
+    cursor.execute(
+        f'SELECT 1 FROM {default} WHERE {in_month} LIMIT 1', [start, end]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f'CREATE TABLE {name} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        return
+    cursor.execute(
+        f'CREATE TABLE {name} '
+        f'(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS '
+        f'(DELETE FROM {default} WHERE {in_month} RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE {table} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def partition_by_created_at(cursor, table, months_ahead=12):
+    """Rebuild `table` partitioned by month on created_at, keeping its rows
+
+    The primary key becomes (id, created_at) because Postgres requires the
+    partition key in every unique constraint. Unique indexes that do not
+    include created_at are recreated as plain indexes, and foreign keys
+    pointing at the table must already have been dropped.
+    """
+    old_table = f'{table}_unpartitioned'
+    cursor.execute(
+        'SELECT indexdef FROM pg_indexes '
+        'WHERE tablename = %s AND indexname <> %s',
+        [table, f'{table}_pkey'],
+    )
+    index_definitions = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+    cursor.execute(
+        f'CREATE TABLE {table} '
+        f'(LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        'PARTITION BY RANGE (created_at)'
+    )
+    cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)')
+    cursor.execute(
+        f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT'
+    )
+
+    cursor.execute(f'SELECT min(created_at) FROM {old_table}')
+    oldest = cursor.fetchone()[0]
+    today = month_start(datetime.datetime.now(datetime.timezone.utc))
+    month = today
+    if oldest:
+        month = month_start(oldest.astimezone(datetime.timezone.utc))
+    while month <= add_months(today, months_ahead):
+        create_partition(cursor, table, month)
+        month = add_months(month, 1)
+
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {old_table}')
+    cursor.execute(f"SELECT pg_get_serial_sequence('{old_table}', 'id')")
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    cursor.execute(f'DROP TABLE {old_table}')
+
+    for definition in index_definitions:
+        definition = definition.replace('CREATE UNIQUE INDEX', 'CREATE INDEX')
+        cursor.execute(
+            re.sub(r' ON (\w+\.)?' + table + ' ', f' ON {table} ', definition)
+        )
+    for name, definition in foreign_keys:
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        )
+
+
+def archive_partition(cursor, table, month, directory):
+    """Detach the partition of `table` for `month`, archive it and drop it
+
+    Returns the archive path and the number of archived rows.
+    """
+    name = partition_name(table, month)
+    path = os.path.join(directory, f'{name}.copy.gz')
+    # Fire deferred foreign key checks now, Postgres refuses to drop a table
+    # with pending trigger events
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+    with gzip.open(path, 'wb') as archive:
+        cursor.copy_expert(f'COPY {name} TO STDOUT', archive)
+    cursor.execute(f'SELECT count(*) FROM {name}')
+    rows = cursor.fetchone()[0]
+    cursor.execute(f'DROP TABLE {name}')
+    return path, rows
+
+
+def restore_partition(cursor, path):
+    """Recreate and attach a partition dumped by archive_partition()"""
+    name = os.path.basename(path).split('.', 1)[0]
+    table, month = parse_partition_name(name)
+    start, end = month_bounds(month)
+    cursor.execute(
+        f'CREATE TABLE {name} '
+        f'(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    with gzip.open(path, 'rb') as archive:
+        cursor.copy_expert(f'COPY {name} FROM STDIN', archive)
+    cursor.execute(
+        f'ALTER TABLE {table} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+    cursor.execute(f'SELECT count(*) FROM {name}')
+    return table, month, cursor.fetchone()[0]
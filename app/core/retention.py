@@ -0,0 +1,49 @@
+"""Removing old transactions from the database
+
+export_columnar --delete and archive_partitions remove whole time ranges of
+transactions with raw SQL, which skips the on_delete of the rows pointing
+at them. Both call release_transactions() first, inside the transaction
+that removes the range.
+"""
+from django.db import models
+
+from core.models import CostLayer, Transaction, TransactionProduct
+
+
+def check_releasable(transactions):
+    """Raise ValueError if the `transactions` received stock still on hand"""
+    if CostLayer.objects.filter(
+        remaining__gt=0, trx_id__in=transactions
+    ).exists():
+        raise ValueError(
+            'Some of these transactions received stock that is still on hand.'
+        )
+
+
+def delete_references(transactions):
+    """Apply the on_delete of every relation to `transactions` but the lines"""
+    for relation in Transaction._meta.get_fields(include_hidden=True):
+        if (
+            not relation.auto_created
+            or relation.concrete
+            or relation.related_model is TransactionProduct
+        ):
+            continue
+        rows = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': transactions}
+        )
+        if relation.on_delete is models.SET_NULL:
+            rows.update(**{relation.field.name: None})
+        elif relation.on_delete is models.CASCADE:
+            rows.delete()
+        else:
+            raise ValueError(
+                f'{relation.related_model.__name__} rows may not lose their '
+                'transaction.'
+            )
+
+
+def release_transactions(transactions):
+    """Check `transactions` can be removed and release the rows on them"""
+    check_releasable(transactions)
+    delete_references(transactions)
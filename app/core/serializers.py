@@ -0,0 +1,160 @@
+import decimal
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def decimal_converter(field):
+    """Return a converter matching DRF DecimalField string output"""
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+    # str() only falls back to exponent notation below 1e-6, which a value
+    # quantized to six places never is
+    to_string = str if field.decimal_places <= 6 else '{:f}'.format
+
+    def convert(value):
+        if value is None:
+            return None
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return to_string(value.quantize(exponent, context=context))
+
+    return convert
+
+
+def datetime_converter(tz):
+    """Return a converter matching DRF DateTimeField ISO 8601 output"""
+
+    def convert(value):
+        if not value:
+            return None
+        if tz is not None:
+            if value.tzinfo is not tz:
+                value = (
+                    value.astimezone(tz)
+                    if timezone.is_aware(value)
+                    else timezone.make_aware(value, tz)
+                )
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.utc)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return convert
+
+
+class ValuesSerializer:
+    """Read-only serializer that builds rows from values_list() tuples
+
+    Subclasses declare `model`, the output `fields` in order and the
+    `nested` serializers for foreign keys. The lookups and per-field
+    converters are compiled once per timezone, so serializing a row is a
+    tuple walk instead of a pass through the DRF field machinery.
+    """
+    model = None
+    fields = ()
+    nested = {}
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    @classmethod
+    def converter_for(cls, field, tz):
+        if isinstance(field, models.DecimalField):
+            return decimal_converter(field)
+        if isinstance(field, models.DateTimeField):
+            return datetime_converter(tz)
+        return None
+
+    @classmethod
+    def compile(cls, lookups, tz, prefix=''):
+        """Append this serializer lookups and return its row builder"""
+        if not cls.nested and not prefix:
+            return cls.compile_flat(lookups, tz)
+
+        getters = []
+        for name in cls.fields:
+            if name in cls.nested:
+                getters.append(
+                    (
+                        name,
+                        cls.nested[name].compile(
+                            lookups, tz, f'{prefix}{name}__'
+                        ),
+                    )
+                )
+                continue
+
+            converter = cls.converter_for(cls.model._meta.get_field(name), tz)
+            getter = itemgetter(len(lookups))
+            if converter is not None:
+                getter = _chain(getter, converter)
+            getters.append((name, getter))
+            lookups.append(prefix + name)
+
+        def build(row):
+            return {name: getter(row) for name, getter in getters}
+
+        return build
+
+    @classmethod
+    def compile_flat(cls, lookups, tz):
+        """Return the builder of a top-level serializer without nesting
+
+        Rows map one-to-one onto the fields, so only the converted columns are
+        touched and the dict is built by zip() instead of a getter per field.
+        """
+        names = tuple(cls.fields)
+        converters = []
+        for index, name in enumerate(names):
+            converter = cls.converter_for(cls.model._meta.get_field(name), tz)
+            if converter is not None:
+                converters.append((index, converter))
+            lookups.append(name)
+
+        def build(row):
+            row = list(row)
+            for index, converter in converters:
+                row[index] = converter(row[index])
+            return dict(zip(names, row))
+
+        return build
+
+    @classmethod
+    def get_plan(cls):
+        """Return the cached (lookups, builder) pair for the current timezone
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        cache = cls.__dict__.get('_plans')
+        if cache is None:
+            cache = cls._plans = {}
+        if tz not in cache:
+            lookups = []
+            builder = cls.compile(lookups, tz)
+            cache[tz] = (tuple(lookups), builder)
+        return cache[tz]
+
+    @classmethod
+    def prepare(cls, queryset):
+        """Return the values_list() queryset this serializer consumes"""
+        lookups, _ = cls.get_plan()
+        return queryset.values_list(*lookups)
+
+    def to_representation(self, rows):
+        """Build output rows from tuples returned by prepare()"""
+        _, builder = self.get_plan()
+        return [builder(row) for row in rows]
+
+    @property
+    def data(self):
+        return self.to_representation(self.prepare(self.queryset))
+
+
+def _chain(getter, converter):
+    def get(row):
+        return converter(getter(row))
+
+    return get
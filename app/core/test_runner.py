@@ -0,0 +1,97 @@
+import time
+import unittest
+
+from django.conf import settings
+from django.test.runner import (
+    DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner,
+)
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    """Time each test in a parallel worker and send the duration back"""
+
+    def startTest(self, test):
+        self._started_at = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        self.events.append(
+            (
+                'addDuration',
+                self.test_index,
+                time.perf_counter() - self._started_at,
+            )
+        )
+        super().stopTest(test)
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """Record how long each test took
+
+    Serial runs time tests here; parallel runs replay the durations measured
+    in the workers through addDuration, before the replayed stopTest.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = {}
+
+    def startTest(self, test):
+        self._started_at = time.perf_counter()
+        super().startTest(test)
+
+    def addDuration(self, test, elapsed):
+        self.durations[test.id()] = elapsed
+
+    def stopTest(self, test):
+        self.durations.setdefault(
+            test.id(), time.perf_counter() - self._started_at
+        )
+        super().stopTest(test)
+
+
+class TimedTestRunner(DiscoverRunner):
+    """Test runner that lists the slowest tests after the run"""
+    parallel_test_suite = TimedParallelTestSuite
+
+    def __init__(self, slowest=None, **kwargs):
+        super().__init__(**kwargs)
+        if slowest is None:
+            slowest = getattr(settings, 'TEST_SLOWEST', 10)
+        self.slowest = slowest
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--slowest',
+            type=int,
+            help='Number of slowest tests to list after the run (0 to '
+            'disable).',
+        )
+
+    def get_resultclass(self):
+        return super().get_resultclass() or TimedTextTestResult
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        durations = getattr(result, 'durations', None)
+        if self.slowest and durations:
+            stream = result.stream
+            stream.writeln(
+                f'\nSlowest {min(self.slowest, len(durations))} tests '
+                f'({sum(durations.values()):.2f}s in tests):'
+            )
+            for test_id, elapsed in sorted(
+                durations.items(), key=lambda item: -item[1]
+            )[:self.slowest]:
+                stream.writeln(f'{elapsed:8.3f}s  {test_id}')
+        return result
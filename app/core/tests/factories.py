@@ -0,0 +1,42 @@
+"""Fixture factories for tests
+
+Meant for setUpTestData, which creates the rows once per TestCase class
+instead of once per test.
+"""
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.models import Product, Store
+
+_emails = count(1)
+
+
+def create_user(user_type='Customer', email=None, password='pass123', **extra):
+    """Create a user, with a unique email unless one is given"""
+    email = email or f'{user_type.lower()}{next(_emails)}@example.com'
+    return get_user_model().objects.create_user(
+        email=email, user_type=user_type, password=password, **extra
+    )
+
+
+def create_superuser(email='admin@admin.com', password='admin123'):
+    return get_user_model().objects.create_superuser(email, password)
+
+
+def create_store(name='Store#1', city='Cairo', **extra):
+    return Store.objects.create(name=name, city=city, **extra)
+
+
+def create_product(supplier, name='TestProduct', price='1000.00', **extra):
+    return Product.objects.create(
+        supplier_id=supplier, name=name, price=price, **extra
+    )
+
+
+def stamp_changes_on_insert():
+    """Stamp commit_seq on insert, since a TestCase never commits"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
@@ -1,7 +1,17 @@
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.admin import EstimatedCountPaginator
+from core.models import Store, StoreProduct, Transaction, TransactionProduct
+from core.tests import factories
+
 
 class AdminSiteTests(TestCase):
 
@@ -38,4 +48,165 @@ class AdminSiteTests(TestCase):
         url = reverse('admin:core_user_add')
         res = self.client.get(url)
 
-        self.assertEqual(res.status_code, 200)
\ No newline at end of file
+        self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = factories.create_superuser()
+        cls.supplier = factories.create_user('Supplier')
+        cls.store = factories.create_store()
+        cls.product = factories.create_product(cls.supplier)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+    def add_transactions(self, count):
+        for _ in range(count):
+            trx = Transaction.objects.create(
+                created_by=self.admin_user,
+                party=self.supplier,
+                store=self.store,
+                trx_type='IN',
+                amount='1.00',
+            )
+            TransactionProduct.objects.create(
+                trx_id=trx, product_id=self.product, quantity=1
+            )
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:core_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test related objects are joined instead of fetched per row"""
+        StoreProduct.objects.create(
+            store_id=self.store, product_id=self.product, quantity=1
+        )
+        self.add_transactions(1)
+        few = {
+            model: self.changelist_queries(model)
+            for model in ('transaction', 'transactionproduct', 'storeproduct')
+        }
+        self.add_transactions(5)
+        many = {
+            model: self.changelist_queries(model)
+            for model in ('transaction', 'transactionproduct', 'storeproduct')
+        }
+
+        self.assertEqual(few, many)
+
+    def test_change_pages(self):
+        self.add_transactions(1)
+        trx = Transaction.objects.get()
+        store_product = StoreProduct.objects.create(
+            store_id=self.store, product_id=self.product, quantity=1
+        )
+
+        for model, pk in (
+            ('transaction', trx.pk),
+            ('storeproduct', store_product.pk),
+            ('product', self.product.pk),
+        ):
+            res = self.client.get(
+                reverse(f'admin:core_{model}_change', args=[pk])
+            )
+            self.assertEqual(res.status_code, 200)
+
+    def test_stock_is_read_only(self):
+        """Test only the reorder point of a stock row can be changed"""
+        store_product = StoreProduct.objects.create(
+            store_id=self.store, product_id=self.product, quantity=1
+        )
+
+        res = self.client.post(
+            reverse('admin:core_storeproduct_change', args=[store_product.pk]),
+            {
+                'quantity': 999,
+                'reserved': 5,
+                'average_cost': '9',
+                'fifo_value': '9',
+                'reorder_point': 3,
+            },
+        )
+        store_product.refresh_from_db()
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(
+            (
+                store_product.quantity,
+                store_product.reserved,
+                store_product.reorder_point,
+            ),
+            (1, 0, 3),
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('admin:core_storeproduct_add')
+            ).status_code,
+            403,
+        )
+
+    def test_transactions_are_view_only(self):
+        self.add_transactions(1)
+        trx = Transaction.objects.get()
+
+        res = self.client.post(
+            reverse('admin:core_transaction_change', args=[trx.pk]),
+            {'amount': '999.00'},
+        )
+        trx.refresh_from_db()
+
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(trx.amount, Decimal('1.00'))
+        self.assertEqual(
+            self.client.get(
+                reverse('admin:core_transactionproduct_add')
+            ).status_code,
+            403,
+        )
+
+    def test_paginator_counts_small_and_filtered_tables(self):
+        self.add_transactions(3)
+
+        self.assertEqual(
+            EstimatedCountPaginator(
+                Transaction.objects.order_by('id'), 100
+            ).count,
+            3,
+        )
+        with patch('core.admin.ESTIMATE_THRESHOLD', 0):
+            filtered = Transaction.objects.filter(trx_type='OUT').order_by(
+                'id'
+            )
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 0)
+
+    @skipUnless(
+        connection.vendor == 'postgresql', 'reltuples is Postgres only'
+    )
+    def test_paginator_estimates_large_tables(self):
+        """Test the row estimate sums pg_class over partitions, no COUNT(*)"""
+        self.add_transactions(3)
+        Store.objects.create(name='Store#2', city='Alexandria')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        threshold = patch('core.admin.ESTIMATE_THRESHOLD', 0)
+        with threshold, CaptureQueriesContext(connection) as queries:
+            transactions = EstimatedCountPaginator(
+                Transaction.objects.order_by('id'), 100
+            ).count
+            stores = EstimatedCountPaginator(
+                Store.objects.order_by('id'), 100
+            ).count
+
+        self.assertEqual((transactions, stores), (3, 2))
+        self.assertFalse(
+            any('COUNT(' in query['sql'].upper() for query in queries)
+        )
@@ -0,0 +1,307 @@
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import columnar
+from core.models import (
+    CostLayer, CountSession, GoodsReceipt, Product, PurchaseOrder, Store,
+    Transaction, TransactionProduct,
+)
+
+JAN = datetime.datetime(2020, 1, 10, tzinfo=datetime.timezone.utc)
+FEB = datetime.datetime(2020, 2, 10, tzinfo=datetime.timezone.utc)
+MAR = datetime.datetime(2020, 3, 1, tzinfo=datetime.timezone.utc)
+
+
+@skipIf(columnar.np is None, 'the columnar archive requires numpy')
+class ColumnarArchiveTests(TestCase):
+    """Test exporting transactions to the columnar archive and scanning it"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'pass123'
+        )
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        self.store_a = Store.objects.create(name='Store#A', city='Cairo')
+        self.store_b = Store.objects.create(name='Store#B', city='Alex')
+        self.laptop = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price=Decimal('100.00')
+        )
+        self.mouse = Product.objects.create(
+            supplier_id=self.supplier, name='Mouse', price=Decimal('5.00')
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = self.directory.name
+
+    def sample_transaction(self, store, trx_type, created_at, lines):
+        trx = Transaction.objects.create(
+            created_by=self.admin,
+            party=self.supplier,
+            store=store,
+            trx_type=trx_type,
+            amount=sum(
+                (product.price * quantity for product, quantity in lines),
+                Decimal(0),
+            ),
+        )
+        Transaction.objects.filter(pk=trx.pk).update(created_at=created_at)
+        TransactionProduct.objects.bulk_create(
+            TransactionProduct(
+                trx_id=trx,
+                product_id=product,
+                quantity=quantity,
+                created_at=created_at,
+            )
+            for product, quantity in lines
+        )
+        return trx
+
+    def test_export_and_aggregate(self):
+        """Test exported lines aggregate like the database rows"""
+        self.sample_transaction(
+            self.store_a, 'IN', JAN, [(self.laptop, 3), (self.mouse, 10)]
+        )
+        self.sample_transaction(self.store_a, 'OUT', FEB, [(self.mouse, 4)])
+        self.sample_transaction(self.store_b, 'IN', FEB, [(self.mouse, 7)])
+
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-03-01',
+            chunk_rows=2,
+            stdout=StringIO(),
+        )
+        archive = columnar.ColumnarArchive(self.path)
+
+        self.assertEqual(
+            archive.aggregate(
+                'lines', ['store_id', 'product_id', 'trx_type'], 'quantity'
+            ),
+            [
+                {
+                    'store_id': self.store_a.id,
+                    'product_id': self.laptop.id,
+                    'trx_type': 'IN',
+                    'count': 1,
+                    'quantity': 3,
+                },
+                {
+                    'store_id': self.store_a.id,
+                    'product_id': self.mouse.id,
+                    'trx_type': 'IN',
+                    'count': 1,
+                    'quantity': 10,
+                },
+                {
+                    'store_id': self.store_a.id,
+                    'product_id': self.mouse.id,
+                    'trx_type': 'OUT',
+                    'count': 1,
+                    'quantity': 4,
+                },
+                {
+                    'store_id': self.store_b.id,
+                    'product_id': self.mouse.id,
+                    'trx_type': 'IN',
+                    'count': 1,
+                    'quantity': 7,
+                },
+            ],
+        )
+        self.assertEqual(
+            archive.aggregate(
+                'transactions', ['store_id'], 'amount', trx_type='IN'
+            ),
+            [
+                {
+                    'store_id': self.store_a.id,
+                    'count': 1,
+                    'amount': Decimal('350.00'),
+                },
+                {
+                    'store_id': self.store_b.id,
+                    'count': 1,
+                    'amount': Decimal('35.00'),
+                },
+            ],
+        )
+        self.assertEqual(
+            archive.manifest['dictionaries']['trx_type'], ['IN', 'OUT']
+        )
+        self.assertEqual(len(archive.manifest['tables']['lines']), 2)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.path, 'lines', '00000001', 'quantity.npy')
+            )
+        )
+
+    def test_zone_maps_skip_chunks_outside_range(self):
+        """Test chunks whose created_at range misses the query are not read"""
+        self.sample_transaction(self.store_a, 'IN', JAN, [(self.laptop, 3)])
+        self.sample_transaction(self.store_a, 'IN', FEB, [(self.laptop, 5)])
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-03-01',
+            chunk_rows=1,
+            stdout=StringIO(),
+        )
+        archive = columnar.ColumnarArchive(self.path)
+
+        chunks = archive.chunks('lines', start=FEB.replace(day=1), end=MAR)
+        rows = archive.aggregate(
+            'lines',
+            ['product_id'],
+            'quantity',
+            start=FEB.replace(day=1),
+            end=MAR,
+        )
+
+        self.assertEqual([chunk['name'] for chunk in chunks], ['00000002'])
+        self.assertEqual(
+            rows, [{'product_id': self.laptop.id, 'count': 1, 'quantity': 5}]
+        )
+        self.assertEqual(
+            archive.chunks('lines', filters={'store_id': self.store_b.id}), []
+        )
+
+    def test_sparse_groups_match_dense_groups(self):
+        """Test grouping by unique() gives the same result as bincount()"""
+        self.sample_transaction(
+            self.store_a, 'IN', JAN, [(self.laptop, 3), (self.mouse, 1)]
+        )
+        self.sample_transaction(self.store_b, 'OUT', FEB, [(self.laptop, 2)])
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-03-01',
+            chunk_rows=1,
+            stdout=StringIO(),
+        )
+        archive = columnar.ColumnarArchive(self.path)
+
+        dense = archive.aggregate(
+            'lines', ['store_id', 'product_id'], 'quantity'
+        )
+        with patch.object(columnar, 'DENSE_GROUPS', 1):
+            sparse = archive.aggregate(
+                'lines', ['store_id', 'product_id'], 'quantity'
+            )
+
+        self.assertEqual(sparse, dense)
+
+    def test_export_is_incremental_and_deletes(self):
+        """Test exports append newer rows and --delete removes them"""
+        self.sample_transaction(self.store_a, 'IN', JAN, [(self.laptop, 3)])
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-02-01',
+            stdout=StringIO(),
+        )
+        self.sample_transaction(self.store_a, 'OUT', FEB, [(self.laptop, 1)])
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-03-01',
+            delete=True,
+            stdout=StringIO(),
+        )
+        archive = columnar.ColumnarArchive(self.path)
+
+        self.assertEqual(archive.until, MAR)
+        self.assertEqual(
+            archive.aggregate('lines', ['trx_type'], 'quantity'),
+            [
+                {'trx_type': 'IN', 'count': 1, 'quantity': 3},
+                {'trx_type': 'OUT', 'count': 1, 'quantity': 1},
+            ],
+        )
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(
+            TransactionProduct.objects.filter(
+                created_at__gte=JAN.replace(day=1)
+            ).count(),
+            1,
+        )
+
+    def test_delete_removes_or_detaches_referencing_rows(self):
+        """Test --delete releases the rows pointing at exported transactions"""
+        trx_in = self.sample_transaction(
+            self.store_a, 'IN', JAN, [(self.laptop, 3)]
+        )
+        trx_out = self.sample_transaction(
+            self.store_b, 'OUT', JAN, [(self.laptop, 3)]
+        )
+        kept = self.sample_transaction(
+            self.store_a, 'IN', MAR, [(self.laptop, 1)]
+        )
+        Transaction.objects.filter(pk=kept.pk).update(counterpart=trx_out)
+        CostLayer.objects.create(
+            store=self.store_a,
+            product=self.laptop,
+            trx=trx_in,
+            quantity=3,
+            remaining=0,
+            unit_cost=Decimal('100'),
+        )
+        order = PurchaseOrder.objects.create(
+            supplier=self.supplier, store=self.store_a, created_by=self.admin
+        )
+        GoodsReceipt.objects.create(
+            order=order, trx=trx_in, created_by=self.admin
+        )
+        session = CountSession.objects.create(
+            store=self.store_b, created_by=self.admin, adjustment_out=trx_out
+        )
+
+        call_command(
+            'export_columnar',
+            dir=self.path,
+            before='2020-03-01',
+            delete=True,
+            stdout=StringIO(),
+        )
+
+        self.assertFalse(CostLayer.objects.exists())
+        self.assertFalse(GoodsReceipt.objects.exists())
+        self.assertIsNone(Transaction.objects.get(pk=kept.pk).counterpart_id)
+        session.refresh_from_db()
+        self.assertIsNone(session.adjustment_out_id)
+
+    def test_delete_refuses_transactions_with_stock_on_hand(self):
+        """Test --delete refuses an IN transaction whose layer holds units"""
+        trx = self.sample_transaction(
+            self.store_a, 'IN', JAN, [(self.laptop, 3)]
+        )
+        CostLayer.objects.create(
+            store=self.store_a,
+            product=self.laptop,
+            trx=trx,
+            quantity=3,
+            remaining=1,
+            unit_cost=Decimal('100'),
+        )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_columnar',
+                dir=self.path,
+                before='2020-03-01',
+                delete=True,
+                stdout=StringIO(),
+            )
+
+        self.assertTrue(Transaction.objects.filter(pk=trx.pk).exists())
+        self.assertIsNone(columnar.ColumnarArchive(self.path).until)
@@ -1,24 +1,74 @@
+import json
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import AuditRecord
+
 
 class CommandTest(TestCase):
 
     def test_wait_for_db_ready(self):
-        """Test waiting for db until the db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        """Test waiting for db returns once SELECT 1 succeeds"""
+        out = StringIO()
+        with patch('time.sleep') as sleep:
+            call_command('wait_for_db', stdout=out)
 
+        sleep.assert_not_called()
+        self.assertIn('Database available!', out.getvalue())
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        """Test waiting for db retries with exponential backoff and jitter"""
+        with patch(
+            'core.management.commands.wait_for_db.check_database'
+        ) as check:
+            check.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(check.call_count, 6)
+        pauses = [call.args[0] for call in ts.call_args_list]
+        for pause, delay in zip(pauses, [0.1, 0.2, 0.4, 0.8, 1.6]):
+            self.assertTrue(delay / 2 <= pause <= delay)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test waiting for db gives up after the timeout"""
+        with patch(
+            'core.management.commands.wait_for_db.check_database',
+            side_effect=OperationalError('down'),
+        ):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'wait_for_db', '--timeout', '0', stdout=StringIO()
+                )
+
+    def test_profile_startup(self):
+        """Test the startup profile covers setup phases and lean imports"""
+        out = StringIO()
+        call_command('profile_startup', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertIn('setup', report['phases'])
+        self.assertIn('core', report['apps'])
+        self.assertIn('core.models', report['modules'])
+        self.assertNotIn('core.admin', report['modules'])
+        self.assertNotIn('store.views', report['modules'])
+
+    def test_benchmark_throttle(self):
+        out = StringIO()
+        call_command('benchmark_throttle', '--requests', '100', stdout=out)
+
+        self.assertIn('100 requests | LocMemCache | fast path', out.getvalue())
+
+    def test_benchmark_audit(self):
+        out = StringIO()
+        call_command(
+            'benchmark_audit', '--requests', '5', '--rounds', '1', stdout=out
+        )
+
+        self.assertIn('5 transactions | without audit', out.getvalue())
+        self.assertFalse(AuditRecord.objects.exists())
@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from rest_framework import status
+
+from core import health
+
+
+class HealthEndpointTests(TestCase):
+    """Test the liveness and readiness endpoints"""
+
+    def setUp(self):
+        health._readiness.update(checked_at=None, result=None)
+
+    def test_healthz_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_readyz_checks_database_and_migrations(self):
+        """Test readyz reports ready and reuses its result for a few seconds"""
+        res = self.client.get('/readyz')
+        with self.assertNumQueries(0):
+            res_cached = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json(), {'status': 'ok', 'database': True, 'migrations': True}
+        )
+        self.assertEqual(res_cached.status_code, status.HTTP_200_OK)
+
+    def test_readyz_unavailable(self):
+        with patch(
+            'core.health.check_database',
+            side_effect=OperationalError('connection refused'),
+        ):
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['database'], False)
+
+    def test_readyz_pending_migrations(self):
+        with patch(
+            'core.health.pending_migrations', return_value=['core.9999_next']
+        ):
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['pending'], ['core.9999_next'])
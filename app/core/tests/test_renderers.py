@@ -0,0 +1,42 @@
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import skipIf
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(TestCase):
+
+    def test_renders_same_bytes_as_json_renderer(self):
+        """Test FastJSONRenderer output is byte-identical to JSONRenderer"""
+        data = [
+            OrderedDict([
+                ('id', 1),
+                ('name', 'caf\u00e9 \u2028 \u2029'),
+                ('price', '10.00'),
+            ]),
+            {
+                'amount': Decimal('1.50'),
+                'created_at': timezone.now(),
+                'nested': {'a': [1, 2.5, None, True]},
+            },
+        ]
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indented_output_falls_back(self):
+        """Test indented rendering is delegated to JSONRenderer"""
+        data = {'a': [1, 2]}
+        accepted = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted),
+            JSONRenderer().render(data, accepted)
+        )
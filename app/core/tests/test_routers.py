@@ -0,0 +1,123 @@
+import os
+import runpy
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app import settings as project_settings
+from core.models import Product, Store
+from core.routers import replica_reads
+
+PRODUCTS_URL = reverse('product:product-list')
+STORES_URL = reverse('store:store-list')
+REPLICA_ALIAS = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_outside_replica_block_use_primary(self):
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_reads_inside_replica_block_use_replica(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Product), 'replica_1')
+            self.assertEqual(router.db_for_write(Product), 'default')
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_write_pins_user_to_primary(self):
+        """Test a successful write pins the user to the primary for reads"""
+        user = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        client.post(
+            PRODUCTS_URL, {'name': 'LAPTOP', 'price': '100.00', 'image': ''}
+        )
+
+        self.assertTrue(cache.get(f'db-pinned:{user.pk}'))
+
+    def test_replicas_need_a_shared_cache(self):
+        """Test replicas are refused when the pin cache is per process"""
+        settings_path = project_settings.__file__
+        environ = {
+            key: value
+            for key, value in os.environ.items()
+            if key != 'CACHE_LOCATION'
+        }
+        with mock.patch.dict(
+            os.environ,
+            {**environ, 'DB_REPLICA_HOSTS': 'replica.internal'},
+            clear=True,
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                runpy.run_path(settings_path)
+            os.environ['CACHE_LOCATION'] = 'memcached.internal:11211'
+            self.assertEqual(
+                runpy.run_path(settings_path)['DATABASE_REPLICAS'],
+                ['replica_1'],
+            )
+
+
+class ReplicaRoutingIntegrationTests(TestCase):
+    """Run against a separate SQLite database standing in for the replica"""
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[REPLICA_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+        cls.databases = {'default', REPLICA_ALIAS}
+        call_command('migrate', database=REPLICA_ALIAS, verbosity=0)
+        cls.replicas = override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+        cls.replicas.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas.disable()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.databases[REPLICA_ALIAS]
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@admin.com', 'admin123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_list_reads_from_replica(self):
+        """Test rows only on the primary are not visible through replica reads
+        """
+        Store.objects.create(name='Store#1', city='Cairo')
+        Store.objects.using(REPLICA_ALIAS).create(
+            name='Replica#1', city='Alex'
+        )
+
+        res = self.client.get(STORES_URL)
+
+        self.assertEqual([store['name'] for store in res.data], ['Replica#1'])
+
+    def test_list_after_write_reads_from_primary(self):
+        """Test a user reads their own write while pinned to the primary"""
+        self.client.post(STORES_URL, {'name': 'Store#1', 'city': 'Cairo'})
+
+        res = self.client.get(STORES_URL)
+
+        self.assertEqual([store['name'] for store in res.data], ['Store#1'])
@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from core.models import StoreProduct
+from core.serializers import decimal_converter
+
+
+class DecimalConverterTests(SimpleTestCase):
+
+    def test_matches_drf_decimal_field(self):
+        """Test the str() fast path agrees with DRF, exponents included"""
+        model_field = StoreProduct._meta.get_field('fifo_value')
+        drf_field = serializers.DecimalField(
+            max_digits=model_field.max_digits,
+            decimal_places=model_field.decimal_places,
+        )
+        convert = decimal_converter(model_field)
+
+        for value in (
+            '0',
+            '0E-10',
+            '-0.0000',
+            '1E+3',
+            '0.00001',
+            '12.5',
+            '-3.14159',
+            '123456789012.1234',
+        ):
+            self.assertEqual(
+                convert(Decimal(value)),
+                drf_field.to_representation(Decimal(value)),
+                value,
+            )
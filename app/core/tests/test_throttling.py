@@ -0,0 +1,166 @@
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app import settings as project_settings
+from core import throttling
+from core.tests import factories
+
+STORES_URL = reverse('store:store-list')
+
+
+class TokenBucketTests(TestCase):
+    """Test the shared token bucket and its process-local fast path"""
+
+    def setUp(self):
+        cache.clear()
+        throttling._buckets.clear()
+
+    def test_take_shared_refills_up_to_capacity(self):
+        now = 1_000_000.0
+        self.assertEqual(throttling.take_shared('bucket', 10, 1, 15, now), 10)
+        self.assertEqual(throttling.take_shared('bucket', 10, 1, 1, now), 0)
+        self.assertEqual(
+            throttling.take_shared('bucket', 10, 1, 5, now + 3), 3
+        )
+        # A bucket left alone for long is full, not fuller
+        self.assertEqual(
+            throttling.take_shared('bucket', 10, 1, 15, now + 3600), 10
+        )
+
+    def test_concurrent_refills_do_not_overdraw(self):
+        """Test two processes catching up the same idle bucket correct it once
+        """
+        now = 1_000_000.0
+        later = now + 3600
+        throttling.take_shared('bucket', 10, 1, 10, now)
+        granted = []
+        raced = []
+        incr = cache.incr
+
+        def incr_then_race(key, delta=1, *args, **kwargs):
+            value = incr(key, delta, *args, **kwargs)
+            if not raced:
+                # Another process takes its lease before this one has caught
+                # the bucket up
+                raced.append(True)
+                granted.append(
+                    throttling.take_shared('bucket', 10, 1, 5, later)
+                )
+            return value
+
+        with mock.patch.object(cache, 'incr', side_effect=incr_then_race):
+            granted.append(throttling.take_shared('bucket', 10, 1, 5, later))
+
+        self.assertEqual(granted, [5, 5])
+        self.assertLessEqual(cache.get('bucket'), int(later) + 10)
+        self.assertEqual(
+            throttling.take_shared('bucket', 10, 1, 1, later + 11), 1
+        )
+
+    def throttle_rates(self):
+        settings = runpy.run_path(project_settings.__file__)
+        return settings['REST_FRAMEWORK']['DEFAULT_THROTTLE_RATES']
+
+    def test_rates_need_a_shared_cache(self):
+        """Test throttles are off without CACHE_LOCATION, and rates refused"""
+        unset = (
+            'CACHE_LOCATION', 'THROTTLE_READ_RATE', 'THROTTLE_WRITE_RATE',
+            'DB_REPLICA_HOSTS',
+        )
+        environ = {
+            key: value for key, value in os.environ.items()
+            if key not in unset
+        }
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(
+                self.throttle_rates(), {'read': None, 'write': None}
+            )
+            os.environ['THROTTLE_READ_RATE'] = '100/min'
+            with self.assertRaises(ImproperlyConfigured):
+                runpy.run_path(project_settings.__file__)
+            os.environ['CACHE_LOCATION'] = 'memcached.internal:11211'
+            self.assertEqual(
+                self.throttle_rates(), {'read': '100/min', 'write': '300/min'}
+            )
+
+    def test_allow_spends_leased_tokens_without_cache(self):
+        now = 1_000_000.0
+        self.assertTrue(throttling.allow('bucket', 100, 1, now))
+        cache.clear()
+        leased = max(1, int(100 * throttling.LEASE_FRACTION)) - 1
+
+        for _ in range(leased):
+            self.assertTrue(throttling.allow('bucket', 100, 1, now))
+        self.assertEqual(cache.get('bucket'), None)
+
+    def test_allow_blocks_until_refill(self):
+        now = 1_000_000.0
+        results = [throttling.allow('bucket', 3, 0.5, now) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        cache.clear()
+        self.assertFalse(throttling.allow('bucket', 3, 0.5, now + 1))
+        self.assertTrue(throttling.allow('bucket', 3, 0.5, now + 2))
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'read': '3/min', 'write': '2/min'},
+})
+class ThrottleApiTests(TestCase):
+    """Test requests are throttled per user, reads and writes apart"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_superuser()
+        cls.other_admin = factories.create_superuser(email='other@admin.com')
+
+    def setUp(self):
+        cache.clear()
+        throttling._buckets.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_writes_throttled_separately_from_reads(self):
+        codes = [
+            self.client.post(
+                STORES_URL, {'name': f'Store#{i}', 'city': 'Cairo'}
+            ).status_code
+            for i in range(3)
+        ]
+        self.assertEqual(
+            codes,
+            [
+                status.HTTP_201_CREATED,
+                status.HTTP_201_CREATED,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ],
+        )
+
+        res = self.client.get(STORES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_throttled_response_has_retry_after(self):
+        for _ in range(3):
+            self.client.get(STORES_URL)
+        res = self.client.get(STORES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '20')
+
+    def test_users_have_separate_buckets(self):
+        for _ in range(3):
+            self.client.get(STORES_URL)
+        self.client.force_authenticate(self.other_admin)
+        res = self.client.get(STORES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
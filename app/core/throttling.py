@@ -0,0 +1,141 @@
+"""Token-bucket rate limiting shared across processes
+
+Every (scope, client) pair has a bucket of `capacity` tokens refilled at
+`capacity / period` tokens per second. The shared state is one integer in
+the default cache: the number of tokens ever taken, where a bucket holds
+`capacity + rate * now - taken` tokens. Taking tokens is therefore a single
+atomic incr(), with no read-modify-write race between processes. A bucket
+that sat full must forget the tokens it could not hold by raising `taken`;
+that correction is made by one process at a time under a short cache lock,
+from a fresh read of the counter.
+
+The buckets only limit a client across worker processes when the default
+cache is shared, so the throttles are only enabled with CACHE_LOCATION
+(see settings).
+
+Each process leases tokens from the shared bucket in batches of
+LEASE_FRACTION of the capacity and spends them locally, and remembers
+when an empty bucket refills, so most requests are decided in memory and
+never reach the cache.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+LEASE_FRACTION = 0.05
+KEY_TIMEOUT = 24 * 60 * 60
+REFILL_LOCK_SECONDS = 1
+MAX_LOCAL_BUCKETS = 10000
+
+
+class LocalBucket:
+    """Tokens a process has leased from a shared bucket"""
+    __slots__ = ('tokens', 'blocked_until')
+
+    def __init__(self):
+        self.tokens = 0
+        self.blocked_until = 0.0
+
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+def take_shared(key, capacity, rate, tokens, now):
+    """Take up to `tokens` from the shared bucket `key`, returning how many"""
+    minted = int(rate * now)
+    cache.add(key, minted, KEY_TIMEOUT)
+    taken = cache.incr(key, tokens) - tokens
+    if taken < minted:
+        # The bucket has been full a while; tokens beyond capacity are lost
+        catch_up(key, minted)
+        taken = minted
+    granted = max(0, min(tokens, capacity + minted - taken))
+    if granted < tokens:
+        cache.decr(key, tokens - granted)
+    return granted
+
+
+def catch_up(key, minted):
+    """Raise the tokens taken from bucket `key` to at least `minted`
+
+    Concurrent callers all see the bucket behind, so only the holder of
+    the lock corrects it, by the amount it is behind when re-read. The
+    others go on as if the bucket were already corrected.
+    """
+    lock = f'{key}:catch-up'
+    if cache.add(lock, True, REFILL_LOCK_SECONDS):
+        try:
+            behind = minted - cache.get(key, minted)
+            if behind > 0:
+                cache.incr(key, behind)
+        finally:
+            cache.delete(lock)
+
+
+def allow(key, capacity, rate, now=None):
+    """Take a token from bucket `key`, returning whether the request may go"""
+    now = time.time() if now is None else now
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            if len(_buckets) >= MAX_LOCAL_BUCKETS:
+                # Forgetting leased tokens only makes the limit stricter
+                _buckets.clear()
+            bucket = _buckets[key] = LocalBucket()
+        if bucket.tokens:
+            bucket.tokens -= 1
+            return True
+        if now < bucket.blocked_until:
+            return False
+
+    try:
+        granted = take_shared(
+            key, capacity, rate, max(1, int(capacity * LEASE_FRACTION)), now
+        )
+    except ValueError:
+        # Evicted between add() and incr(); start over with a full bucket
+        cache.delete(key)
+        granted = take_shared(key, capacity, rate, 1, now)
+
+    with _lock:
+        if granted:
+            bucket.tokens += granted - 1
+            return True
+        bucket.blocked_until = now + 1 / rate
+        return False
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each user (or anonymous IP) separately for reads and writes
+
+    The scope is the view's `throttle_scope` when set, else `read` for safe
+    methods and `write` for the others. Rates come from DEFAULT_THROTTLE_RATES
+    in DRF's "number/period" format; scopes without a rate are not throttled.
+    """
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None) or (
+            'read' if request.method in SAFE_METHODS else 'write'
+        )
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, period = SimpleRateThrottle.parse_rate(None, rate)
+        self.refill_rate = capacity / period
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'anon:{self.get_ident(request)}'
+        return allow(f'throttle:{scope}:{ident}', capacity, self.refill_rate)
+
+    def wait(self):
+        return 1 / self.refill_rate
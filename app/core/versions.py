@@ -0,0 +1,52 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'catalog-version'
+
+
+def stock_version_key(store_id):
+    return f'stock-version:{store_id}'
+
+
+def current_version(key):
+    """Return the version stored under `key`
+
+    A missing version (first use or evicted) starts from the clock, so it
+    never falls back to a value that cached answers were stored under.
+    """
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def bump_versions(keys):
+    """Increment the versions under `keys` once the current transaction commits
+    """
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def stock_version(store_id):
+    """Return the current stock version of a store"""
+    return current_version(stock_version_key(store_id))
+
+
+def bump_stock_version(*store_ids):
+    """Invalidate the cached stock answers of `store_ids` on commit"""
+    bump_versions({stock_version_key(store_id) for store_id in store_ids})
+
+
+def catalog_version():
+    """Return the current version of the product catalog and its variants"""
+    return current_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate the cached catalog answers once the transaction commits"""
+    bump_versions([CATALOG_VERSION_KEY])
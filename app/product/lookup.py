@@ -0,0 +1,51 @@
+"""Barcode to product resolution for scanners
+
+Answers are cached per (catalog version, GTIN). Writes to products and
+variants bump the catalog version on commit, so a cached answer is never
+served after the product it describes has changed. Unknown barcodes are
+cached too, so a scanner retrying a bad label stays off the database.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import ProductVariant
+from core.versions import catalog_version
+from product.serializers import VariantLookupValuesSerializer, normalize_gtin
+
+
+def barcode_key(version, gtin):
+    return f'barcode:{version}:{gtin}'
+
+
+def load_variants(gtins):
+    """Return {gtin: lookup row} for the existing variants of `gtins`"""
+    serializer = VariantLookupValuesSerializer(
+        ProductVariant.objects.filter(barcode__in=gtins)
+    )
+    return {row['barcode']: row for row in serializer.data}
+
+
+def lookup_barcodes(codes):
+    """Return {code: lookup row or None} for each scanned code
+
+    Invalid codes resolve to None without touching the cache or database.
+    """
+    gtins = {code: normalize_gtin(code) for code in codes}
+    wanted = set(filter(None, gtins.values()))
+    found = {}
+    if wanted:
+        version = catalog_version()
+        keys = {barcode_key(version, gtin): gtin for gtin in wanted}
+        found = {keys[key]: row for key, row in cache.get_many(keys).items()}
+
+        missing = wanted - set(found)
+        if missing:
+            loaded = load_variants(missing)
+            found.update({gtin: loaded.get(gtin) for gtin in missing})
+            cache.set_many(
+                {barcode_key(version, gtin): found[gtin] for gtin in missing},
+                settings.BARCODE_CACHE_SECONDS,
+            )
+    return {
+        code: found.get(gtin) if gtin else None for code, gtin in gtins.items()
+    }
@@ -0,0 +1,37 @@
+"""Server-issued price quotes
+
+A quote is a product id and the time it was priced at, signed with
+SECRET_KEY. A transaction carrying a quote is priced at that time, so a
+price change does not break a transaction quoted just before it, while
+clients cannot pick an earlier, cheaper time themselves.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+SALT = 'product.quotes'
+
+
+def issue_quote(product_id):
+    """Return (priced_at, signed quote) pricing `product_id` now"""
+    priced_at = timezone.now()
+    return priced_at, signing.dumps(
+        {'product': product_id, 'priced_at': priced_at.isoformat()}, salt=SALT
+    )
+
+
+def read_quote(quote, product_id):
+    """Return the time `quote` priced `product_id` at, or None if invalid
+
+    A quote is invalid if it is forged, expired or for another product.
+    """
+    try:
+        data = signing.loads(
+            quote, salt=SALT, max_age=settings.PRICE_QUOTE_SECONDS
+        )
+    except signing.BadSignature:
+        return None
+    if data.get('product') != product_id:
+        return None
+    return parse_datetime(data['priced_at'])
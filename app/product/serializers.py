@@ -1,6 +1,25 @@
 from rest_framework import serializers
 
-from core.models import Product
+from core.models import Product, ProductPrice, ProductVariant
+from core.serializers import ValuesSerializer
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+MAX_LOOKUP_BARCODES = 500
+
+
+def normalize_gtin(code):
+    """Return `code` as a 14-digit GTIN, or None if it is not a valid GTIN"""
+    code = str(code).strip()
+    if len(code) not in GTIN_LENGTHS or not code.isdigit():
+        return None
+    code = code.zfill(14)
+    total = sum(
+        int(digit) * (3 if index % 2 == 0 else 1)
+        for index, digit in enumerate(code[:-1])
+    )
+    if (10 - total % 10) % 10 != int(code[-1]):
+        return None
+    return code
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -8,6 +27,116 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ('id', 'name', 'supplier_id', 'price', 'image', 'created_at', 'updated_at')
+        fields = (
+            'id',
+            'name',
+            'supplier_id',
+            'category',
+            'price',
+            'image',
+            'created_at',
+            'updated_at',
+        )
         read_only_fields = ('id', 'supplier_id')
 
+
+class ProductVariantSerializer(serializers.ModelSerializer):
+    """Serializes ProductVariant objects, storing barcodes as 14-digit GTINs"""
+
+    class Meta:
+        model = ProductVariant
+        fields = (
+            'id',
+            'product',
+            'size',
+            'color',
+            'barcode',
+            'created_at',
+            'updated_at',
+        )
+        read_only_fields = ('id', 'created_at', 'updated_at')
+
+    def validate_barcode(self, value):
+        gtin = normalize_gtin(value)
+        if gtin is None:
+            raise serializers.ValidationError(
+                'Enter a valid GTIN-8, UPC-A, EAN-13 or GTIN-14 barcode.'
+            )
+        variants = ProductVariant.objects.filter(barcode=gtin)
+        if self.instance is not None:
+            variants = variants.exclude(pk=self.instance.pk)
+        if variants.exists():
+            raise serializers.ValidationError(
+                'A variant with this barcode already exists.'
+            )
+        return gtin
+
+    def validate(self, attrs):
+        product = attrs.get('product', getattr(self.instance, 'product', None))
+        size = attrs.get('size', getattr(self.instance, 'size', ''))
+        color = attrs.get('color', getattr(self.instance, 'color', ''))
+        variants = ProductVariant.objects.filter(
+            product=product, size=size, color=color
+        )
+        if self.instance is not None:
+            variants = variants.exclude(pk=self.instance.pk)
+        if variants.exists():
+            raise serializers.ValidationError(
+                'This product already has a variant of this size and color.'
+            )
+        return attrs
+
+
+class BarcodeBatchSerializer(serializers.Serializer):
+    """Validates a batch of scanned barcodes to look up"""
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=14), allow_empty=False
+    )
+
+    def validate_barcodes(self, value):
+        if len(value) > MAX_LOOKUP_BARCODES:
+            raise serializers.ValidationError(
+                f'Look up at most {MAX_LOOKUP_BARCODES} barcodes per request.'
+            )
+        return value
+
+
+class ProductPriceSerializer(serializers.ModelSerializer):
+    """Serializes ProductPrice objects"""
+
+    class Meta:
+        model = ProductPrice
+        fields = ('price', 'effective_from', 'created_at')
+        read_only_fields = fields
+
+
+class PriceQuoteSerializer(serializers.Serializer):
+    """Serializes a signed quote of the price of a product"""
+    product = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    priced_at = serializers.DateTimeField()
+    quote = serializers.CharField()
+
+
+class RepriceSerializer(serializers.Serializer):
+    """Serializes a percentage price change of many products"""
+    percent = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=-99.99
+    )
+    effective_from = serializers.DateTimeField(required=False)
+    products = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    """Fast read-only Product rows, same output as ProductSerializer"""
+    model = Product
+    fields = ProductSerializer.Meta.fields
+
+
+class VariantLookupValuesSerializer(ValuesSerializer):
+    """A variant and its product, as returned by the barcode lookup"""
+    model = ProductVariant
+    fields = ('id', 'barcode', 'size', 'color', 'product')
+    nested = {'product': ProductValuesSerializer}
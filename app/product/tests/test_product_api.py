@@ -1,12 +1,17 @@
+import time
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
+from django.utils.http import http_date
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Product
-from product.serializers import ProductSerializer
+from core.tests import factories
+from product.serializers import ProductSerializer, ProductValuesSerializer
 
 PRODUCTS_URL = reverse('product:product-list')
 PRODUCT_PAYLOAD = {
@@ -28,13 +33,14 @@ def sample_product(supplier_id, name='test_product', price='100.00', image=''):
 class PublicProductApiTest(TestCase):
     """Test the public available API"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.create_user(
+            'Supplier', 'user@user.com', 'user123'
+        )
+
     def setUp(self):
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'user@user.com',
-            'Supplier',
-            'user123'
-        )
 
     def test_list_products(self):
         """Test that anyone can list available products"""
@@ -51,6 +57,43 @@ class PublicProductApiTest(TestCase):
         self.assertEqual(res.data, serializer.data)
         self.assertEqual(len(res.data), 3)
 
+    def test_list_products_matches_serializer_bytes(self):
+        """Test the fast list path renders the same JSON as ProductSerializer
+        """
+        sample_product(
+            supplier_id=self.user, name='caf\u00e9 \u2028 line', price='0.5'
+        )
+        sample_product(
+            supplier_id=self.user, price='999999.99', image='img.png'
+        )
+
+        res = self.client.get(PRODUCTS_URL)
+
+        products = Product.objects.all()
+        expected = JSONRenderer().render(
+            ProductSerializer(products, many=True).data
+        )
+        self.assertEqual(res.content, expected)
+        self.assertEqual(
+            JSONRenderer().render(ProductValuesSerializer(products).data),
+            expected,
+        )
+
+    def test_list_products_ignores_if_modified_since(self):
+        """Test a delete is not hidden behind a 304 for If-Modified-Since"""
+        sample_product(supplier_id=self.user)
+        deleted = sample_product(supplier_id=self.user)
+
+        res = self.client.get(PRODUCTS_URL)
+        deleted.delete()
+        res_after = self.client.get(
+            PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+
+        self.assertNotIn('Last-Modified', res)
+        self.assertEqual(res_after.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res_after.data), 1)
+
     def test_view_product_detail(self):
         """Test that anyone can view a specific detail"""
         product = sample_product(supplier_id=self.user)
@@ -67,12 +110,13 @@ class PublicProductApiTest(TestCase):
 class PrivateProductApiTest(TestCase):
     """Test the authorized product API"""
 
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'user@user.com',
-            'Supplier',
-            'user123'
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.create_user(
+            'Supplier', 'user@user.com', 'user123'
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -0,0 +1,163 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ProductVariant
+from core.tests import factories
+from product.serializers import MAX_LOOKUP_BARCODES, normalize_gtin
+
+VARIANTS_URL = reverse('product:productvariant-list')
+LOOKUP_URL = reverse('product:product-lookup-list')
+LOOKUP_BATCH_URL = reverse('product:product-lookup-batch')
+
+
+def product_url(product_id):
+    return reverse('product:product-detail', args=[product_id])
+
+
+class GtinTests(TestCase):
+    """Test barcode normalization"""
+
+    def test_normalize_gtin(self):
+        self.assertEqual(normalize_gtin('4006381333931'), '04006381333931')
+        self.assertEqual(normalize_gtin('036000291452'), '00036000291452')
+        self.assertEqual(normalize_gtin('96385074'), '00000096385074')
+        self.assertEqual(normalize_gtin(' 00036000291452 '), '00036000291452')
+
+    def test_normalize_gtin_invalid(self):
+        self.assertIsNone(normalize_gtin('4006381333932'))
+        self.assertIsNone(normalize_gtin('40063813339'))
+        self.assertIsNone(normalize_gtin('40063813339a1'))
+
+
+class ProductLookupApiTest(TestCase):
+    """Test product variants and the barcode lookup"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = factories.create_user('Supplier')
+        cls.product = factories.create_product(
+            cls.supplier, name='Shirt', price='20.00'
+        )
+        cls.small = ProductVariant.objects.create(
+            product=cls.product,
+            size='S',
+            color='red',
+            barcode='04006381333931',
+        )
+        cls.large = ProductVariant.objects.create(
+            product=cls.product,
+            size='L',
+            color='red',
+            barcode='00036000291452',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_create_variant_normalizes_barcode(self):
+        self.client.force_authenticate(self.supplier)
+        res = self.client.post(
+            VARIANTS_URL,
+            {
+                'product': self.product.id,
+                'size': 'M',
+                'color': 'red',
+                'barcode': '5901234123457',
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['barcode'], '05901234123457')
+
+    def test_create_variant_rejects_bad_or_duplicate_barcode(self):
+        self.client.force_authenticate(self.supplier)
+        invalid = self.client.post(
+            VARIANTS_URL,
+            {
+                'product': self.product.id,
+                'size': 'M',
+                'barcode': '5901234123458',
+            },
+        )
+        duplicate = self.client.post(
+            VARIANTS_URL,
+            {
+                'product': self.product.id,
+                'size': 'M',
+                'barcode': '4006381333931',
+            },
+        )
+        same_variant = self.client.post(
+            VARIANTS_URL,
+            {
+                'product': self.product.id,
+                'size': 'S',
+                'color': 'red',
+                'barcode': '5901234123457',
+            },
+        )
+
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(duplicate.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(same_variant.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookup_is_cached(self):
+        """Test a barcode is resolved with one query, then from the cache"""
+        with self.assertNumQueries(1):
+            res = self.client.get(LOOKUP_URL, {'barcode': '4006381333931'})
+        with self.assertNumQueries(0):
+            res_cached = self.client.get(
+                LOOKUP_URL, {'barcode': '04006381333931'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], self.small.id)
+        self.assertEqual(res.data['size'], 'S')
+        self.assertEqual(res.data['product']['name'], 'Shirt')
+        self.assertEqual(res.data['product']['price'], '20.00')
+        self.assertEqual(res_cached.data, res.data)
+
+    def test_lookup_not_found(self):
+        res = self.client.get(LOOKUP_URL, {'barcode': '5901234123457'})
+        res_invalid = self.client.get(LOOKUP_URL, {'barcode': 'nonsense'})
+        res_missing = self.client.get(LOOKUP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res_invalid.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res_missing.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_product_update_invalidates_lookup(self):
+        self.client.get(LOOKUP_URL, {'barcode': '4006381333931'})
+        self.client.force_authenticate(self.supplier)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(product_url(self.product.id), {'price': '25.00'})
+
+        res = self.client.get(LOOKUP_URL, {'barcode': '4006381333931'})
+
+        self.assertEqual(res.data['product']['price'], '25.00')
+
+    def test_batch_lookup(self):
+        codes = ['4006381333931', '036000291452', '5901234123457', 'nonsense']
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                LOOKUP_BATCH_URL, {'barcodes': codes}, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data), codes)
+        self.assertEqual(res.data['4006381333931']['id'], self.small.id)
+        self.assertEqual(res.data['036000291452']['id'], self.large.id)
+        self.assertIsNone(res.data['5901234123457'])
+        self.assertIsNone(res.data['nonsense'])
+
+    def test_batch_lookup_limit(self):
+        codes = ['4006381333931'] * (MAX_LOOKUP_BARCODES + 1)
+        res = self.client.post(
+            LOOKUP_BATCH_URL, {'barcodes': codes}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,142 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Change, Product, ProductPrice
+
+PRODUCTS_URL = reverse('product:product-list')
+REPRICE_URL = reverse('product:product-list') + 'my-products/reprice/'
+
+
+def prices_url(product_id):
+    """Return Product price history URL"""
+    return reverse('product:product-prices', args=[product_id])
+
+
+class ProductPriceApiTest(TestCase):
+    """Test effective-dated product prices"""
+
+    def setUp(self):
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'test123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@other.com', 'Supplier', 'test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.supplier)
+
+    def create_product(self, price):
+        res = self.client.post(
+            PRODUCTS_URL, {'name': 'Laptop', 'price': price, 'image': ''}
+        )
+        return Product.objects.get(pk=res.data['id'])
+
+    def test_price_changes_are_recorded(self):
+        """Test creating and repricing a product keeps its price history"""
+        product = self.create_product('100.00')
+        self.client.patch(
+            reverse('product:product-detail', args=[product.id]),
+            {'name': 'Renamed'},
+        )
+        self.client.patch(
+            reverse('product:product-detail', args=[product.id]),
+            {'price': '120.00'},
+        )
+
+        res = self.client.get(prices_url(product.id))
+
+        self.assertEqual(
+            [row['price'] for row in res.data], ['120.00', '100.00']
+        )
+
+    def test_price_at_point_in_time(self):
+        product = self.create_product('100.00')
+        created = product.created_at
+        ProductPrice.objects.create(
+            product=product,
+            price='80.00',
+            effective_from=created + datetime.timedelta(days=1),
+        )
+
+        self.assertEqual(
+            ProductPrice.objects.prices_at([product.id], created)[product.id],
+            Decimal('100.00'),
+        )
+        self.assertEqual(
+            ProductPrice.objects.prices_at(
+                [product.id], created + datetime.timedelta(days=2)
+            )[product.id],
+            Decimal('80.00'),
+        )
+
+    def test_one_price_per_product_and_time(self):
+        """Test the unique constraint holds with or without INCLUDE"""
+        product = self.create_product('100.00')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductPrice.objects.create(
+                product=product,
+                price='90.00',
+                effective_from=product.created_at,
+            )
+
+    def test_reprice_catalog(self):
+        """Test a percentage reprice changes every product of the supplier"""
+        products = [self.create_product(price) for price in ('100.00', '9.99')]
+        foreign = Product.objects.create(
+            supplier_id=self.other, name='Other', price='50.00'
+        )
+
+        with self.assertNumQueries(7):
+            res = self.client.post(REPRICE_URL, {'percent': '10'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['repriced'], 2)
+        self.assertEqual(
+            list(
+                Product.objects.filter(id__in=[p.id for p in products])
+                .order_by('id')
+                .values_list('price', flat=True)
+            ),
+            [Decimal('110.00'), Decimal('10.99')],
+        )
+        self.assertEqual(
+            Product.objects.get(pk=foreign.pk).price, Decimal('50.00')
+        )
+        self.assertEqual(
+            Change.objects.filter(
+                kind=Change.PRODUCT, price=Decimal('110.00')
+            ).count(),
+            1,
+        )
+
+    def test_scheduled_reprice_applies_when_effective(self):
+        product = self.create_product('100.00')
+        effective_from = timezone.now() + datetime.timedelta(hours=1)
+
+        self.client.post(
+            REPRICE_URL,
+            {'percent': '-25', 'effective_from': effective_from.isoformat()},
+            format='json',
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.price, Decimal('100.00'))
+
+        ProductPrice.objects.filter(
+            product=product, effective_from=effective_from
+        ).update(effective_from=timezone.now())
+        call_command('apply_price_changes', stdout=StringIO())
+        product.refresh_from_db()
+
+        self.assertEqual(product.price, Decimal('75.00'))
@@ -5,6 +5,10 @@ from product import views
 
 router = DefaultRouter()
 router.register('my-products', views.MyProductViewSet)
+router.register('variants', views.ProductVariantViewSet)
+router.register(
+    'lookup', views.ProductLookupViewSet, basename='product-lookup'
+)
 router.register('', views.ProductViewSet)
 
 app_name = 'product'
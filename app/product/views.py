@@ -1,27 +1,165 @@
-from rest_framework import viewsets
+from django.db import transaction
+from rest_framework import status, viewsets
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny, IsAuthenticated
 
-from core.models import Product
+from core import edits
+from core.mixins import (
+    ConditionalGetMixin, FastListModelMixin, ReplicaReadMixin,
+)
+from core.models import Product, ProductPrice, ProductVariant
 from core.permissions import IsAuthenticatedOrReadOnly
+from core.versions import bump_catalog_version
 
-from product import serializers
+from product import lookup, quotes, serializers
 
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    FastListModelMixin,
+    viewsets.ModelViewSet,
+):
 
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
     queryset = Product.objects.all()
     serializer_class = serializers.ProductSerializer
+    values_serializer_class = serializers.ProductValuesSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new Product"""
-        serializer.save(supplier_id=self.request.user)
+        edits.product_created(serializer.save(supplier_id=self.request.user))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Update a Product and record its new price"""
+        previous_price = serializer.instance.price
+        edits.product_updated(serializer.save(), previous_price)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete a Product and record the deletion"""
+        edits.product_deleted(instance)
+        instance.delete()
+
+    @action(detail=True)
+    def prices(self, request, pk=None):
+        """List the price history of a product, newest first"""
+        prices = self.get_object().prices.order_by('-effective_from')
+        return Response(
+            serializers.ProductPriceSerializer(prices, many=True).data
+        )
+
+    @action(detail=True)
+    def quote(self, request, pk=None):
+        """Quote the current price of a product for a transaction to use"""
+        product = self.get_object()
+        priced_at, quote = quotes.issue_quote(product.id)
+        prices = ProductPrice.objects.prices_at([product.id], priced_at)
+        price = prices[product.id]
+        return Response(
+            serializers.PriceQuoteSerializer(
+                {
+                    'product': product.id,
+                    'price': price,
+                    'priced_at': priced_at,
+                    'quote': quote,
+                }
+            ).data
+        )
 
 
 class MyProductViewSet(ProductViewSet):
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         return self.queryset.filter(supplier_id=self.request.user.id)
+
+    @action(detail=False, methods=['post'])
+    def reprice(self, request):
+        """Change the prices of the catalog (or `products`) by a percentage
+
+        Prices effective in the future are applied by `apply_price_changes`.
+        """
+        serializer = serializers.RepriceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        products = self.get_queryset()
+        if 'products' in serializer.validated_data:
+            products = products.filter(
+                id__in=serializer.validated_data['products']
+            )
+        repriced = ProductPrice.objects.reprice(
+            products,
+            serializer.validated_data['percent'],
+            serializer.validated_data.get('effective_from'),
+        )
+        return Response({'repriced': repriced})
+
+
+class ProductVariantViewSet(viewsets.ModelViewSet):
+    """Manage the sizes, colors and barcodes of products"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    queryset = ProductVariant.objects.order_by('product', 'id')
+    serializer_class = serializers.ProductVariantSerializer
+
+    def get_queryset(self):
+        """Filter on ?product= when given"""
+        queryset = self.queryset
+        product = self.request.query_params.get('product')
+        if product:
+            if not product.isdigit():
+                raise ValidationError(
+                    {'product': 'A valid integer is required.'}
+                )
+            queryset = queryset.filter(product=product)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save()
+        bump_catalog_version()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_catalog_version()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_catalog_version()
+
+
+class ProductLookupViewSet(viewsets.ViewSet):
+    """Resolve scanned barcodes to product variants from a read-through cache
+    """
+
+    permission_classes = (AllowAny,)
+    throttle_scope = 'read'
+
+    def list(self, request):
+        """Look up the variant of ?barcode="""
+        barcode = request.query_params.get('barcode')
+        if not barcode:
+            raise ValidationError(
+                {'barcode': 'This query parameter is required.'}
+            )
+        variant = lookup.lookup_barcodes([barcode])[barcode]
+        if variant is None:
+            return Response(
+                {'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(variant)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Look up to 500 barcodes at once, each to a variant or null"""
+        serializer = serializers.BarcodeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            lookup.lookup_barcodes(serializer.validated_data['barcodes'])
+        )
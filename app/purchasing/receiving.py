@@ -0,0 +1,188 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core import audit, events
+from core.bulk import update_from_values
+from core.versions import bump_stock_version
+from core.models import (
+    Change, CostLayer, GoodsReceipt, Lot, PurchaseOrder, PurchaseOrderLine,
+    Store, StoreProduct, Transaction, TransactionProduct,
+)
+
+
+@transaction.atomic
+def receive_goods(order, created_by, lines):
+    """Receive the `lines` of a delivery against a purchase order
+
+    Quantities are checked against what is still outstanding on the order.
+    The delivery is posted as one IN transaction from the supplier, paid
+    from the store cash, and received at the ordered unit costs. The number
+    of queries does not depend on the number of lines. Returns the receipt.
+    """
+    order = PurchaseOrder.objects.select_for_update().get(pk=order.pk)
+    if order.status == PurchaseOrder.RECEIVED:
+        raise ValidationError({
+            'status':
+                'This purchase order has already been received in full.'
+        })
+
+    received = defaultdict(int)
+    for line in lines:
+        received[line['product_id']] += line['quantity']
+    order_lines = {
+        line.product_id: line
+        for line in order.lines.select_for_update().order_by('product_id')
+    }
+    unknown = sorted(set(received) - set(order_lines))
+    if unknown:
+        raise ValidationError(
+            {'lines': f'Products {unknown} are not on this purchase order.'}
+        )
+    outstanding = {
+        product_id: line.quantity - line.received
+        for product_id, line in order_lines.items()
+    }
+    over = sorted(
+        product_id for product_id, quantity in received.items()
+        if quantity > outstanding[product_id]
+    )
+    if over:
+        raise ValidationError({
+            'lines':
+                f'More units received than outstanding for products {over}.'
+        })
+
+    product_ids = sorted(received)
+    amount = sum(
+        (order_lines[pid].unit_cost * received[pid] for pid in product_ids),
+        Decimal(0),
+    )
+    store = Store.objects.select_for_update().get(pk=order.store_id)
+    if store.cash < amount:
+        raise ValidationError(
+            {'lines': 'Not enough cash in store to pay for this delivery.'}
+        )
+    previous_cash = store.cash
+    store.cash -= amount
+    store.save(update_fields=['cash', 'updated_at'])
+
+    trx = Transaction.objects.create(
+        created_by=created_by,
+        party_id=order.supplier_id,
+        store=store,
+        trx_type='IN',
+        amount=amount,
+    )
+
+    StoreProduct.objects.bulk_create(
+        [
+            StoreProduct(store_id=store, product_id_id=product_id, quantity=0)
+            for product_id in product_ids
+        ],
+        ignore_conflicts=True,
+    )
+    stock = {
+        row.product_id_id: row
+        for row in StoreProduct.objects.select_for_update().filter(
+            store_id=store, product_id__in=product_ids
+        ).order_by('product_id')
+    }
+    CostLayer.objects.receive_many(
+        trx,
+        [
+            (
+                stock[product_id],
+                [(order_lines[product_id].unit_cost, received[product_id])],
+            )
+            for product_id in product_ids
+        ],
+    )
+    previous_quantities = {
+        product_id: row.quantity for product_id, row in stock.items()
+    }
+    for product_id in product_ids:
+        stock[product_id].quantity += received[product_id]
+        order_lines[product_id].received += received[product_id]
+    update_from_values(
+        StoreProduct,
+        stock.values(),
+        ['quantity', 'average_cost', 'fifo_value'],
+    )
+    update_from_values(
+        PurchaseOrderLine,
+        [order_lines[product_id] for product_id in product_ids],
+        ['received'],
+    )
+    try:
+        Lot.objects.receive_many(
+            store.id,
+            [
+                (
+                    line['product_id'],
+                    line['lot'],
+                    line.get('expires_on'),
+                    line['quantity'],
+                )
+                for line in lines
+                if line.get('lot')
+            ],
+        )
+    except ValueError as error:
+        raise ValidationError({'lines': str(error)})
+
+    TransactionProduct.objects.bulk_create(
+        (
+            TransactionProduct(
+                trx_id=trx,
+                product_id_id=product_id,
+                quantity=received[product_id],
+                created_at=trx.created_at,
+            )
+            for product_id in product_ids
+        ),
+        batch_size=5000,
+    )
+    changes = Change.objects.bulk_create(
+        (
+            Change(
+                kind=Change.STOCK,
+                store_id=store.id,
+                product_id=product_id,
+                quantity=stock[product_id].quantity,
+            )
+            for product_id in product_ids
+        ),
+        batch_size=5000,
+    )
+
+    audit.record([
+        audit.cash_change(store, previous_cash),
+        *(
+            audit.stock_change(
+                stock[product_id], previous_quantities[product_id]
+            )
+            for product_id in product_ids
+        ),
+    ])
+
+    outstanding = any(
+        line.received < line.quantity for line in order_lines.values()
+    )
+    order.status = (
+        PurchaseOrder.PARTIAL if outstanding else PurchaseOrder.RECEIVED
+    )
+    order.save(update_fields=['status', 'updated_at'])
+    receipt = GoodsReceipt.objects.create(
+        order=order, trx=trx, created_by=created_by
+    )
+
+    def publish():
+        events.publish_stock(changes)
+        events.publish(store.id, events.cash_event(store))
+
+    transaction.on_commit(publish)
+    bump_stock_version(store.id)
+    return receipt
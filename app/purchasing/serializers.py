@@ -0,0 +1,144 @@
+from rest_framework import serializers
+
+from core.models import (
+    GoodsReceipt, Product, PurchaseOrder, PurchaseOrderLine, Store, User,
+)
+
+MAX_LINES = 5000
+
+
+class PurchaseOrderLineSerializer(serializers.ModelSerializer):
+    """Serializes PurchaseOrderLine objects, costed at the price by default"""
+    product = serializers.IntegerField(source='product_id')
+    quantity = serializers.IntegerField(min_value=1)
+    unit_cost = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=0, required=False
+    )
+
+    class Meta:
+        model = PurchaseOrderLine
+        fields = ('product', 'quantity', 'received', 'unit_cost')
+        read_only_fields = ('received',)
+
+
+class PurchaseOrderSerializer(serializers.ModelSerializer):
+    """Serializes PurchaseOrder objects, creating them with their lines"""
+    supplier = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(user_type='Supplier')
+    )
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all())
+    lines = PurchaseOrderLineSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = (
+            'id',
+            'supplier',
+            'store',
+            'created_by',
+            'status',
+            'created_at',
+            'updated_at',
+            'lines',
+        )
+        read_only_fields = (
+            'id',
+            'created_by',
+            'status',
+            'created_at',
+            'updated_at',
+        )
+
+    def validate(self, attrs):
+        """Check products are ordered once and sold by the supplier"""
+        lines = attrs['lines']
+        if len(lines) > MAX_LINES:
+            raise serializers.ValidationError({
+                'lines':
+                    f'A purchase order can have at most {MAX_LINES} lines.'
+            })
+        product_ids = [line['product_id'] for line in lines]
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError(
+                {'lines': 'Each product can be ordered on one line only.'}
+            )
+
+        prices = dict(
+            Product.objects.filter(
+                id__in=product_ids, supplier_id=attrs['supplier']
+            ).values_list('id', 'price')
+        )
+        unknown = sorted(set(product_ids) - set(prices))
+        if unknown:
+            raise serializers.ValidationError(
+                {'lines': f'Products {unknown} are not sold by this supplier.'}
+            )
+        for line in lines:
+            line.setdefault('unit_cost', prices[line['product_id']])
+        return attrs
+
+    def create(self, validated_data):
+        """Create the order and its lines with one bulk insert"""
+        lines = validated_data.pop('lines')
+        order = PurchaseOrder.objects.create(**validated_data)
+        PurchaseOrderLine.objects.bulk_create(
+            (
+                PurchaseOrderLine(
+                    order=order,
+                    product_id=line['product_id'],
+                    quantity=line['quantity'],
+                    unit_cost=line['unit_cost'],
+                )
+                for line in lines
+            ),
+            batch_size=5000,
+        )
+        return order
+
+
+class ReceiptLineSerializer(serializers.Serializer):
+    """Serializes the units of one product received, optionally into a lot"""
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    lot = serializers.CharField(max_length=50, required=False)
+    expires_on = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'expires_on' in attrs and not attrs.get('lot'):
+            raise serializers.ValidationError(
+                {'expires_on': 'An expiry date needs a lot code.'}
+            )
+        return attrs
+
+
+class ReceiptSerializer(serializers.Serializer):
+    """Validates a delivery received against a purchase order"""
+    lines = ReceiptLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, value):
+        if len(value) > MAX_LINES:
+            raise serializers.ValidationError(
+                f'A delivery can have at most {MAX_LINES} lines.'
+            )
+        return value
+
+
+class GoodsReceiptSerializer(serializers.ModelSerializer):
+    """Serializes GoodsReceipt objects with the amount paid and order status"""
+    amount = serializers.DecimalField(
+        source='trx.amount', max_digits=14, decimal_places=2, read_only=True
+    )
+    status = serializers.CharField(source='order.status', read_only=True)
+
+    class Meta:
+        model = GoodsReceipt
+        fields = (
+            'id',
+            'order',
+            'trx',
+            'amount',
+            'status',
+            'created_by',
+            'created_at',
+        )
+        read_only_fields = fields
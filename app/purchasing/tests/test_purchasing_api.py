@@ -0,0 +1,192 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    CostLayer, GoodsReceipt, Lot, Product, PurchaseOrder, Store, StoreProduct,
+    Transaction, TransactionProduct,
+)
+from core.tests import factories
+
+ORDERS_URL = reverse('purchasing:purchaseorder-list')
+
+
+def receive_url(order_id):
+    """Return purchase order goods receipt URL"""
+    return reverse('purchasing:purchaseorder-receive', args=[order_id])
+
+
+class PurchaseOrderApiTest(TestCase):
+    """Test purchase orders and goods receipts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_superuser()
+        cls.supplier = factories.create_user('Supplier')
+        cls.other_supplier = factories.create_user('Supplier')
+        cls.store = factories.create_store(cash='1000.00')
+        cls.laptop = factories.create_product(
+            cls.supplier, name='Laptop', price='100.00'
+        )
+        cls.mouse = factories.create_product(
+            cls.supplier, name='Mouse', price='5.00'
+        )
+        cls.cable = factories.create_product(
+            cls.other_supplier, name='Cable', price='1.00'
+        )
+        StoreProduct.objects.create(
+            store_id=cls.store, product_id=cls.mouse, quantity=3
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_order(self, lines):
+        res = self.client.post(
+            ORDERS_URL,
+            {
+                'supplier': self.supplier.id,
+                'store': self.store.id,
+                'lines': [
+                    {'product': product.id, 'quantity': quantity, **extra}
+                    for product, quantity, extra in lines
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return PurchaseOrder.objects.get(pk=res.data['id'])
+
+    def receive(self, order, lines):
+        return self.client.post(
+            receive_url(order.id),
+            {
+                'lines': [
+                    {'product_id': product.id, 'quantity': quantity, **extra}
+                    for product, quantity, extra in lines
+                ],
+            },
+            format='json',
+        )
+
+    def quantity(self, product):
+        return StoreProduct.objects.get(
+            store_id=self.store, product_id=product
+        ).quantity
+
+    def test_create_order_defaults_unit_cost_to_price(self):
+        order = self.create_order(
+            [(self.laptop, 2, {}), (self.mouse, 10, {'unit_cost': '4.50'})]
+        )
+
+        costs = dict(order.lines.values_list('product_id', 'unit_cost'))
+        self.assertEqual(
+            costs,
+            {
+                self.laptop.id: Decimal('100.00'),
+                self.mouse.id: Decimal('4.50'),
+            },
+        )
+        self.assertEqual(order.created_by, self.admin)
+        self.assertEqual(order.status, PurchaseOrder.OPEN)
+
+    def test_create_order_rejects_other_supplier_products(self):
+        res = self.client.post(ORDERS_URL, {
+            'supplier': self.supplier.id,
+            'store': self.store.id,
+            'lines': [{'product': self.cable.id, 'quantity': 1}],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_receive_posts_stock_cost_and_cash(self):
+        order = self.create_order(
+            [(self.laptop, 2, {}), (self.mouse, 10, {'unit_cost': '4.50'})]
+        )
+
+        res = self.receive(order, [(self.laptop, 2, {}), (self.mouse, 10, {})])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['amount'], '245.00')
+        self.assertEqual(res.data['status'], PurchaseOrder.RECEIVED)
+        trx = Transaction.objects.get(pk=res.data['trx'])
+        self.assertEqual(
+            (trx.trx_type, trx.party_id, trx.store_id),
+            ('IN', self.supplier.id, self.store.id),
+        )
+        self.assertEqual(
+            TransactionProduct.objects.filter(trx_id=trx).count(), 2
+        )
+        self.assertEqual(self.quantity(self.laptop), 2)
+        self.assertEqual(self.quantity(self.mouse), 13)
+        self.assertEqual(
+            Store.objects.get(pk=self.store.pk).cash, Decimal('755.00')
+        )
+        self.assertEqual(
+            CostLayer.objects.get(trx=trx, product=self.mouse).unit_cost,
+            Decimal('4.5'),
+        )
+
+    def test_partial_receipts(self):
+        order = self.create_order([(self.laptop, 5, {})])
+
+        first = self.receive(
+            order,
+            [(self.laptop, 2, {'lot': 'L1'}), (self.laptop, 1, {'lot': 'L2'})],
+        )
+        over = self.receive(order, [(self.laptop, 3, {})])
+        rest = self.receive(order, [(self.laptop, 2, {})])
+        after = self.receive(order, [(self.laptop, 1, {})])
+
+        self.assertEqual(first.data['status'], PurchaseOrder.PARTIAL)
+        self.assertEqual(over.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(rest.data['status'], PurchaseOrder.RECEIVED)
+        self.assertEqual(after.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quantity(self.laptop), 5)
+        self.assertEqual(order.lines.get().received, 5)
+        self.assertEqual(
+            dict(Lot.objects.values_list('code', 'quantity')),
+            {'L1': 2, 'L2': 1},
+        )
+        self.assertEqual(GoodsReceipt.objects.filter(order=order).count(), 2)
+
+    def test_receive_rejects_products_not_ordered(self):
+        order = self.create_order([(self.laptop, 5, {})])
+
+        res = self.receive(order, [(self.mouse, 1, {})])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GoodsReceipt.objects.exists())
+
+    def test_receive_needs_enough_cash(self):
+        order = self.create_order([(self.laptop, 11, {})])
+
+        res = self.receive(order, [(self.laptop, 11, {})])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            Store.objects.get(pk=self.store.pk).cash, Decimal('1000.00')
+        )
+        self.assertFalse(
+            StoreProduct.objects.filter(product_id=self.laptop).exists()
+        )
+
+    def test_receive_query_count_is_constant(self):
+        """Test the number of queries does not grow with the number of lines"""
+        products = [
+            Product.objects.create(
+                supplier_id=self.supplier, name=f'Product {i}', price='1.00'
+            )
+            for i in range(20)
+        ]
+        small = self.create_order([(self.laptop, 1, {})])
+        large = self.create_order([(product, 1, {}) for product in products])
+
+        with self.assertNumQueries(18):
+            self.receive(small, [(self.laptop, 1, {})])
+        with self.assertNumQueries(18):
+            self.receive(large, [(product, 1, {}) for product in products])
@@ -0,0 +1,13 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from purchasing import views
+
+router = DefaultRouter()
+router.register('', views.PurchaseOrderViewSet)
+
+app_name = 'purchasing'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
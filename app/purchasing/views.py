@@ -0,0 +1,45 @@
+from django.db.models import Prefetch
+from rest_framework import mixins, status, viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.models import PurchaseOrder, PurchaseOrderLine
+from purchasing import receiving, serializers
+
+
+class PurchaseOrderViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Order products from suppliers and receive the deliveries into stores"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+    queryset = PurchaseOrder.objects.all()
+    serializer_class = serializers.PurchaseOrderSerializer
+
+    def get_queryset(self):
+        lines = PurchaseOrderLine.objects.order_by('product_id')
+        return self.queryset.prefetch_related(
+            Prefetch('lines', queryset=lines)
+        ).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        """Receive a delivery as one IN transaction paid from the store cash"""
+        serializer = serializers.ReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        receipt = receiving.receive_goods(
+            self.get_object(), request.user, serializer.validated_data['lines']
+        )
+        return Response(
+            serializers.GoodsReceiptSerializer(receipt).data,
+            status=status.HTTP_201_CREATED,
+        )
@@ -0,0 +1,49 @@
+import datetime
+
+from rest_framework import serializers
+
+from core.models import Product, Reservation, Store
+
+
+class ReservationSerializer(serializers.ModelSerializer):
+    """Serializes Reservation objects, reserving stock on create"""
+    DEFAULT_TTL = 900
+    MAX_TTL = 86400
+
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all())
+    product = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.all()
+    )
+    quantity = serializers.IntegerField(min_value=1)
+    ttl = serializers.IntegerField(
+        min_value=1, max_value=MAX_TTL, default=DEFAULT_TTL, write_only=True
+    )
+
+    class Meta:
+        model = Reservation
+        fields = (
+            'id',
+            'store',
+            'product',
+            'quantity',
+            'ttl',
+            'status',
+            'created_at',
+            'expires_at',
+        )
+        read_only_fields = ('id', 'status', 'created_at', 'expires_at')
+
+    def create(self, validated_data):
+        """Reserve the stock atomically, failing if it is not available"""
+        reservation = Reservation.objects.reserve(
+            validated_data['store'],
+            validated_data['product'],
+            validated_data['quantity'],
+            validated_data['created_by'],
+            datetime.timedelta(seconds=validated_data['ttl']),
+        )
+        if reservation is None:
+            raise serializers.ValidationError(
+                {'quantity': 'Not enough quantity available in store.'}
+            )
+        return reservation
@@ -0,0 +1,295 @@
+import datetime
+import random
+import threading
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, Reservation, Store, StoreProduct, Transaction
+
+RESERVATIONS_URL = reverse('reservation:reservation-list')
+TRANSACTION_URL = reverse('transaction:transaction-list')
+
+
+def detail_url(reservation_id):
+    return reverse('reservation:reservation-detail', args=[reservation_id])
+
+
+def sample_user(user_type, email):
+    return get_user_model().objects.create_user(
+        email=email, user_type=user_type, password='pass123'
+    )
+
+
+def out_payload(admin, customer, store, product, quantity, reservation=None):
+    payload = {
+        'trx_type': 'OUT',
+        'store': store.id,
+        'created_by': admin.id,
+        'party': customer.id,
+        'amount': f'{quantity * 10}.00',
+        'product_id': product.id,
+        'quantity': quantity,
+    }
+    if reservation is not None:
+        payload['reservation'] = reservation
+    return payload
+
+
+class ReservationApiTest(TestCase):
+    """Test holding stock with reservations"""
+
+    def setUp(self):
+        self.admin = sample_user('Admin', 'admin@admin.com')
+        self.supplier = sample_user('Supplier', 'supplier@supplier.com')
+        self.customer = sample_user('Customer', 'customer@customer.com')
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.product = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price='10.00'
+        )
+        self.store_product = StoreProduct.objects.create(
+            store_id=self.store, product_id=self.product, quantity=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+    def reserve(self, quantity, **extra):
+        return self.client.post(
+            RESERVATIONS_URL,
+            {
+                'store': self.store.id,
+                'product': self.product.id,
+                'quantity': quantity,
+                **extra,
+            },
+        )
+
+    def stock(self):
+        self.store_product.refresh_from_db()
+        return self.store_product.quantity, self.store_product.reserved
+
+    def test_reserve_holds_stock_until_ttl(self):
+        """Test a reservation holds reserved stock and expires after its TTL"""
+        before = timezone.now()
+
+        res = self.reserve(4, ttl=60)
+
+        reservation = Reservation.objects.get(pk=res.data['id'])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stock(), (10, 4))
+        self.assertEqual(reservation.created_by, self.customer)
+        self.assertGreaterEqual(
+            reservation.expires_at, before + datetime.timedelta(seconds=60)
+        )
+
+    def test_cannot_reserve_more_than_available(self):
+        self.reserve(7)
+
+        res = self.reserve(4)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock(), (10, 7))
+
+    def test_out_without_reservation_cannot_take_reserved_stock(self):
+        """Test unreserved OUT transactions only see available stock"""
+        self.reserve(7)
+
+        res = self.admin_client.post(
+            TRANSACTION_URL,
+            out_payload(
+                self.admin, self.customer, self.store, self.product, 4
+            ),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock(), (10, 7))
+
+    def test_out_with_reservation_commits_it(self):
+        """Test an OUT carrying a reservation consumes the held stock"""
+        reservation_id = self.reserve(7).data['id']
+
+        res = self.admin_client.post(
+            TRANSACTION_URL,
+            out_payload(
+                self.admin,
+                self.customer,
+                self.store,
+                self.product,
+                7,
+                reservation_id,
+            ),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stock(), (3, 0))
+        self.assertEqual(
+            Reservation.objects.get(pk=reservation_id).status,
+            Reservation.COMMITTED,
+        )
+
+    def test_out_cannot_commit_reservation_of_another_party(self):
+        """Test a customer cannot consume the reservation of another"""
+        reservation_id = self.reserve(7).data['id']
+        other = sample_user('Customer', 'other@customer.com')
+
+        res = self.admin_client.post(
+            TRANSACTION_URL,
+            out_payload(
+                self.admin, other, self.store, self.product, 3, reservation_id
+            ),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock(), (10, 7))
+        self.assertEqual(
+            Reservation.objects.get(pk=reservation_id).status,
+            Reservation.ACTIVE,
+        )
+
+    def test_out_with_malformed_reservation_is_rejected(self):
+        """Test a reservation id that is not an integer is a 400"""
+        res = self.admin_client.post(
+            TRANSACTION_URL,
+            out_payload(
+                self.admin, self.customer, self.store, self.product, 1, 'abc'
+            ),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock(), (10, 0))
+
+    def test_release_reservation(self):
+        reservation_id = self.reserve(7).data['id']
+
+        res = self.client.delete(detail_url(reservation_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.stock(), (10, 0))
+        self.assertEqual(
+            self.client.delete(detail_url(reservation_id)).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_expired_reservations_are_swept_and_cannot_be_committed(self):
+        """Test the sweeper releases overdue reservations for good"""
+        reservation_id = self.reserve(7).data['id']
+        self.reserve(2)
+        Reservation.objects.filter(pk=reservation_id).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        res = self.admin_client.post(
+            TRANSACTION_URL,
+            out_payload(
+                self.admin,
+                self.customer,
+                self.store,
+                self.product,
+                7,
+                reservation_id,
+            ),
+        )
+        call_command('expire_reservations', stdout=StringIO())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock(), (10, 2))
+        self.assertEqual(
+            Reservation.objects.get(pk=reservation_id).status,
+            Reservation.EXPIRED,
+        )
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ReservationStressTest(TransactionTestCase):
+    """Test parallel reserve/commit/release never oversells"""
+
+    def test_parallel_reservations_do_not_oversell(self):
+        admin = sample_user('Admin', 'admin@admin.com')
+        supplier = sample_user('Supplier', 'supplier@supplier.com')
+        customer = sample_user('Customer', 'customer@customer.com')
+        store = Store.objects.create(name='Store#1', city='Cairo')
+        product = Product.objects.create(
+            supplier_id=supplier, name='Laptop', price='10.00'
+        )
+        StoreProduct.objects.create(
+            store_id=store, product_id=product, quantity=40
+        )
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = APIClient()
+            client.force_authenticate(admin)
+            try:
+                for _ in range(12):
+                    quantity = rng.randint(1, 4)
+                    if rng.random() < 0.3:
+                        client.post(
+                            TRANSACTION_URL,
+                            out_payload(
+                                admin, customer, store, product, quantity
+                            ),
+                        )
+                        continue
+                    reservation = Reservation.objects.reserve(
+                        store,
+                        product,
+                        quantity,
+                        customer,
+                        datetime.timedelta(minutes=5),
+                    )
+                    if reservation is None:
+                        continue
+                    if rng.random() < 0.7:
+                        res = client.post(
+                            TRANSACTION_URL,
+                            out_payload(
+                                admin,
+                                customer,
+                                store,
+                                product,
+                                quantity,
+                                reservation.id,
+                            ),
+                        )
+                        if res.status_code != status.HTTP_201_CREATED:
+                            errors.append(res.status_code)
+                    else:
+                        Reservation.objects.release(reservation)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(seed,)) for seed in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        store_product = StoreProduct.objects.get(
+            store_id=store, product_id=product
+        )
+        sold = sum(
+            Transaction.objects.filter(trx_type='OUT').values_list(
+                'transactionproduct__quantity', flat=True
+            )
+        )
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(store_product.quantity, 0)
+        self.assertEqual(store_product.reserved, 0)
+        self.assertEqual(store_product.quantity, 40 - sold)
+        self.assertFalse(
+            Reservation.objects.filter(status=Reservation.ACTIVE).exists()
+        )
@@ -0,0 +1,13 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from reservation import views
+
+router = DefaultRouter()
+router.register('', views.ReservationViewSet)
+
+app_name = 'reservation'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,39 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.models import Reservation
+from reservation import serializers
+
+
+class ReservationViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Hold stock between cart and payment; DELETE releases the hold"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = Reservation.objects.all()
+    serializer_class = serializers.ReservationSerializer
+
+    def get_queryset(self):
+        """Return the reservations of the current authenticated user only"""
+        return self.queryset.filter(created_by=self.request.user).order_by(
+            '-created_at'
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        if Reservation.objects.release(self.get_object()) is None:
+            raise ValidationError(
+                {'status': 'Only active reservations can be released.'}
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,226 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core import audit, events
+from core.bulk import update_from_values
+from core.versions import bump_stock_version
+from core.models import (
+    MAX_TRANSACTION_AMOUNT, Change, CostLayer, CountSession, Lot, Product,
+    StockAlert, StoreProduct, Transaction, TransactionProduct,
+)
+
+CENTS = Decimal('0.01')
+
+
+def on_hand(session):
+    """Return the on-hand quantity of a count line's product as a subquery"""
+    quantities = StoreProduct.objects.filter(
+        store_id=session.store_id, product_id=OuterRef('product_id')
+    )
+    return Coalesce(Subquery(quantities.values('quantity')[:1]), Value(0))
+
+
+def variances(session):
+    """Return the lines of `session` with their expected quantity and variance
+
+    Open sessions compare against the current stock, posted sessions
+    against the stock recorded when they were posted.
+    """
+    return session.lines.annotate(
+        expected_quantity=Coalesce('expected', on_hand(session)),
+    ).annotate(
+        variance=F('counted') - F('expected_quantity'),
+    ).order_by('product_id')
+
+
+@transaction.atomic
+def post_count(session):
+    """Adjust the stock of a store to the counts of `session` in bulk
+
+    Overages are posted as one IN transaction received at the average cost
+    (or the product price for new stock), shortages as one OUT transaction
+    consuming FIFO cost layers and the lots expiring first. Returns the
+    variance report.
+    """
+    session = CountSession.objects.select_for_update().get(pk=session.pk)
+    if session.status != CountSession.OPEN:
+        raise ValidationError(
+            {'status': 'This count session has already been posted.'}
+        )
+
+    store_id = session.store_id
+    stock = {
+        row.product_id_id: row
+        for row in StoreProduct.objects.select_for_update().filter(
+            store_id=store_id,
+            product_id__in=list(
+                session.lines.values_list('product_id', flat=True)
+            ),
+        )
+    }
+    lines_counted = session.lines.update(expected=on_hand(session))
+    lines = list(
+        session.lines.exclude(counted=F('expected'))
+        .order_by('product_id')
+        .values_list('product_id', 'expected', 'counted')
+    )
+    over = [
+        (product_id, counted - expected)
+        for product_id, expected, counted in lines
+        if counted > expected
+    ]
+    short = [
+        (product_id, expected - counted)
+        for product_id, expected, counted in lines
+        if counted < expected
+    ]
+
+    new_rows = []
+    for product_id, _ in over:
+        if product_id not in stock:
+            stock[product_id] = StoreProduct(
+                store_id_id=store_id, product_id_id=product_id, quantity=0
+            )
+            new_rows.append(stock[product_id])
+    prices = {}
+    if over:
+        prices = dict(
+            Product.objects.filter(
+                id__in=[product_id for product_id, _ in over]
+            ).values_list('id', 'price')
+        )
+    unit_costs = {
+        product_id: stock[product_id].average_cost or prices[product_id]
+        for product_id, _ in over
+    }
+    portions = {}
+    if short:
+        demands = [(stock[product_id], units) for product_id, units in short]
+        portions = CostLayer.objects.consume_many(demands)
+        Lot.objects.consume_many(demands)
+
+    value_over = sum(
+        (unit_costs[product_id] * units for product_id, units in over),
+        Decimal(0),
+    ).quantize(CENTS)
+    value_short = sum(
+        (
+            unit_cost * units
+            for product_portions in portions.values()
+            for unit_cost, units in product_portions
+        ),
+        Decimal(0),
+    ).quantize(CENTS)
+
+    if max(value_over, value_short) > MAX_TRANSACTION_AMOUNT:
+        raise ValidationError({
+            'lines': (
+                'The adjustment is worth more than one transaction can '
+                'hold, split the count.'
+            )
+        })
+
+    adjustments = {}
+    for trx_type, adjusted, amount in (
+        ('IN', over, value_over),
+        ('OUT', short, value_short),
+    ):
+        if adjusted:
+            adjustments[trx_type] = Transaction.objects.create(
+                created_by=session.created_by,
+                party=session.created_by,
+                store_id=store_id,
+                trx_type=trx_type,
+                amount=amount,
+            )
+    if over:
+        CostLayer.objects.receive_many(
+            adjustments['IN'],
+            [
+                (stock[product_id], [(unit_costs[product_id], units)])
+                for product_id, units in over
+            ],
+        )
+
+    previous_quantities = {
+        product_id: stock[product_id].quantity for product_id, _, _ in lines
+    }
+    for product_id, units in over:
+        stock[product_id].quantity += units
+    for product_id, units in short:
+        stock[product_id].quantity -= units
+    adjusted_rows = [stock[product_id] for product_id, _, _ in lines]
+    update_from_values(
+        StoreProduct,
+        [row for row in adjusted_rows if row.pk is not None],
+        ['quantity', 'average_cost', 'fifo_value'],
+    )
+    StoreProduct.objects.bulk_create(new_rows, batch_size=5000)
+
+    TransactionProduct.objects.bulk_create(
+        (
+            TransactionProduct(
+                trx_id=adjustments[trx_type],
+                product_id_id=product_id,
+                quantity=units,
+                created_at=adjustments[trx_type].created_at,
+            )
+            for trx_type, adjusted in (('IN', over), ('OUT', short))
+            for product_id, units in adjusted
+        ),
+        batch_size=5000,
+    )
+    changes = Change.objects.bulk_create(
+        (
+            Change(
+                kind=Change.STOCK,
+                store_id=store_id,
+                product_id=row.product_id_id,
+                quantity=row.quantity,
+            )
+            for row in adjusted_rows
+        ),
+        batch_size=5000,
+    )
+    for product_id, _ in short:
+        StockAlert.objects.record_crossing(
+            stock[product_id], previous_quantities[product_id]
+        )
+    audit.record(
+        audit.stock_change(row, previous_quantities[row.product_id_id])
+        for row in adjusted_rows
+    )
+
+    session.status = CountSession.POSTED
+    session.posted_at = timezone.now()
+    session.adjustment_in = adjustments.get('IN')
+    session.adjustment_out = adjustments.get('OUT')
+    session.save()
+
+    transaction.on_commit(lambda: events.publish_stock(changes))
+    bump_stock_version(store_id)
+    return {
+        'session': session.id,
+        'lines_counted': lines_counted,
+        'lines_adjusted': len(lines),
+        'units_over': sum(units for _, units in over),
+        'units_short': sum(units for _, units in short),
+        'value_over': value_over,
+        'value_short': value_short,
+        'adjustment_in': session.adjustment_in_id,
+        'adjustment_out': session.adjustment_out_id,
+        'variances': [
+            {
+                'product': product_id,
+                'expected': expected,
+                'counted': counted,
+                'variance': counted - expected,
+            }
+            for product_id, expected, counted in lines
+        ],
+    }
@@ -0,0 +1,104 @@
+from rest_framework import serializers
+
+from core.models import CountLine, CountSession, Product, Store
+
+MAX_LINES = 50000
+
+
+def merge_count_lines(value):
+    """Merge count lines into {product id: counted}, checking products at once
+
+    A product counted on several lines (e.g. on different shelves) is summed.
+    """
+    if len(value) > MAX_LINES:
+        raise serializers.ValidationError(
+            f'A count upload can have at most {MAX_LINES} lines.'
+        )
+
+    counts = {}
+    for line in value:
+        counts[line['product_id']] = (
+            counts.get(line['product_id'], 0) + line['counted']
+        )
+
+    known = set(
+        Product.objects.filter(id__in=list(counts)).values_list(
+            'id', flat=True
+        )
+    )
+    unknown = sorted(set(counts) - known)
+    if unknown:
+        raise serializers.ValidationError(f'Unknown products {unknown}.')
+    return counts
+
+
+class CountLineSerializer(serializers.Serializer):
+    """Serializes the counted quantity of one product"""
+    product_id = serializers.IntegerField()
+    counted = serializers.IntegerField(min_value=0)
+
+
+class CountLinesSerializer(serializers.Serializer):
+    """Validates an upload of counted quantities to an open session"""
+    lines = CountLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, value):
+        return merge_count_lines(value)
+
+
+class CountSessionSerializer(serializers.ModelSerializer):
+    """Serializes CountSession objects, creating them with their first lines"""
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all())
+    lines = CountLineSerializer(many=True, write_only=True, allow_empty=False)
+
+    class Meta:
+        model = CountSession
+        fields = (
+            'id', 'store', 'created_by', 'status', 'created_at', 'posted_at',
+            'adjustment_in', 'adjustment_out', 'lines',
+        )
+        read_only_fields = (
+            'id',
+            'created_by',
+            'status',
+            'created_at',
+            'posted_at',
+            'adjustment_in',
+            'adjustment_out',
+        )
+
+    def validate_lines(self, value):
+        return merge_count_lines(value)
+
+    def create(self, validated_data):
+        """Create the session and its lines with one bulk insert"""
+        counts = validated_data.pop('lines')
+        session = CountSession.objects.create(**validated_data)
+        CountLine.objects.bulk_create(
+            (CountLine(session=session, product_id=product_id, counted=counted)
+             for product_id, counted in counts.items()),
+            batch_size=5000,
+        )
+        return session
+
+
+class VarianceSerializer(serializers.Serializer):
+    """Serializes the difference between counted and expected stock"""
+    product = serializers.IntegerField()
+    expected = serializers.IntegerField()
+    counted = serializers.IntegerField()
+    variance = serializers.IntegerField()
+
+
+class CountPostingSerializer(serializers.Serializer):
+    """Serializes the variance report of a posted count session"""
+    session = serializers.IntegerField()
+    lines_counted = serializers.IntegerField()
+    lines_adjusted = serializers.IntegerField()
+    units_over = serializers.IntegerField()
+    units_short = serializers.IntegerField()
+    value_over = serializers.DecimalField(max_digits=16, decimal_places=2)
+    value_short = serializers.DecimalField(max_digits=16, decimal_places=2)
+    adjustment_in = serializers.IntegerField(allow_null=True)
+    adjustment_out = serializers.IntegerField(allow_null=True)
+    variances = VarianceSerializer(many=True)
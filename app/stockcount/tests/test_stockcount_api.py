@@ -0,0 +1,243 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    CountLine, CountSession, Product, Store, StoreProduct, Transaction,
+    TransactionProduct,
+)
+
+COUNTS_URL = reverse('stockcount:countsession-list')
+
+
+def lines_url(session_id):
+    return reverse('stockcount:countsession-lines', args=[session_id])
+
+
+def variance_url(session_id):
+    return reverse('stockcount:countsession-variance', args=[session_id])
+
+
+def post_url(session_id):
+    return reverse('stockcount:countsession-post-count', args=[session_id])
+
+
+class CountSessionApiTest(TestCase):
+    """Test physical stock counts and their bulk posting"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'pass123', is_staff=True
+        )
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.laptop = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price='100.00'
+        )
+        self.mouse = Product.objects.create(
+            supplier_id=self.supplier, name='Mouse', price='5.00'
+        )
+        self.cable = Product.objects.create(
+            supplier_id=self.supplier, name='Cable', price='2.00'
+        )
+        StoreProduct.objects.create(
+            store_id=self.store,
+            product_id=self.laptop,
+            quantity=10,
+            average_cost='90.00',
+        )
+        StoreProduct.objects.create(
+            store_id=self.store,
+            product_id=self.mouse,
+            quantity=20,
+            average_cost='4.00',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_session(self, lines):
+        res = self.client.post(
+            COUNTS_URL,
+            {
+                'store': self.store.id,
+                'lines': [
+                    {'product_id': product.id, 'counted': counted}
+                    for product, counted in lines
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return CountSession.objects.get(pk=res.data['id'])
+
+    def quantity(self, product):
+        return StoreProduct.objects.get(
+            store_id=self.store, product_id=product
+        ).quantity
+
+    def test_create_session_merges_duplicate_lines(self):
+        """Test a product counted on several lines is summed"""
+        session = self.create_session(
+            [(self.laptop, 4), (self.laptop, 3), (self.mouse, 20)]
+        )
+
+        self.assertEqual(session.created_by, self.admin)
+        self.assertEqual(
+            dict(session.lines.values_list('product_id', 'counted')),
+            {self.laptop.id: 7, self.mouse.id: 20},
+        )
+
+    def test_upload_lines_replaces_earlier_counts(self):
+        session = self.create_session([(self.laptop, 4)])
+
+        res = self.client.post(
+            lines_url(session.id),
+            {
+                'lines': [
+                    {'product_id': self.laptop.id, 'counted': 9},
+                    {'product_id': self.cable.id, 'counted': 1},
+                ],
+            },
+            format='json',
+        )
+
+        self.assertEqual(res.data, {'lines': 2})
+        self.assertEqual(
+            CountLine.objects.get(
+                session=session, product=self.laptop
+            ).counted,
+            9,
+        )
+
+    def test_variance_lists_differences_against_stock(self):
+        """Test the variance report compares counts with the stock on hand"""
+        session = self.create_session(
+            [(self.laptop, 7), (self.mouse, 20), (self.cable, 5)]
+        )
+
+        res = self.client.get(variance_url(session.id))
+
+        self.assertEqual(
+            [dict(row) for row in res.data],
+            [
+                {
+                    'product': self.laptop.id,
+                    'expected': 10,
+                    'counted': 7,
+                    'variance': -3,
+                },
+                {
+                    'product': self.cable.id,
+                    'expected': 0,
+                    'counted': 5,
+                    'variance': 5,
+                },
+            ],
+        )
+
+    def test_post_adjusts_stock_with_one_transaction_per_direction(self):
+        """Test posting moves stock to the counts and reports the variance"""
+        session = self.create_session(
+            [(self.laptop, 7), (self.mouse, 20), (self.cable, 5)]
+        )
+
+        res = self.client.post(post_url(session.id))
+
+        session.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['lines_counted'], 3)
+        self.assertEqual(res.data['lines_adjusted'], 2)
+        self.assertEqual(
+            (res.data['units_over'], res.data['units_short']), (5, 3)
+        )
+        self.assertEqual(
+            (res.data['value_over'], res.data['value_short']),
+            ('10.00', '270.00'),
+        )
+        self.assertEqual(
+            [
+                self.quantity(self.laptop),
+                self.quantity(self.mouse),
+                self.quantity(self.cable),
+            ],
+            [7, 20, 5],
+        )
+        self.assertEqual(session.status, CountSession.POSTED)
+        self.assertEqual(session.adjustment_out.amount, Decimal('270.00'))
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(
+            TransactionProduct.objects.get(
+                trx_id=session.adjustment_in
+            ).quantity,
+            5,
+        )
+        self.assertEqual(
+            dict(session.lines.values_list('product_id', 'expected')),
+            {self.laptop.id: 10, self.mouse.id: 20, self.cable.id: 0},
+        )
+
+    def test_post_count_worth_millions(self):
+        """Test an adjustment worth more than a million is posted in full"""
+        session = self.create_session([(self.laptop, 30010)])
+
+        res = self.client.post(post_url(session.id))
+
+        session.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(session.adjustment_in.amount, Decimal('2700000.00'))
+        self.assertEqual(self.quantity(self.laptop), 30010)
+
+    def test_post_count_worth_more_than_a_transaction_fails(self):
+        session = self.create_session([(self.laptop, 30010)])
+
+        with patch(
+            'stockcount.posting.MAX_TRANSACTION_AMOUNT', Decimal('1000000.00')
+        ):
+            res = self.client.post(post_url(session.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quantity(self.laptop), 10)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_post_twice_fails(self):
+        session = self.create_session([(self.laptop, 7)])
+        self.client.post(post_url(session.id))
+
+        res = self.client.post(post_url(session.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quantity(self.laptop), 7)
+
+    def test_post_query_count_is_constant(self):
+        """Test posting does not run queries per counted product"""
+        Product.objects.bulk_create(
+            Product(supplier_id=self.supplier, name=f'Bulk#{i}', price='1.00')
+            for i in range(60)
+        )
+        products = list(
+            Product.objects.filter(name__startswith='Bulk#').order_by('id')
+        )
+        StoreProduct.objects.bulk_create(
+            StoreProduct(store_id=self.store, product_id=product, quantity=5)
+            for product in products
+        )
+        queries = []
+        for count in (6, 60):
+            session = self.create_session([
+                (product, index % 3 * 5)
+                for index, product in enumerate(products[:count])
+            ])
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(post_url(session.id))
+            queries.append(len(context))
+
+        self.assertEqual(queries[0], queries[1])
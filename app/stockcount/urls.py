@@ -0,0 +1,13 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from stockcount import views
+
+router = DefaultRouter()
+router.register('', views.CountSessionViewSet)
+
+app_name = 'stockcount'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
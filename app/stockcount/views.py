@@ -0,0 +1,83 @@
+from django.db import transaction
+from rest_framework import mixins, viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.models import CountLine, CountSession
+from stockcount import posting, serializers
+
+
+class CountSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Upload stock counts of a store and post them as bulk adjustments"""
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+    queryset = CountSession.objects.all()
+    serializer_class = serializers.CountSessionSerializer
+
+    def get_queryset(self):
+        return self.queryset.order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def lines(self, request, pk=None):
+        """Upload more counts, replacing earlier counts of the same products"""
+        session = self.get_object()
+        if session.status != CountSession.OPEN:
+            raise ValidationError(
+                {'status': 'This count session has already been posted.'}
+            )
+        serializer = serializers.CountLinesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        counts = serializer.validated_data['lines']
+        with transaction.atomic():
+            session.lines.filter(product_id__in=list(counts)).delete()
+            CountLine.objects.bulk_create(
+                (
+                    CountLine(
+                        session=session, product_id=product_id, counted=counted
+                    )
+                    for product_id, counted in counts.items()
+                ),
+                batch_size=5000,
+            )
+        return Response({'lines': session.lines.count()})
+
+    @action(detail=True)
+    def variance(self, request, pk=None):
+        """List the counted products whose quantity differs from the stock"""
+        session = self.get_object()
+        rows = posting.variances(session).exclude(variance=0).values_list(
+            'product_id', 'expected_quantity', 'counted', 'variance'
+        )
+        return Response(
+            serializers.VarianceSerializer(
+                [
+                    {
+                        'product': product,
+                        'expected': expected,
+                        'counted': counted,
+                        'variance': variance,
+                    }
+                    for product, expected, counted, variance in rows
+                ],
+                many=True,
+            ).data
+        )
+
+    @action(detail=True, methods=['post'], url_path='post')
+    def post_count(self, request, pk=None):
+        """Post the count, adjusting stock in bulk, and return the variance"""
+        report = posting.post_count(self.get_object())
+        return Response(serializers.CountPostingSerializer(report).data)
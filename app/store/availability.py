@@ -0,0 +1,86 @@
+"""Cached availability checks for many products of one store
+
+Answers are cached per (store, stock version, product). Every write path
+that changes the stock or reservations of a store bumps its version on
+commit, so cached answers are never served after the stock they describe
+has changed, and no explicit invalidation is needed.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+
+from core.models import Product
+from core.versions import stock_version
+
+AVAILABLE = 'available'
+SHORT = 'short'
+UNKNOWN = 'unknown'
+
+
+def availability_key(store_id, version, product_id):
+    return f'availability:{store_id}:{version}:{product_id}'
+
+
+def load_available(store_id, product_ids):
+    """Return {product id: units available to promise} for `product_ids`
+
+    One query over Product left-joined to the store's StoreProduct rows;
+    products without a row in the store have 0 available.
+    """
+    rows = (
+        Product.objects.filter(id__in=product_ids)
+        .annotate(
+            stock=FilteredRelation(
+                'storeproduct', condition=Q(storeproduct__store_id=store_id)
+            ),
+        )
+        .values_list('id', 'stock__quantity', 'stock__reserved')
+    )
+    return {
+        product_id: max((quantity or 0) - (reserved or 0), 0)
+        for product_id, quantity, reserved in rows
+    }
+
+
+def check_availability(store_id, lines):
+    """Return the availability of each (product id, quantity) line in a store
+
+    Unknown products are cached as None so repeated checks of a cart
+    with a bad SKU stay off the database too.
+    """
+    version = stock_version(store_id)
+    product_ids = {product_id for product_id, _ in lines}
+    keys = {
+        availability_key(store_id, version, product_id): product_id
+        for product_id in product_ids
+    }
+    cached = cache.get_many(keys)
+    available = {keys[key]: value for key, value in cached.items()}
+
+    missing = product_ids - set(available)
+    if missing:
+        loaded = load_available(store_id, missing)
+        available.update(
+            {product_id: loaded.get(product_id) for product_id in missing}
+        )
+        values = {
+            availability_key(store_id, version, product_id):
+                available[product_id]
+            for product_id in missing
+        }
+        cache.set_many(values, settings.AVAILABILITY_CACHE_SECONDS)
+
+    results = []
+    for product_id, quantity in lines:
+        units = available[product_id]
+        if units is None:
+            line_status = UNKNOWN
+        else:
+            line_status = AVAILABLE if units >= quantity else SHORT
+        results.append({
+            'product': product_id,
+            'quantity': quantity,
+            'available': units,
+            'status': line_status,
+        })
+    return {'version': version, 'lines': results}
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 
-from core.models import Store
+from core.models import Lot, Store, StockAlert, Product, ReorderSuggestion
+from core.serializers import ValuesSerializer
+
+MAX_AVAILABILITY_LINES = 500
 
 
 class StoreSerializer(serializers.ModelSerializer):
@@ -11,3 +14,99 @@ class StoreSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'city', 'cash')
         read_only_fields = ('id',)
 
+
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    """Serializes StockAlert objects"""
+
+    class Meta:
+        model = StockAlert
+        fields = (
+            'id',
+            'store',
+            'product',
+            'quantity',
+            'reorder_point',
+            'created_at',
+        )
+        read_only_fields = fields
+
+
+class LotSerializer(serializers.ModelSerializer):
+    """Serializes Lot objects"""
+
+    class Meta:
+        model = Lot
+        fields = ('id', 'product', 'code', 'expires_on', 'quantity')
+        read_only_fields = fields
+
+
+class ExpiringQuerySerializer(serializers.Serializer):
+    """Validates the ?days= window of the expiring-soon report"""
+    days = serializers.IntegerField(min_value=0, max_value=3650, default=30)
+
+
+class ReorderSuggestionSerializer(serializers.ModelSerializer):
+    """Serializes ReorderSuggestion objects"""
+
+    class Meta:
+        model = ReorderSuggestion
+        fields = (
+            'product', 'on_hand', 'moving_average', 'forecast', 'safety_stock',
+            'reorder_point', 'suggested_quantity', 'created_at',
+        )
+        read_only_fields = fields
+
+
+class ValuationLineSerializer(serializers.Serializer):
+    """Serializes the cost of one product on hand in a store"""
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    average_cost = serializers.DecimalField(max_digits=12, decimal_places=4)
+    average_value = serializers.DecimalField(max_digits=16, decimal_places=2)
+    fifo_value = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class ValuationSerializer(serializers.Serializer):
+    """Serializes the stock valuation of a store under both cost methods"""
+    store = serializers.IntegerField()
+    average_value = serializers.DecimalField(max_digits=18, decimal_places=2)
+    fifo_value = serializers.DecimalField(max_digits=18, decimal_places=2)
+    products = ValuationLineSerializer(many=True)
+
+
+class ReorderPointSerializer(serializers.Serializer):
+    """Serializes a product reorder point for a store"""
+    product_id = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.all()
+    )
+    reorder_point = serializers.IntegerField(min_value=0, allow_null=True)
+
+
+class AvailabilityLineSerializer(serializers.Serializer):
+    """Serializes one (product, quantity) line of an availability check"""
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    available = serializers.IntegerField(read_only=True, allow_null=True)
+    status = serializers.CharField(read_only=True)
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    """Serializes an availability check of many products in a store"""
+    store = serializers.IntegerField(read_only=True)
+    version = serializers.IntegerField(read_only=True)
+    lines = AvailabilityLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, lines):
+        if len(lines) > MAX_AVAILABILITY_LINES:
+            raise serializers.ValidationError(
+                f'At most {MAX_AVAILABILITY_LINES} lines can be checked at '
+                'once.'
+            )
+        return lines
+
+
+class StoreValuesSerializer(ValuesSerializer):
+    """Fast read-only Store rows, same output as StoreSerializer"""
+    model = Store
+    fields = StoreSerializer.Meta.fields
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from core import events
+from core.models import Change
+
+KEEPALIVE_SECONDS = 15
+
+
+def get_token_key(scope):
+    """Return the token from the Authorization header or `token` parameter"""
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            keyword, _, key = value.decode('latin1').partition(' ')
+            if keyword == 'Token':
+                return key.strip()
+    return parse_qs(scope['query_string'].decode()).get('token', [None])[0]
+
+
+def get_header(scope, header):
+    for name, value in scope['headers']:
+        if name == header:
+            return value.decode('latin1')
+    return None
+
+
+@sync_to_async
+def get_staff_user(key):
+    token = None
+    if key:
+        token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None, False
+    return token.user, token.user.is_staff
+
+
+@sync_to_async
+def get_missed_events(store_id, last_event_id):
+    """Return the stock events after `last_event_id` in commit order"""
+    commit_seq, seq = last_event_id
+    changes = Change.objects.filter(
+        Q(commit_seq__gt=commit_seq) | Q(commit_seq=commit_seq, seq__gt=seq),
+        kind=Change.STOCK, store_id=store_id,
+    ).order_by('commit_seq', 'seq')
+    return [events.stock_event(change) for change in changes]
+
+
+def format_event(event):
+    lines = [f'id: {event["id"]}'] if 'id' in event else []
+    lines.append(f'event: {event["event"]}')
+    lines.append(f'data: {json.dumps(event["data"], separators=(",", ":"))}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def send_status(send, status):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain')],
+    })
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def store_events(scope, receive, send, store_id):
+    """Stream stock and cash changes of one store as Server-Sent Events"""
+    user, is_staff = await get_staff_user(get_token_key(scope))
+    if user is None:
+        return await send_status(send, 401)
+    if not is_staff:
+        return await send_status(send, 403)
+
+    events.ensure_listener()
+    queue = events.broker.subscribe(store_id)
+    disconnect = asyncio.ensure_future(receive())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send_body(send, b'retry: 3000\n\n')
+
+        last_event_id = events.parse_event_id(
+            get_header(scope, b'last-event-id') or ''
+        )
+        if last_event_id is not None:
+            for event in await get_missed_events(store_id, last_event_id):
+                await send_body(send, format_event(event))
+
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect},
+                timeout=KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if get not in done:
+                get.cancel()
+            if disconnect in done:
+                break
+            if get in done:
+                event = get.result()
+                if event is None:
+                    break
+                await send_body(send, format_event(event))
+            else:
+                await send_body(send, b': keepalive\n\n')
+
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+        events.broker.unsubscribe(store_id, queue)
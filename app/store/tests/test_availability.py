@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, Store, StoreProduct
+
+TRANSACTION_URL = reverse('transaction:transaction-list')
+
+
+def availability_url(store_id):
+    """Return Store availability URL"""
+    return reverse('store:store-availability', args=[store_id])
+
+
+class StoreAvailabilityApiTest(TestCase):
+    """Test checking the availability of many products at once"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@admin.com', 'admin123'
+        )
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.laptop = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price='10.00'
+        )
+        self.phone = Product.objects.create(
+            supplier_id=self.supplier, name='Phone', price='5.00'
+        )
+        self.mouse = Product.objects.create(
+            supplier_id=self.supplier, name='Mouse', price='1.00'
+        )
+        StoreProduct.objects.create(
+            store_id=self.store,
+            product_id=self.laptop,
+            quantity=10,
+            reserved=4,
+        )
+        StoreProduct.objects.create(
+            store_id=self.store, product_id=self.phone, quantity=3
+        )
+
+    def check(self, *lines):
+        return self.client.post(
+            availability_url(self.store.id),
+            {
+                'lines': [
+                    {'product': product, 'quantity': quantity}
+                    for product, quantity in lines
+                ]
+            },
+            format='json',
+        )
+
+    def test_check_availability(self):
+        """Test each line is available, short or unknown, net of reservations
+        """
+        res = self.check(
+            (self.laptop.id, 6),
+            (self.phone.id, 4),
+            (self.mouse.id, 1),
+            (999999, 1),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (line['product'], line['available'], line['status'])
+                for line in res.data['lines']
+            ],
+            [
+                (self.laptop.id, 6, 'available'),
+                (self.phone.id, 3, 'short'),
+                (self.mouse.id, 0, 'short'),
+                (999999, None, 'unknown'),
+            ],
+        )
+
+    def test_repeated_check_is_served_from_cache(self):
+        """Test a repeated check only looks up the store"""
+        self.check((self.laptop.id, 1), (self.phone.id, 1))
+
+        with self.assertNumQueries(1):
+            res = self.check((self.phone.id, 2), (self.laptop.id, 1))
+
+        self.assertEqual(
+            [line['status'] for line in res.data['lines']],
+            ['available', 'available'],
+        )
+
+    def test_stock_change_invalidates_cached_answers(self):
+        first = self.check((self.phone.id, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TRANSACTION_URL, {
+                'trx_type': 'OUT',
+                'store': self.store.id,
+                'created_by': self.admin.id,
+                'party': self.admin.id,
+                'amount': '10.00',
+                'product_id': self.phone.id,
+                'quantity': 2,
+            })
+        res = self.check((self.phone.id, 2))
+
+        self.assertNotEqual(res.data['version'], first.data['version'])
+        self.assertEqual(
+            (
+                res.data['lines'][0]['available'],
+                res.data['lines'][0]['status'],
+            ),
+            (1, 'short'),
+        )
+
+    def test_invalid_lines_rejected(self):
+        self.assertEqual(self.check().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.check((self.phone.id, 0)).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
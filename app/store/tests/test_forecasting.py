@@ -0,0 +1,177 @@
+import datetime
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Product, ReorderSuggestion, Store, StoreProduct, Transaction,
+    TransactionProduct,
+)
+from store import forecasting
+
+TODAY = datetime.date(2026, 3, 31)
+
+
+def reorder_suggestions_url(store_id):
+    """Return Store reorder suggestions URL"""
+    return reverse('store:store-reorder-suggestions', args=[store_id])
+
+
+@skipIf(forecasting.np is None, 'demand forecasting requires numpy')
+class ForecastTests(TestCase):
+    """Test the vectorized forecasting engine"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'pass123', is_staff=True
+        )
+        self.customer = get_user_model().objects.create_user(
+            'customer@customer.com', 'Customer', 'pass123'
+        )
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.other_store = Store.objects.create(name='Store#2', city='Alex')
+        self.laptop = Product.objects.create(
+            supplier_id=self.admin, name='Laptop', price='100.00'
+        )
+        self.mouse = Product.objects.create(
+            supplier_id=self.admin, name='Mouse', price='5.00'
+        )
+        StoreProduct.objects.create(
+            store_id=self.store, product_id=self.laptop, quantity=5
+        )
+        StoreProduct.objects.create(
+            store_id=self.store, product_id=self.mouse, quantity=500
+        )
+        StoreProduct.objects.create(
+            store_id=self.other_store, product_id=self.laptop, quantity=0
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def sell(self, store, product, quantity, day):
+        created_at = datetime.datetime.combine(
+            day, datetime.time(12), tzinfo=datetime.timezone.utc
+        )
+        trx = Transaction.objects.create(
+            created_by=self.admin,
+            party=self.customer,
+            store=store,
+            trx_type='OUT',
+            amount='1.00',
+        )
+        Transaction.objects.filter(pk=trx.pk).update(created_at=created_at)
+        TransactionProduct.objects.create(
+            trx_id=trx,
+            product_id=product,
+            quantity=quantity,
+            created_at=created_at,
+        )
+
+    def test_exponential_smoothing_matches_recursive_definition(self):
+        """Test the closed-form smoothed level equals the day by day recursion
+        """
+        demand = forecasting.np.array(
+            [[4.0, 0.0, 7.0, 3.0, 5.0], [1.0, 1.0, 1.0, 1.0, 1.0]]
+        )
+
+        results = forecasting.forecast(
+            demand, forecasting.np.array([0, 100]), window=2, alpha=0.5
+        )
+
+        for index, row in enumerate(demand):
+            level = row[0]
+            for value in row[1:]:
+                level = 0.5 * value + 0.5 * level
+            self.assertAlmostEqual(results['forecast'][index], level)
+        self.assertEqual(results['moving_average'].tolist(), [4.0, 1.0])
+        self.assertEqual(
+            list(results['suggested_quantity'] > 0), [True, False]
+        )
+
+    def test_load_demand_builds_daily_matrix(self):
+        """Test OUT history is summed per SKU and day in one grouped query"""
+        self.sell(self.store, self.laptop, 2, TODAY)
+        self.sell(self.store, self.laptop, 3, TODAY)
+        self.sell(
+            self.store, self.mouse, 1, TODAY - datetime.timedelta(days=1)
+        )
+        self.sell(
+            self.store,
+            self.mouse,
+            9,
+            TODAY - datetime.timedelta(days=forecasting.HISTORY_DAYS),
+        )
+
+        with self.assertNumQueries(2):
+            stores, products, on_hand, demand = forecasting.load_demand(
+                [self.store.id], TODAY
+            )
+
+        self.assertEqual(products.tolist(), [self.laptop.id, self.mouse.id])
+        self.assertEqual(on_hand.tolist(), [5, 500])
+        self.assertEqual(demand.sum(axis=1).tolist(), [5.0, 1.0])
+        self.assertEqual(demand[0, -1], 5.0)
+        self.assertEqual(demand[1, -2], 1.0)
+
+    def test_reorder_suggestions_endpoint(self):
+        """Test POST recomputes one store's suggestions and lists them"""
+        for offset in range(30):
+            self.sell(
+                self.store,
+                self.laptop,
+                2,
+                timezone.now().date() - datetime.timedelta(days=offset),
+            )
+
+        res = self.client.post(reorder_suggestions_url(self.store.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['product'] for row in res.data], [self.laptop.id]
+        )
+        self.assertGreater(res.data[0]['suggested_quantity'], 0)
+        self.assertEqual(
+            ReorderSuggestion.objects.filter(store=self.store).count(), 2
+        )
+        self.assertFalse(
+            ReorderSuggestion.objects.filter(store=self.other_store).exists()
+        )
+        self.assertEqual(
+            self.client.get(reorder_suggestions_url(self.store.id)).data,
+            res.data,
+        )
+
+    def test_forecast_demand_command_replaces_suggestions(self):
+        """Test the command writes one suggestion per SKU of every store"""
+        call_command('forecast_demand', workers=1, stdout=StringIO())
+        call_command('forecast_demand', workers=1, stdout=StringIO())
+
+        self.assertEqual(ReorderSuggestion.objects.count(), 3)
+
+
+class ForecastWithoutNumpyTests(TestCase):
+    """Test the reorder suggestions endpoint when numpy is not installed"""
+
+    def test_recompute_is_unavailable(self):
+        """Test POST answers 503 on failure while GET lists old suggestions"""
+        admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'pass123', is_staff=True
+        )
+        store = Store.objects.create(name='Store#1', city='Cairo')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with mock.patch.object(forecasting, 'np', None):
+            res = client.post(reorder_suggestions_url(store.id))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            client.get(reorder_suggestions_url(store.id)).data, []
+        )
@@ -3,9 +3,11 @@ from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import Store
+from core.models import Change, Store, StoreProduct, StockAlert
+from core.tests import factories
 from store.serializers import StoreSerializer
 
 
@@ -16,6 +18,16 @@ def detail_url(store_id):
     return reverse('store:store-detail', args=[store_id])
 
 
+def alerts_url(store_id):
+    """Return Store alerts URL"""
+    return reverse('store:store-alerts', args=[store_id])
+
+
+def reorder_points_url(store_id):
+    """Return Store reorder points URL"""
+    return reverse('store:store-reorder-points', args=[store_id])
+
+
 class PublicStoreApiTest(TestCase):
     """Test the public available API"""
 
@@ -42,11 +54,11 @@ class PublicStoreApiTest(TestCase):
 class PrivateStoreApiTest(TestCase):
     """Test the authorized store API"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_superuser()
+
     def setUp(self):
-        self.admin = get_user_model().objects.create_superuser(
-            'admin@admin.com',
-            'admin123'
-        )
         self.client = APIClient()
         self.client.force_authenticate(self.admin)
 
@@ -65,6 +77,45 @@ class PrivateStoreApiTest(TestCase):
         self.assertEqual(res.data, serializer.data)
 
 
+    def test_list_stores_matches_serializer_bytes(self):
+        """Test the fast list path renders the same JSON as StoreSerializer"""
+        Store.objects.create(name='Store#1', city='Cairo', cash='10.1')
+        Store.objects.create(name='Store#2', city='Alex', cash='123456.78')
+
+        res = self.client.get(STORES_URL)
+
+        stores = Store.objects.all().order_by('-name')
+        expected = JSONRenderer().render(
+            StoreSerializer(stores, many=True).data
+        )
+        self.assertEqual(res.content, expected)
+
+    def test_list_stores_not_modified(self):
+        """Test a matching ETag returns 304 until a store changes"""
+        store = Store.objects.create(name='Store#1', city='Cairo')
+
+        res = self.client.get(STORES_URL)
+        etag = res['ETag']
+        res_cached = self.client.get(STORES_URL, HTTP_IF_NONE_MATCH=etag)
+        store.city = 'Alex'
+        store.save()
+        res_changed = self.client.get(STORES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res_cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res_cached.content, b'')
+        self.assertEqual(res_changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res_changed['ETag'], etag)
+
+    def test_view_store_detail_not_modified(self):
+        """Test viewing a store detail with a matching ETag returns 304"""
+        store = Store.objects.create(name='Store#1', city='Cairo')
+        url = detail_url(store.id)
+
+        res = self.client.get(url)
+        res_cached = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res_cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_view_store_detail(self):
         """Test viewing a store detail"""
         store = Store.objects.create(name='Store#1', city='Cairo')
@@ -174,3 +225,98 @@ class PrivateStoreApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(len(stores), 0)
 
+
+
+class StoreAlertsApiTest(TestCase):
+    """Test reorder points and low-stock alerts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_superuser()
+        cls.supplier = factories.create_user(
+            'Supplier', 'supplier@supplier.com'
+        )
+        cls.customer = factories.create_user(
+            'Customer', 'customer@customer.com'
+        )
+        cls.store = factories.create_store(cash=10000)
+        cls.product = factories.create_product(cls.supplier, price='10.00')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post_transaction(self, trx_type, party, quantity):
+        return self.client.post(reverse('transaction:transaction-list'), {
+            'trx_type': trx_type,
+            'store': self.store.id,
+            'created_by': self.admin.id,
+            'party': party.id,
+            'product_id': self.product.id,
+            'amount': str(10 * quantity),
+            'quantity': quantity,
+        })
+
+    def test_set_reorder_point_before_stock_exists(self):
+        """Test setting a reorder point creates an empty store product row"""
+        res = self.client.put(
+            reorder_points_url(self.store.id),
+            {'product_id': self.product.id, 'reorder_point': 3},
+        )
+
+        store_product = StoreProduct.objects.get(
+            store_id=self.store, product_id=self.product
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(store_product.reorder_point, 3)
+        self.assertEqual(store_product.quantity, 0)
+
+    def test_set_reorder_point_records_new_row_once(self):
+        """Test creating a stock row records a change and updates none"""
+        self.client.put(
+            reorder_points_url(self.store.id),
+            {'product_id': self.product.id, 'reorder_point': 3},
+        )
+        self.client.put(
+            reorder_points_url(self.store.id),
+            {'product_id': self.product.id, 'reorder_point': 4},
+        )
+
+        changes = Change.objects.filter(
+            kind=Change.STOCK,
+            store_id=self.store.id,
+            product_id=self.product.id,
+        )
+        self.assertEqual(list(changes.values_list('quantity', flat=True)), [0])
+        self.assertEqual(
+            StoreProduct.objects.get(
+                store_id=self.store, product_id=self.product
+            ).reorder_point,
+            4,
+        )
+
+    def test_out_transaction_crossing_reorder_point_raises_one_alert(self):
+        """Test an alert is recorded only when stock crosses the reorder point
+        """
+        self.post_transaction('IN', self.supplier, 10)
+        self.client.put(
+            reorder_points_url(self.store.id),
+            {'product_id': self.product.id, 'reorder_point': 5},
+        )
+
+        self.post_transaction('OUT', self.customer, 4)
+        self.post_transaction('OUT', self.customer, 2)
+        self.post_transaction('OUT', self.customer, 1)
+        res = self.client.get(alerts_url(self.store.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['product'], self.product.id)
+        self.assertEqual(res.data[0]['quantity'], 4)
+        self.assertEqual(res.data[0]['reorder_point'], 5)
+
+    def test_no_alert_without_reorder_point(self):
+        self.post_transaction('IN', self.supplier, 2)
+        self.post_transaction('OUT', self.customer, 2)
+
+        self.assertFalse(StockAlert.objects.exists())
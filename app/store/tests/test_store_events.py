@@ -0,0 +1,179 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import events
+from core.models import Change, Product, Store
+from core.tests.factories import stamp_changes_on_insert
+from store.sse import store_events
+
+
+def sample_scope(store_id, token=None, last_event_id=None):
+    headers = [(b'authorization', f'Token {token}'.encode())] if token else []
+    if last_event_id:
+        headers.append((b'last-event-id', str(last_event_id).encode()))
+    return {
+        'type': 'http',
+        'path': f'/api/stores/{store_id}/events/',
+        'query_string': b'',
+        'headers': headers,
+    }
+
+
+def stream(scope, store_id, publish=None, stop_after=b'event: '):
+    """Run the SSE app, publish once subscribed and return the sent messages"""
+
+    async def run():
+        sent = []
+        inbox = asyncio.Queue()
+
+        async def receive():
+            return await inbox.get()
+
+        async def send(message):
+            sent.append(message)
+            body = message.get('body', b'')
+            if body.startswith(b'retry') and publish:
+                publish()
+            if stop_after in body:
+                await inbox.put({'type': 'http.disconnect'})
+
+        await asyncio.wait_for(store_events(scope, receive, send, store_id), 5)
+        return sent
+
+    return async_to_sync(run)()
+
+
+class StoreEventsTest(TestCase):
+    """Test the store Server-Sent Events stream"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@admin.com', 'admin123'
+        )
+        self.token = Token.objects.create(user=self.admin)
+        self.store = Store.objects.create(
+            name='Store#1', city='Cairo', cash=10000
+        )
+
+    def test_token_required(self):
+        sent = stream(sample_scope(self.store.id), self.store.id)
+
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_admin_required(self):
+        customer = get_user_model().objects.create_user(
+            'customer@customer.com', 'Customer', 'pass123'
+        )
+        token = Token.objects.create(user=customer)
+
+        sent = stream(sample_scope(self.store.id, token.key), self.store.id)
+
+        self.assertEqual(sent[0]['status'], 403)
+
+    def test_published_events_are_streamed(self):
+        """Test that events published for the store reach the subscriber"""
+        event = {
+            'id': 7,
+            'event': 'stock',
+            'data': {'product_id': 1, 'quantity': 3},
+        }
+
+        sent = stream(
+            sample_scope(self.store.id, self.token.key),
+            self.store.id,
+            publish=lambda: events.broker.dispatch(self.store.id, event),
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/event-stream'), sent[0]['headers']
+        )
+        self.assertIn(
+            b'id: 7\nevent: stock\ndata: {"product_id":1,"quantity":3}\n\n',
+            [m.get('body') for m in sent],
+        )
+
+    def test_last_event_id_replays_missed_stock_changes(self):
+        """Test Last-Event-ID replays the change log in commit order"""
+        stamp_changes_on_insert()
+        supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        product = Product.objects.create(
+            supplier_id=supplier, name='TestProduct', price='10.00'
+        )
+        first, late, last = (
+            Change.objects.create(
+                kind=Change.STOCK,
+                store_id=self.store.id,
+                product_id=product.id,
+                quantity=quantity,
+            )
+            for quantity in (5, 4, 3)
+        )
+        # `late` took its seq before `last` but committed after it
+        Change.objects.filter(seq=last.seq).update(commit_seq=F('seq') + 10)
+        Change.objects.filter(seq=late.seq).update(commit_seq=F('seq') + 20)
+        first.refresh_from_db()
+        late.refresh_from_db()
+
+        sent = stream(
+            sample_scope(
+                self.store.id,
+                self.token.key,
+                last_event_id=events.event_id(first),
+            ),
+            self.store.id,
+        )
+
+        bodies = b''.join(m.get('body', b'') for m in sent)
+        self.assertNotIn(b'"quantity":5', bodies)
+        self.assertLess(
+            bodies.index(b'"quantity":3'), bodies.index(b'"quantity":4')
+        )
+        self.assertIn(f'id: {late.commit_seq}-{late.seq}\n'.encode(), bodies)
+
+    def test_transaction_publishes_stock_event_on_commit(self):
+        """Test that a committed transaction publishes the new stock quantity
+        """
+        stamp_changes_on_insert()
+        supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        product = Product.objects.create(
+            supplier_id=supplier, name='TestProduct', price='10.00'
+        )
+        client = APIClient()
+        client.force_authenticate(supplier)
+
+        with patch.object(events.broker, 'dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(
+                    reverse('transaction:transaction-list'),
+                    {
+                        'trx_type': 'IN',
+                        'store': self.store.id,
+                        'created_by': self.admin.id,
+                        'party': supplier.id,
+                        'product_id': product.id,
+                        'amount': '20.00',
+                        'quantity': 2,
+                    },
+                )
+
+        store_id, event = dispatch.call_args[0]
+        change = Change.objects.get(kind=Change.STOCK)
+        self.assertEqual(store_id, self.store.id)
+        self.assertEqual(event['id'], f'{change.commit_seq}-{change.seq}')
+        self.assertEqual(event['event'], 'stock')
+        self.assertEqual(
+            event['data'], {'product_id': product.id, 'quantity': 2}
+        )
@@ -1,20 +1,196 @@
-from rest_framework import viewsets
+import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser
 
-from core.models import Store
+from core import edits, events
+from core.mixins import (
+    ConditionalGetMixin, FastListModelMixin, ReplicaReadMixin,
+)
+from core.models import (
+    Change, Lot, ReorderSuggestion, Store, StoreProduct, StockAlert,
+)
+from core.versions import bump_stock_version
 
-from store import serializers
+from store import availability, serializers
 
 
 
-class StoreViewSet(viewsets.ModelViewSet):
+class StoreViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    FastListModelMixin,
+    viewsets.ModelViewSet,
+):
 
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAdminUser,)
     queryset = Store.objects.all()
     serializer_class = serializers.StoreSerializer
+    values_serializer_class = serializers.StoreValuesSerializer
+    replica_actions = ('list', 'retrieve', 'alerts', 'valuation', 'expiring')
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         return self.queryset.order_by('-name')
+
+    def perform_update(self, serializer):
+        """Update a Store, audit its cash and publish it to subscribers"""
+        previous_cash = serializer.instance.cash
+        edits.store_updated(serializer.save(), previous_cash)
+
+    @action(detail=True)
+    def alerts(self, request, pk=None):
+        """List the low-stock alerts of a store, newest first"""
+        store = self.get_object()
+        alerts = StockAlert.objects.filter(store=store).order_by('-created_at')
+        return Response(
+            serializers.StockAlertSerializer(alerts, many=True).data
+        )
+
+    @action(detail=True)
+    def expiring(self, request, pk=None):
+        """List the lots of a store expiring within ?days= (default 30)
+
+        Expired lots still in stock are listed first. The report is a range
+        scan of the partial (store, expiry) index of lots in stock.
+        """
+        store = self.get_object()
+        serializer = serializers.ExpiringQuerySerializer(
+            data=request.query_params
+        )
+        serializer.is_valid(raise_exception=True)
+        before = timezone.localdate() + datetime.timedelta(
+            days=serializer.validated_data['days'] + 1
+        )
+        return Response(
+            serializers.LotSerializer(
+                Lot.objects.expiring(store, before), many=True
+            ).data
+        )
+
+    @action(detail=True)
+    def valuation(self, request, pk=None):
+        """Value the stock on hand of a store at weighted-average and FIFO cost
+
+        Both costs are kept up to date on StoreProduct by the write path, so
+        the report is one query over the (store, product) unique index.
+        """
+        store = self.get_object()
+        rows = (
+            StoreProduct.objects.filter(store_id=store)
+            .order_by('product_id')
+            .values_list(
+                'product_id', 'quantity', 'average_cost', 'fifo_value'
+            )
+        )
+        products = [
+            {
+                'product': product,
+                'quantity': quantity,
+                'average_cost': average_cost,
+                'average_value': average_cost * max(quantity, 0),
+                'fifo_value': fifo_value,
+            }
+            for product, quantity, average_cost, fifo_value in rows
+        ]
+        return Response(
+            serializers.ValuationSerializer(
+                {
+                    'store': store.id,
+                    'average_value': sum(
+                        (line['average_value'] for line in products),
+                        Decimal(0),
+                    ),
+                    'fifo_value': sum(
+                        (line['fifo_value'] for line in products), Decimal(0)
+                    ),
+                    'products': products,
+                }
+            ).data
+        )
+
+    @action(detail=True, methods=['post'])
+    def availability(self, request, pk=None):
+        """Check whether a store can supply each (product, quantity) line
+
+        Each line is `available`, `short` or `unknown` (no such product).
+        Answers come from the cache until the stock of the store changes.
+        """
+        store = self.get_object()
+        serializer = serializers.AvailabilitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = [
+            (line['product'], line['quantity'])
+            for line in serializer.validated_data['lines']
+        ]
+        result = availability.check_availability(store.id, lines)
+        return Response(
+            serializers.AvailabilitySerializer(
+                {'store': store.id, **result}
+            ).data
+        )
+
+    @action(detail=True, methods=['put'], url_path='reorder-points')
+    def reorder_points(self, request, pk=None):
+        """Set the reorder point of a product in a store"""
+        store = self.get_object()
+        serializer = serializers.ReorderPointSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        product = serializer.validated_data['product_id']
+        reorder_point = serializer.validated_data['reorder_point']
+        rows = StoreProduct.objects.filter(store_id=store, product_id=product)
+        with transaction.atomic():
+            if not rows.update(reorder_point=reorder_point):
+                # A concurrent request may insert the row first, so insert
+                # without failing on the unique constraint and update again
+                StoreProduct.objects.bulk_create(
+                    [
+                        StoreProduct(
+                            store_id=store,
+                            product_id=product,
+                            quantity=0,
+                            reorder_point=reorder_point,
+                        )
+                    ],
+                    ignore_conflicts=True,
+                )
+                rows.update(reorder_point=reorder_point)
+                change = Change.objects.record_stock(rows.get())
+                bump_stock_version(store.id)
+                transaction.on_commit(lambda: events.publish_stock([change]))
+        return Response(serializer.data)
+
+    @action(
+        detail=True, methods=['get', 'post'], url_path='reorder-suggestions'
+    )
+    def reorder_suggestions(self, request, pk=None):
+        """List the products a store should reorder, POST recomputes them"""
+        store = self.get_object()
+        if request.method == 'POST':
+            # Imported here so web workers load numpy only when forecasting
+            from store import forecasting
+            try:
+                forecasting.run_forecast([store.id])
+            except ImproperlyConfigured as exc:
+                return Response(
+                    {'detail': str(exc)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+        suggestions = ReorderSuggestion.objects.filter(
+            store=store, suggested_quantity__gt=0
+        )
+        suggestions = suggestions.order_by('-suggested_quantity', 'product_id')
+        return Response(
+            serializers.ReorderSuggestionSerializer(
+                suggestions, many=True
+            ).data
+        )
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 
-from core.models import Transaction, Store
-from store.serializers import StoreSerializer
-from user.serializers import UserSerializer
+from core.models import Transaction, Store, Product, User
+from core.serializers import ValuesSerializer
+from store.serializers import StoreSerializer, StoreValuesSerializer
+from user.serializers import UserSerializer, UserValuesSerializer
 
 class TransactionSerializer(serializers.ModelSerializer):
     """Serializes Transaction objects"""
@@ -24,3 +25,81 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = ('id', 'trx_type','store', 'created_by', 'party', 'amount', 'created_at')
         read_only_fields = ('id', 'trx_type','store', 'created_by', 'party', 'amount', 'created_at')
+
+
+class TransferLineSerializer(serializers.Serializer):
+    """Serializes one product line of a stock transfer"""
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class TransferSerializer(serializers.Serializer):
+    """Validates a stock transfer between two stores"""
+    MAX_LINES = 1000
+
+    created_by = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(user_type='Admin')
+    )
+    from_store = serializers.PrimaryKeyRelatedField(
+        queryset=Store.objects.all()
+    )
+    to_store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all())
+    lines = TransferLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, value):
+        """Merge the lines into {product: quantity} with one query"""
+        if len(value) > self.MAX_LINES:
+            raise serializers.ValidationError(
+                f'A transfer can move at most {self.MAX_LINES} lines.'
+            )
+
+        quantities = {}
+        for line in value:
+            quantities[line['product_id']] = (
+                quantities.get(line['product_id'], 0) + line['quantity']
+            )
+
+        products = Product.objects.in_bulk(list(quantities))
+        unknown = sorted(set(quantities) - set(products))
+        if unknown:
+            raise serializers.ValidationError(f'Unknown products {unknown}.')
+        return {
+            products[product_id]: quantity
+            for product_id, quantity in quantities.items()
+        }
+
+    def validate(self, attrs):
+        if attrs['from_store'] == attrs['to_store']:
+            raise serializers.ValidationError(
+                'Cannot transfer stock to the same store.'
+            )
+        return attrs
+
+
+class PriceAuditLineSerializer(serializers.Serializer):
+    """Serializes one transaction line priced at its creation date"""
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=8, decimal_places=2)
+
+
+class PriceAuditSerializer(serializers.Serializer):
+    """Serializes a transaction amount against its lines priced when created"""
+    id = serializers.IntegerField()
+    trx_type = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    priced_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    difference = serializers.DecimalField(max_digits=16, decimal_places=2)
+    lines = PriceAuditLineSerializer(many=True)
+
+
+class TransactionValuesSerializer(ValuesSerializer):
+    """Fast read-only Transaction rows, same output as TransactionSerializer"""
+    model = Transaction
+    fields = TransactionSerializer.Meta.fields
+    nested = {
+        'store': StoreValuesSerializer,
+        'created_by': UserValuesSerializer,
+        'party': UserValuesSerializer,
+    }
@@ -0,0 +1,163 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Lot, StoreProduct
+from core.tests import factories
+
+TRANSACTION_URL = reverse('transaction:transaction-list')
+TRANSFER_URL = reverse('transaction:transaction-transfer')
+
+
+def expiring_url(store_id):
+    """Return Store expiring-soon report URL"""
+    return reverse('store:store-expiring', args=[store_id])
+
+
+class LotTests(TestCase):
+    """Test lot tracking and first-expiry-first-out consumption"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = factories.create_user('Admin', is_staff=True)
+        cls.supplier = factories.create_user('Supplier')
+        cls.customer = factories.create_user('Customer')
+        cls.store_a = factories.create_store(name='Store#A', cash='10000.00')
+        cls.store_b = factories.create_store(name='Store#B', cash='10000.00')
+        cls.product = factories.create_product(
+            cls.supplier, name='Milk', price='2.00'
+        )
+        cls.today = timezone.localdate()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post_transaction(self, trx_type, quantity, **extra):
+        return self.client.post(
+            TRANSACTION_URL,
+            {
+                'trx_type': trx_type,
+                'store': self.store_a.id,
+                'created_by': self.admin.id,
+                'party': (
+                    self.supplier.id if trx_type == 'IN' else self.customer.id
+                ),
+                'amount': str(2 * quantity),
+                'product_id': self.product.id,
+                'quantity': quantity,
+                **extra,
+            },
+        )
+
+    def receive(self, code, days, quantity):
+        res = self.post_transaction(
+            'IN',
+            quantity,
+            lot=code,
+            expires_on=(
+                self.today + datetime.timedelta(days=days)
+            ).isoformat(),
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.content)
+
+    def lots(self, store):
+        return dict(
+            Lot.objects.filter(store=store).values_list('code', 'quantity')
+        )
+
+    def test_in_transaction_receives_lot(self):
+        self.receive('L1', 10, 5)
+        self.receive('L1', 10, 3)
+
+        self.assertEqual(self.lots(self.store_a), {'L1': 8})
+
+    def test_lot_received_with_other_expiry_rejected(self):
+        """Test a lot code with another expiry is a 400 and changes nothing"""
+        self.receive('L1', 10, 5)
+
+        res = self.post_transaction(
+            'IN',
+            3,
+            lot='L1',
+            expires_on=(self.today + datetime.timedelta(days=20)).isoformat(),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expires_on', res.data)
+        self.assertEqual(self.lots(self.store_a), {'L1': 5})
+        self.assertEqual(
+            StoreProduct.objects.get(
+                store_id=self.store_a, product_id=self.product
+            ).quantity,
+            5,
+        )
+
+    def test_expiry_needs_lot_code(self):
+        res = self.post_transaction('IN', 5, expires_on=self.today.isoformat())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_consumes_first_expiry_first(self):
+        self.receive('LATE', 30, 5)
+        self.receive('SOON', 3, 5)
+        self.receive('MID', 10, 5)
+
+        res = self.post_transaction('OUT', 7)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.lots(self.store_a), {'SOON': 0, 'MID': 3, 'LATE': 5}
+        )
+
+    def test_consume_is_one_locking_query(self):
+        self.receive('A', 3, 5)
+        self.receive('B', 10, 5)
+        store_product = StoreProduct.objects.get(
+            store_id=self.store_a, product_id=self.product
+        )
+
+        with self.assertNumQueries(2):
+            portions = Lot.objects.consume(store_product, 7)
+
+        self.assertEqual(
+            [(lot.code, taken) for lot, taken in portions],
+            [('A', 5), ('B', 2)],
+        )
+
+    def test_transfer_moves_lots(self):
+        self.receive('SOON', 3, 5)
+        self.receive('LATE', 30, 5)
+
+        res = self.client.post(TRANSFER_URL, {
+            'created_by': self.admin.id,
+            'from_store': self.store_a.id,
+            'to_store': self.store_b.id,
+            'lines': [{'product_id': self.product.id, 'quantity': 6}],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.lots(self.store_a), {'SOON': 0, 'LATE': 4})
+        self.assertEqual(self.lots(self.store_b), {'SOON': 5, 'LATE': 1})
+        self.assertEqual(
+            Lot.objects.get(store=self.store_b, code='LATE').expires_on,
+            self.today + datetime.timedelta(days=30),
+        )
+
+    def test_expiring_report(self):
+        self.receive('SOON', 3, 5)
+        self.receive('EXPIRED', -1, 2)
+        self.receive('LATE', 30, 5)
+        self.post_transaction('OUT', 1)
+
+        res = self.client.get(expiring_url(self.store_a.id), {'days': 7})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(lot['code'], lot['quantity']) for lot in res.data],
+            [('EXPIRED', 1), ('SOON', 5)],
+        )
@@ -0,0 +1,195 @@
+import datetime
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from unittest import skipUnless
+
+from core import partitions
+from core.models import (
+    CostLayer, CountSession, Product, Store, Transaction, TransactionProduct,
+)
+
+OLD_MONTH = datetime.datetime(2020, 1, 15, tzinfo=datetime.timezone.utc)
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'partitioning requires Postgres'
+)
+class TransactionPartitionTests(TestCase):
+    """Test monthly partitioning and archival of the transaction tables"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(
+            'admin@admin.com', 'Admin', 'pass123'
+        )
+        self.supplier = get_user_model().objects.create_user(
+            'supplier@supplier.com', 'Supplier', 'pass123'
+        )
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.product = Product.objects.create(
+            supplier_id=self.supplier, name='TestProduct', price='10.00'
+        )
+        call_command(
+            'create_partitions', start='2020-01', months=2, stdout=StringIO()
+        )
+
+    def sample_transaction(self, created_at):
+        trx = Transaction.objects.create(
+            created_by=self.admin,
+            party=self.supplier,
+            store=self.store,
+            trx_type='IN',
+            amount='10.00',
+        )
+        TransactionProduct.objects.create(
+            trx_id=trx, product_id=self.product, quantity=1
+        )
+        Transaction.objects.filter(pk=trx.pk).update(created_at=created_at)
+        TransactionProduct.objects.filter(trx_id=trx).update(
+            created_at=created_at
+        )
+        return trx
+
+    def test_tables_are_partitioned(self):
+        with connection.cursor() as cursor:
+            for table in partitions.PARTITIONED_TABLES:
+                self.assertTrue(partitions.is_partitioned(cursor, table))
+                self.assertIn(
+                    datetime.date(2020, 1, 1),
+                    partitions.list_partitions(cursor, table),
+                )
+
+    def test_date_filter_prunes_partitions(self):
+        """Test a created_at range only scans the matching monthly partition"""
+        plan = Transaction.objects.filter(
+            created_at__gte=OLD_MONTH.replace(day=1),
+            created_at__lt=OLD_MONTH.replace(month=2, day=1),
+        ).explain()
+
+        self.assertIn('core_transaction_y2020m01', plan)
+        self.assertNotIn('core_transaction_y2020m02', plan)
+        self.assertNotIn('core_transaction_default', plan)
+
+    def test_archive_and_restore_partition(self):
+        """Test old partitions are archived to gzip files and restored intact
+        """
+        old = self.sample_transaction(OLD_MONTH)
+        recent = self.sample_transaction(OLD_MONTH.replace(month=2))
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'archive_partitions',
+                before='2020-02',
+                dir=directory,
+                stdout=StringIO(),
+            )
+            files = sorted(
+                os.path.join(directory, name) for name in os.listdir(directory)
+            )
+            archived_ids = list(
+                Transaction.objects.values_list('id', flat=True)
+            )
+
+            call_command('restore_partitions', *files, stdout=StringIO())
+
+        self.assertEqual([os.path.basename(path) for path in files], [
+            'core_transaction_y2020m01.copy.gz',
+            'core_transactionproduct_y2020m01.copy.gz',
+        ])
+        self.assertEqual(archived_ids, [recent.id])
+        self.assertEqual(
+            Transaction.objects.get(pk=old.pk).created_at, OLD_MONTH
+        )
+        self.assertEqual(
+            TransactionProduct.objects.filter(trx_id=old).count(), 1
+        )
+
+    def partition_of(self, trx):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM core_transaction '
+                'WHERE id = %s',
+                [trx.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_create_partition_moves_rows_out_of_the_default_partition(self):
+        """Test a month with rows in the default partition can be created"""
+        early = self.sample_transaction(OLD_MONTH.replace(year=2019, month=6))
+        self.assertEqual(self.partition_of(early), 'core_transaction_default')
+
+        call_command(
+            'create_partitions', start='2019-06', months=1, stdout=StringIO()
+        )
+
+        self.assertEqual(self.partition_of(early), 'core_transaction_y2019m06')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tablename, count(*) FROM pg_indexes '
+                'WHERE tablename IN %s GROUP BY tablename',
+                [('core_transaction_y2019m06', 'core_transaction_y2020m01')],
+            )
+            self.assertEqual(
+                len(set(count for _, count in cursor.fetchall())), 1
+            )
+        self.assertEqual(
+            TransactionProduct.objects.get(trx_id=early).created_at,
+            OLD_MONTH.replace(year=2019, month=6),
+        )
+
+    def test_archive_releases_references_to_archived_transactions(self):
+        """Test rows pointing at archived transactions are released"""
+        old = self.sample_transaction(OLD_MONTH)
+        recent = self.sample_transaction(OLD_MONTH.replace(month=2))
+        Transaction.objects.filter(pk=recent.pk).update(counterpart=old)
+        CostLayer.objects.create(
+            store=self.store,
+            product=self.product,
+            trx=old,
+            quantity=1,
+            remaining=0,
+            unit_cost=10,
+        )
+        session = CountSession.objects.create(
+            store=self.store, created_by=self.admin, adjustment_in=old
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'archive_partitions',
+                before='2020-02',
+                dir=directory,
+                stdout=StringIO(),
+            )
+
+        session.refresh_from_db()
+        self.assertIsNone(Transaction.objects.get(pk=recent.pk).counterpart_id)
+        self.assertIsNone(session.adjustment_in_id)
+        self.assertFalse(CostLayer.objects.exists())
+
+    def test_archive_refuses_transactions_with_stock_on_hand(self):
+        old = self.sample_transaction(OLD_MONTH)
+        CostLayer.objects.create(
+            store=self.store,
+            product=self.product,
+            trx=old,
+            quantity=1,
+            remaining=1,
+            unit_cost=10,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(CommandError):
+                call_command(
+                    'archive_partitions',
+                    before='2020-02',
+                    dir=directory,
+                    stdout=StringIO(),
+                )
+
+        self.assertTrue(Transaction.objects.filter(pk=old.pk).exists())
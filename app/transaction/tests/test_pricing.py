@@ -0,0 +1,151 @@
+import datetime
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, ProductPrice, Store, StoreProduct, Transaction
+from product import quotes
+
+TRANSACTION_URL = reverse('transaction:transaction-list')
+PRICE_AUDIT_URL = reverse('transaction:transaction-price-audit')
+
+
+def quote_url(product_id):
+    return reverse('product:product-quote', args=[product_id])
+
+
+def sample_user(user_type, email):
+    return get_user_model().objects.create_user(
+        email=email, user_type=user_type, password='pass123'
+    )
+
+
+class TransactionPricingTest(TestCase):
+    """Test transactions are priced with effective-dated prices"""
+
+    def setUp(self):
+        self.admin = sample_user('Admin', 'admin@admin.com')
+        self.customer = sample_user('Customer', 'customer@customer.com')
+        supplier = sample_user('Supplier', 'supplier@supplier.com')
+        self.store = Store.objects.create(name='Store#1', city='Cairo')
+        self.product = Product.objects.create(
+            supplier_id=supplier, name='Laptop', price='100.00'
+        )
+        self.since = timezone.now() - datetime.timedelta(hours=1)
+        ProductPrice.objects.create(
+            product=self.product, price='100.00', effective_from=self.since
+        )
+        StoreProduct.objects.create(
+            store_id=self.store, product_id=self.product, quantity=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def change_price(self, price):
+        self.product.price = Decimal(price)
+        self.product.save()
+        return ProductPrice.objects.record(self.product)
+
+    def sell(self, amount, quantity=1, **extra):
+        return self.client.post(
+            TRANSACTION_URL,
+            {
+                'trx_type': 'OUT',
+                'store': self.store.id,
+                'created_by': self.admin.id,
+                'party': self.customer.id,
+                'product_id': self.product.id,
+                'amount': amount,
+                'quantity': quantity,
+                **extra,
+            },
+        )
+
+    def quote(self, product=None):
+        return self.client.get(quote_url((product or self.product).id)).data[
+            'quote'
+        ]
+
+    def test_in_flight_transaction_priced_at_quote_time(self):
+        """Test a transaction quoted before a price change is still accepted"""
+        quote = self.quote()
+        self.change_price('120.00')
+
+        res = self.sell('100.00', quote=quote)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.sell('100.00').status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.sell('120.00').status_code, status.HTTP_201_CREATED
+        )
+
+    def test_quote_endpoint_returns_current_price(self):
+        res = self.client.get(quote_url(self.product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['price'], '100.00')
+        self.assertEqual(
+            quotes.read_quote(res.data['quote'], self.product.id),
+            parse_datetime(res.data['priced_at']),
+        )
+
+    def test_forged_expired_or_foreign_quote_rejected(self):
+        """Test quotes cannot be backdated, reused or moved to a product"""
+        quote = self.quote()
+        self.change_price('120.00')
+        with mock.patch(
+            'time.time',
+            return_value=time.time() - settings.PRICE_QUOTE_SECONDS - 5,
+        ):
+            expired = self.quote()
+        other = Product.objects.create(
+            supplier_id=self.product.supplier_id, name='Mouse', price='100.00'
+        )
+
+        for forged in (
+            quote[:-1] + ('A' if quote[-1] != 'A' else 'B'),
+            expired,
+            self.quote(other),
+        ):
+            res = self.sell('100.00', quote=forged)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_price_audit_reprices_at_creation_date(self):
+        """Test the audit prices each line at the price when it was created"""
+        self.sell('200.00', quantity=2)
+        self.change_price('120.00')
+        self.sell('120.00')
+        Transaction.objects.filter(amount=Decimal('120.00')).update(
+            amount=Decimal('110.00')
+        )
+
+        res = self.client.get(
+            PRICE_AUDIT_URL, {'created_after': self.since.isoformat()}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row['amount'], row['priced_amount'], row['difference'])
+                for row in res.data
+            ],
+            [('200.00', '200.00', '0.00'), ('110.00', '120.00', '-10.00')],
+        )
+        self.assertEqual(res.data[1]['lines'][0]['unit_price'], '120.00')
+
+    def test_price_audit_requires_range(self):
+        res = self.client.get(PRICE_AUDIT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
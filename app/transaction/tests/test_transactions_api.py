@@ -1,15 +1,25 @@
-from django.contrib.auth import get_user_model
+from unittest.mock import patch
+
+from django.db import IntegrityError
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import Transaction, TransactionProduct, StoreProduct, Store, Product
+from core.models import Transaction, TransactionProduct, StoreProduct
+from core.tests import factories
+from transaction.serializers import (
+    TransactionSerializer, TransactionValuesSerializer,
+)
 
 TRANSACTION_URL = reverse('transaction:transaction-list')
+MY_TRANSACTION_URL = (
+    reverse('transaction:transaction-list') + 'my-transactions/'
+)
 
 def sample_user(user_type, email='user@user.com', password='pass123'):
-    return get_user_model().objects.create_user(email=email, user_type=user_type, password=password)
+    return factories.create_user(user_type, email, password)
 
 def sample_transaction_payload(trx_type, store, created_by, party, product_id, amount= '1000.00', quantity = 1):
     """return a transaction object"""
@@ -27,19 +37,26 @@ def sample_transaction_payload(trx_type, store, created_by, party, product_id, a
 class TransactionsGeneralApiTest(TestCase):
     """Test the General Transactions APIs"""
 
-    def setUp(self):
-        self.admin = sample_user(user_type='Admin', email='admin@admin.com')
-        self.supplier = sample_user(user_type='Supplier', email='supplier@supplier.com')
-        self.customer = sample_user(user_type='Customer', email='customer@customer.com')
-        self.store = Store.objects.create(name='Store#1', city='Cairo')
-        self.product = Product.objects.create(supplier_id=self.supplier, name='TestProduct', price='1000.00', image='')
-        self.payload = sample_transaction_payload(
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = sample_user(user_type='Admin', email='admin@admin.com')
+        cls.supplier = sample_user(
+            user_type='Supplier', email='supplier@supplier.com'
+        )
+        cls.customer = sample_user(
+            user_type='Customer', email='customer@customer.com'
+        )
+        cls.store = factories.create_store(name='Store#1', city='Cairo')
+        cls.product = factories.create_product(cls.supplier)
+        cls.payload = sample_transaction_payload(
             trx_type='OUT',
-            store=self.store.id,
-            created_by=self.supplier.id,
-            party=self.customer.id,
-            product_id=self.product.id,
+            store=cls.store.id,
+            created_by=cls.supplier.id,
+            party=cls.customer.id,
+            product_id=cls.product.id,
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(self.customer)
 
@@ -125,18 +142,25 @@ class TransactionsGeneralApiTest(TestCase):
 class TransactionsInApiTest(TestCase):
     """Test the IN Transactions APIs"""
 
-    def setUp(self):
-        self.admin = sample_user(user_type='Admin', email='admin@admin.com')
-        self.supplier = sample_user(user_type='Supplier', email='supplier@supplier.com')
-        self.store = Store.objects.create(name='Store#1', city='Cairo', cash=10000)
-        self.product = Product.objects.create(supplier_id=self.supplier, name='TestProduct', price='1000.00', image='')
-        self.payload = sample_transaction_payload(
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = sample_user(user_type='Admin', email='admin@admin.com')
+        cls.supplier = sample_user(
+            user_type='Supplier', email='supplier@supplier.com'
+        )
+        cls.store = factories.create_store(
+            name='Store#1', city='Cairo', cash=10000
+        )
+        cls.product = factories.create_product(cls.supplier)
+        cls.payload = sample_transaction_payload(
             trx_type='IN',
-            store=self.store.id,
-            created_by=self.admin.id,
-            party=self.supplier.id,
-            product_id=self.product.id,
+            store=cls.store.id,
+            created_by=cls.admin.id,
+            party=cls.supplier.id,
+            product_id=cls.product.id,
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(self.supplier)
 
@@ -171,6 +195,17 @@ class TransactionsInApiTest(TestCase):
         self.assertEqual(len(store_products), 1)
         self.assertEqual(store_product_record.quantity, self.payload['quantity'] * 2)
 
+    def test_transaction_in_conflict_fails_without_writing(self):
+        """Test a transaction hitting an integrity error is rejected"""
+        with patch(
+            'transaction.views.receive_cost_layer', side_effect=IntegrityError
+        ):
+            res = self.client.post(TRANSACTION_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(StoreProduct.objects.exists())
+
     def test_transaction_type_in_from_customer_fails(self):
         customer = sample_user(user_type='Customer', email='customer@customer.com')
         self.payload['party'] = customer
@@ -199,19 +234,28 @@ class TransactionsInApiTest(TestCase):
 class TransactionsOutApiTest(TestCase):
     """Test the OUT Transactions APIs"""
 
-    def setUp(self):
-        self.admin = sample_user(user_type='Admin', email='admin@admin.com')
-        self.customer = sample_user(user_type='Customer', email='customer@customer.com')
-        self.supplier = sample_user(user_type='Supplier', email='supplier@supplier.com')
-        self.store = Store.objects.create(name='Store', city='Cairo', cash=10000)
-        self.product = Product.objects.create(supplier_id=self.supplier, name='TestProduct', price='1000.00', image='')
-        self.payload = sample_transaction_payload(
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = sample_user(user_type='Admin', email='admin@admin.com')
+        cls.customer = sample_user(
+            user_type='Customer', email='customer@customer.com'
+        )
+        cls.supplier = sample_user(
+            user_type='Supplier', email='supplier@supplier.com'
+        )
+        cls.store = factories.create_store(
+            name='Store', city='Cairo', cash=10000
+        )
+        cls.product = factories.create_product(cls.supplier)
+        cls.payload = sample_transaction_payload(
             trx_type='OUT',
-            store=self.store.id,
-            created_by=self.admin.id,
-            party=self.customer.id,
-            product_id=self.product.id,
+            store=cls.store.id,
+            created_by=cls.admin.id,
+            party=cls.customer.id,
+            product_id=cls.product.id,
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(self.supplier)
 
@@ -299,3 +343,112 @@ class TransactionsOutApiTest(TestCase):
         self.assertEqual(transactions_count, 1)
         self.assertEqual(transaction_products_count, 1)
         self.assertEqual(store_products.quantity, 5)
+
+
+
+class TransactionsListApiTest(TestCase):
+    """Test listing Transactions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = sample_user(user_type='Admin', email='admin@admin.com')
+        cls.supplier = sample_user(
+            user_type='Supplier', email='supplier@supplier.com'
+        )
+        cls.customer = sample_user(
+            user_type='Customer', email='customer@customer.com'
+        )
+        cls.store = factories.create_store(
+            name='Store', city='Cairo', cash='10000.5'
+        )
+        Transaction.objects.create(
+            created_by=cls.admin,
+            party=cls.supplier,
+            store=cls.store,
+            trx_type='IN',
+            amount='3000.00',
+        )
+        Transaction.objects.create(
+            created_by=cls.admin,
+            party=cls.customer,
+            store=cls.store,
+            trx_type='OUT',
+            amount='1000.1',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_list_transactions_matches_serializer_bytes(self):
+        """Test the fast list path renders TransactionSerializer's JSON"""
+        res = self.client.get(TRANSACTION_URL)
+
+        transactions = Transaction.objects.order_by('created_at', 'id')
+        expected = JSONRenderer().render(
+            TransactionSerializer(transactions, many=True).data
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected)
+        self.assertEqual(
+            JSONRenderer().render(
+                TransactionValuesSerializer(transactions).data
+            ),
+            expected,
+        )
+
+    def test_list_my_transactions_only_returns_party_rows(self):
+        """Test my-transactions lists only the authenticated party transactions
+        """
+        res = self.client.get(MY_TRANSACTION_URL)
+
+        transactions = Transaction.objects.filter(
+            party=self.customer
+        ).order_by('created_at', 'id')
+        expected = JSONRenderer().render(
+            TransactionSerializer(transactions, many=True).data
+        )
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.content, expected)
+
+    def test_list_transactions_filtered_by_created_at(self):
+        """Test listing transactions inside a created_at range"""
+        Transaction.objects.filter(trx_type='IN').update(
+            created_at='2020-01-15T00:00:00Z'
+        )
+
+        res_recent = self.client.get(
+            TRANSACTION_URL, {'created_after': '2021-01-01'}
+        )
+        res_old = self.client.get(
+            TRANSACTION_URL, {'created_before': '2020-02-01T00:00:00Z'}
+        )
+        res_invalid = self.client.get(
+            TRANSACTION_URL, {'created_after': 'last-week'}
+        )
+
+        self.assertEqual([trx['trx_type'] for trx in res_recent.data], ['OUT'])
+        self.assertEqual([trx['trx_type'] for trx in res_old.data], ['IN'])
+        self.assertEqual(res_invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_my_transactions_not_modified(self):
+        """Test my-transactions returns 304 until a new transaction is made"""
+        res = self.client.get(MY_TRANSACTION_URL)
+        etag = res['ETag']
+        res_cached = self.client.get(
+            MY_TRANSACTION_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        Transaction.objects.create(
+            created_by=self.admin,
+            party=self.customer,
+            store=self.store,
+            trx_type='OUT',
+            amount='10.00',
+        )
+        res_changed = self.client.get(
+            MY_TRANSACTION_URL, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res_cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res_changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res_changed.data), 2)
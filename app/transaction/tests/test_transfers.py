@@ -0,0 +1,228 @@
+import random
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Product, Store, StoreProduct, Transaction, TransactionProduct,
+)
+from transaction.transfers import transfer_stock
+
+TRANSFER_URL = reverse('transaction:transaction-transfer')
+
+
+def sample_user(user_type, email):
+    return get_user_model().objects.create_user(
+        email=email, user_type=user_type, password='pass123'
+    )
+
+
+class TransferApiTest(TestCase):
+    """Test store to store stock transfers"""
+
+    def setUp(self):
+        self.admin = sample_user('Admin', 'admin@admin.com')
+        self.supplier = sample_user('Supplier', 'supplier@supplier.com')
+        self.store_a = Store.objects.create(name='Store#A', city='Cairo')
+        self.store_b = Store.objects.create(name='Store#B', city='Alex')
+        self.laptop = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price='100.00'
+        )
+        self.mouse = Product.objects.create(
+            supplier_id=self.supplier, name='Mouse', price='5.00'
+        )
+        StoreProduct.objects.create(
+            store_id=self.store_a, product_id=self.laptop, quantity=10
+        )
+        StoreProduct.objects.create(
+            store_id=self.store_a, product_id=self.mouse, quantity=20
+        )
+        StoreProduct.objects.create(
+            store_id=self.store_b, product_id=self.mouse, quantity=1
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def payload(self, lines):
+        return {
+            'created_by': self.admin.id,
+            'from_store': self.store_a.id,
+            'to_store': self.store_b.id,
+            'lines': [
+                {'product_id': product.id, 'quantity': quantity}
+                for product, quantity in lines
+            ],
+        }
+
+    def quantity(self, store, product):
+        return StoreProduct.objects.get(
+            store_id=store, product_id=product
+        ).quantity
+
+    def test_transfer_moves_stock_and_links_transactions(self):
+        """Test a transfer moves every line and records a linked OUT/IN pair"""
+        res = self.client.post(
+            TRANSFER_URL,
+            self.payload([(self.laptop, 3), (self.mouse, 5)]),
+            format='json',
+        )
+
+        trx_out = Transaction.objects.get(pk=res.data['out']['id'])
+        trx_in = Transaction.objects.get(pk=res.data['in']['id'])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.quantity(self.store_a, self.laptop), 7)
+        self.assertEqual(self.quantity(self.store_b, self.laptop), 3)
+        self.assertEqual(self.quantity(self.store_a, self.mouse), 15)
+        self.assertEqual(self.quantity(self.store_b, self.mouse), 6)
+        self.assertEqual(trx_out.counterpart, trx_in)
+        self.assertEqual(trx_in.counterpart, trx_out)
+        self.assertEqual((trx_out.trx_type, trx_in.trx_type), ('OUT', 'IN'))
+        self.assertEqual(str(trx_out.amount), '325.00')
+        self.assertEqual(TransactionProduct.objects.count(), 4)
+
+    def test_transfer_query_count_is_constant(self):
+        """Test the number of queries does not grow with the number of lines"""
+        products = [
+            Product.objects.create(
+                supplier_id=self.supplier, name=f'Product {i}', price='1.00'
+            )
+            for i in range(20)
+        ]
+        StoreProduct.objects.bulk_create(
+            StoreProduct(store_id=self.store_a, product_id=product, quantity=5)
+            for product in products
+        )
+
+        with self.assertNumQueries(17):
+            self.client.post(
+                TRANSFER_URL, self.payload([(self.laptop, 1)]), format='json'
+            )
+        with self.assertNumQueries(17):
+            self.client.post(
+                TRANSFER_URL,
+                self.payload([(product, 1) for product in products]),
+                format='json',
+            )
+
+    def test_transfer_with_not_enough_quantity_fails(self):
+        """Test a transfer with a short line changes nothing"""
+        res = self.client.post(
+            TRANSFER_URL,
+            self.payload([(self.laptop, 3), (self.mouse, 50)]),
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quantity(self.store_a, self.laptop), 10)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(
+            StoreProduct.objects.filter(
+                store_id=self.store_b, product_id=self.laptop
+            ).exists()
+        )
+
+    def test_transfer_worth_millions(self):
+        """Test a transfer worth more than a million is recorded in full"""
+        StoreProduct.objects.filter(
+            store_id=self.store_a, product_id=self.laptop
+        ).update(quantity=20000)
+
+        res = self.client.post(
+            TRANSFER_URL, self.payload([(self.laptop, 20000)]), format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Transaction.objects.get(pk=res.data['out']['id']).amount,
+            Decimal('2000000.00'),
+        )
+
+    def test_transfer_worth_more_than_a_transaction_fails(self):
+        with patch(
+            'transaction.transfers.MAX_TRANSACTION_AMOUNT', Decimal('100.00')
+        ):
+            res = self.client.post(
+                TRANSFER_URL, self.payload([(self.laptop, 2)]), format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quantity(self.store_a, self.laptop), 10)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_transfer_to_same_store_fails(self):
+        payload = self.payload([(self.laptop, 1)])
+        payload['to_store'] = self.store_a.id
+
+        res = self.client.post(TRANSFER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_transfer_created_by_other_than_admin_fails(self):
+        payload = self.payload([(self.laptop, 1)])
+        payload['created_by'] = self.supplier.id
+
+        res = self.client.post(TRANSFER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class TransferStressTest(TransactionTestCase):
+    """Test concurrent transfers in both directions"""
+
+    def test_parallel_transfers_do_not_deadlock_and_conserve_stock(self):
+        admin = sample_user('Admin', 'admin@admin.com')
+        supplier = sample_user('Supplier', 'supplier@supplier.com')
+        stores = [
+            Store.objects.create(name=f'Store#{i}', city='Cairo')
+            for i in range(3)
+        ]
+        Product.objects.bulk_create(
+            Product(supplier_id=supplier, name=f'P{i}', price='1.00')
+            for i in range(5)
+        )
+        products = list(Product.objects.all())
+        StoreProduct.objects.bulk_create(
+            StoreProduct(store_id=store, product_id=product, quantity=1000)
+            for store in stores
+            for product in products
+        )
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(15):
+                    from_store, to_store = rng.sample(stores, 2)
+                    lines = {
+                        product: rng.randint(1, 5)
+                        for product in rng.sample(products, 3)
+                    }
+                    transfer_stock(admin, from_store, to_store, lines)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(seed,)) for seed in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Transaction.objects.count(), 8 * 15 * 2)
+        for product in products:
+            stock = StoreProduct.objects.filter(product_id=product)
+            total = stock.aggregate(total=Sum('quantity'))['total']
+            self.assertEqual(total, 3000)
@@ -0,0 +1,237 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CostLayer, Product, ProductPrice, Store, StoreProduct
+
+TRANSACTION_URL = reverse('transaction:transaction-list')
+TRANSFER_URL = reverse('transaction:transaction-transfer')
+
+
+def valuation_url(store_id):
+    """Return Store valuation URL"""
+    return reverse('store:store-valuation', args=[store_id])
+
+
+def sample_user(user_type, email):
+    return get_user_model().objects.create_user(
+        email=email, user_type=user_type, password='pass123'
+    )
+
+
+class CostLayerTests(TestCase):
+    """Test FIFO and weighted-average costs maintained by the write path"""
+
+    def setUp(self):
+        self.admin = sample_user('Admin', 'admin@admin.com')
+        self.admin.is_staff = True
+        self.admin.save()
+        self.supplier = sample_user('Supplier', 'supplier@supplier.com')
+        self.customer = sample_user('Customer', 'customer@customer.com')
+        self.store_a = Store.objects.create(
+            name='Store#A', city='Cairo', cash='10000.00'
+        )
+        self.store_b = Store.objects.create(
+            name='Store#B', city='Alex', cash='10000.00'
+        )
+        self.product = Product.objects.create(
+            supplier_id=self.supplier, name='Laptop', price='10.00'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post_transaction(self, trx_type, quantity, price):
+        Product.objects.filter(pk=self.product.pk).update(price=price)
+        res = self.client.post(
+            TRANSACTION_URL,
+            {
+                'trx_type': trx_type,
+                'store': self.store_a.id,
+                'created_by': self.admin.id,
+                'party': (
+                    self.supplier.id if trx_type == 'IN' else self.customer.id
+                ),
+                'amount': str(Decimal(price) * quantity),
+                'product_id': self.product.id,
+                'quantity': quantity,
+            },
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def costs(self, store):
+        store_product = StoreProduct.objects.get(
+            store_id=store, product_id=self.product
+        )
+        return (
+            store_product.quantity,
+            store_product.average_cost,
+            store_product.fifo_value,
+        )
+
+    def receive_and_sell(self):
+        self.post_transaction('IN', 10, '10.00')
+        self.post_transaction('IN', 10, '20.00')
+        self.post_transaction('OUT', 15, '30.00')
+
+    def test_out_consumes_oldest_layers_first(self):
+        """Test OUT transactions consume FIFO layers and keep the average cost
+        """
+        self.receive_and_sell()
+
+        self.assertEqual(
+            self.costs(self.store_a),
+            (5, Decimal('15.0000'), Decimal('100.0000')),
+        )
+        self.assertEqual(
+            list(
+                CostLayer.objects.order_by('id').values_list(
+                    'unit_cost', 'remaining'
+                )
+            ),
+            [(Decimal('10.0000'), 0), (Decimal('20.0000'), 5)],
+        )
+
+    def test_transfer_carries_fifo_cost(self):
+        """Test transferred units arrive at their FIFO cost"""
+        self.receive_and_sell()
+
+        self.client.post(TRANSFER_URL, {
+            'created_by': self.admin.id,
+            'from_store': self.store_a.id,
+            'to_store': self.store_b.id,
+            'lines': [{'product_id': self.product.id, 'quantity': 3}],
+        }, format='json')
+
+        self.assertEqual(
+            self.costs(self.store_a),
+            (2, Decimal('15.0000'), Decimal('40.0000')),
+        )
+        self.assertEqual(
+            self.costs(self.store_b),
+            (3, Decimal('20.0000'), Decimal('60.0000')),
+        )
+
+    def test_valuation_report_is_one_query(self):
+        """Test a store valuation is read with one query"""
+        self.receive_and_sell()
+
+        with self.assertNumQueries(2):
+            res = self.client.get(valuation_url(self.store_a.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['average_value'], '75.00')
+        self.assertEqual(res.data['fifo_value'], '100.00')
+        self.assertEqual(res.data['products'][0]['average_cost'], '15.0000')
+
+    def test_rebuild_replays_the_ledger(self):
+        """Test rebuilding from history reproduces the maintained costs"""
+        self.receive_and_sell()
+        self.client.post(TRANSFER_URL, {
+            'created_by': self.admin.id,
+            'from_store': self.store_a.id,
+            'to_store': self.store_b.id,
+            'lines': [{'product_id': self.product.id, 'quantity': 3}],
+        }, format='json')
+        expected = [self.costs(self.store_a), self.costs(self.store_b)]
+        layers = list(
+            CostLayer.objects.order_by('id').values_list(
+                'store', 'unit_cost', 'quantity', 'remaining'
+            )
+        )
+        CostLayer.objects.all().delete()
+        StoreProduct.objects.update(average_cost=0, fifo_value=0)
+
+        call_command('rebuild_cost_layers', stdout=StringIO())
+
+        self.assertEqual(
+            [self.costs(self.store_a), self.costs(self.store_b)], expected
+        )
+        self.assertEqual(
+            list(
+                CostLayer.objects.order_by('id').values_list(
+                    'store', 'unit_cost', 'quantity', 'remaining'
+                )
+            ),
+            layers,
+        )
+
+    def test_rebuild_costs_receipts_and_counts_as_posted(self):
+        """Test receipts and count overages rebuild at their posted costs"""
+        mouse = Product.objects.create(
+            supplier_id=self.supplier, name='Mouse', price='5.00'
+        )
+        res = self.client.post(
+            reverse('purchasing:purchaseorder-list'),
+            {
+                'supplier': self.supplier.id,
+                'store': self.store_a.id,
+                'lines': [
+                    {
+                        'product': self.product.id,
+                        'quantity': 4,
+                        'unit_cost': '8.00',
+                    },
+                    {'product': mouse.id, 'quantity': 2, 'unit_cost': '3.00'},
+                ],
+            },
+            format='json',
+        )
+        res = self.client.post(
+            reverse('purchasing:purchaseorder-receive', args=[res.data['id']]),
+            {
+                'lines': [
+                    {'product_id': self.product.id, 'quantity': 4},
+                    {'product_id': mouse.id, 'quantity': 2},
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        cable = Product.objects.create(
+            supplier_id=self.supplier, name='Cable', price='2.00'
+        )
+        ProductPrice.objects.record(cable, effective_from=cable.created_at)
+        res = self.client.post(
+            reverse('stockcount:countsession-list'),
+            {
+                'store': self.store_a.id,
+                'lines': [
+                    {'product_id': self.product.id, 'counted': 6},
+                    {'product_id': cable.id, 'counted': 1},
+                ],
+            },
+            format='json',
+        )
+        res = self.client.post(
+            reverse(
+                'stockcount:countsession-post-count', args=[res.data['id']]
+            )
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        Product.objects.update(price='50.00')
+        layers = list(
+            CostLayer.objects.order_by('id').values_list(
+                'product', 'unit_cost', 'quantity', 'remaining'
+            )
+        )
+
+        call_command('rebuild_cost_layers', stdout=StringIO())
+
+        self.assertEqual(
+            list(
+                CostLayer.objects.order_by('id').values_list(
+                    'product', 'unit_cost', 'quantity', 'remaining'
+                )
+            ),
+            layers,
+        )
+        self.assertEqual(layers[-1][1:], (Decimal('2.00'), 1, 1))
+        self.assertEqual(
+            self.costs(self.store_a), (6, Decimal('8.0000'), Decimal('48.00'))
+        )
@@ -0,0 +1,152 @@
+from decimal import Decimal
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core import audit, events
+from core.versions import bump_stock_version
+from core.models import (
+    MAX_TRANSACTION_AMOUNT, Change, CostLayer, Lot, StockAlert, StoreProduct,
+    Transaction, TransactionProduct,
+)
+
+
+def available_to_promise(store_product):
+    """Return the units of a StoreProduct row that are not reserved"""
+    return (
+        store_product.quantity - store_product.reserved if store_product else 0
+    )
+
+
+@transaction.atomic
+def transfer_stock(created_by, from_store, to_store, lines):
+    """Move `lines` ({product: quantity}) between stores in one DB transaction
+
+    Store product rows are locked in (store id, product id) order so that
+    concurrent transfers in opposite directions cannot deadlock. Returns the
+    OUT and IN transactions, linked to each other through `counterpart`.
+    The destination receives the units at the FIFO cost and in the lots
+    they leave the source with.
+    """
+    products = sorted(lines, key=lambda product: product.id)
+
+    StoreProduct.objects.bulk_create(
+        [
+            StoreProduct(store_id=to_store, product_id=product, quantity=0)
+            for product in products
+        ],
+        ignore_conflicts=True,
+    )
+    rows = {
+        (row.store_id_id, row.product_id_id): row
+        for row in StoreProduct.objects.select_for_update().filter(
+            store_id__in=[from_store.id, to_store.id],
+            product_id__in=[product.id for product in products],
+        ).order_by('store_id', 'product_id')
+    }
+
+    short = []
+    for product in products:
+        row = rows.get((from_store.id, product.id))
+        if available_to_promise(row) < lines[product]:
+            short.append(product.id)
+    if short:
+        raise ValidationError(
+            {'lines': f'Not enough quantity in store for products {short}.'}
+        )
+
+    amount = sum(
+        (product.price * lines[product] for product in products), Decimal(0)
+    )
+    if amount > MAX_TRANSACTION_AMOUNT:
+        raise ValidationError({
+            'lines': (
+                'The transfer is worth more than one transaction can hold, '
+                'split it.'
+            )
+        })
+    trx_out = Transaction.objects.create(
+        created_by=created_by,
+        party=created_by,
+        store=from_store,
+        trx_type='OUT',
+        amount=amount,
+    )
+    trx_in = Transaction.objects.create(
+        created_by=created_by,
+        party=created_by,
+        store=to_store,
+        trx_type='IN',
+        amount=amount,
+        counterpart=trx_out,
+    )
+    Transaction.objects.filter(pk=trx_out.pk).update(counterpart=trx_in)
+    trx_out.counterpart = trx_in
+
+    portions = CostLayer.objects.consume_many([
+        (rows[(from_store.id, product.id)], lines[product])
+        for product in products
+    ])
+    CostLayer.objects.receive_many(
+        trx_in,
+        [
+            (rows[(to_store.id, product.id)], portions[product.id])
+            for product in products
+        ],
+    )
+    lots = Lot.objects.consume_many([
+        (rows[(from_store.id, product.id)], lines[product])
+        for product in products
+    ])
+    try:
+        Lot.objects.receive_many(
+            to_store.id,
+            [
+                (lot.product_id, lot.code, lot.expires_on, taken)
+                for product_lots in lots.values()
+                for lot, taken in product_lots
+            ],
+        )
+    except ValueError as error:
+        raise ValidationError({'lines': str(error)})
+
+    before = {key: row.quantity for key, row in rows.items()}
+    for product in products:
+        rows[(from_store.id, product.id)].quantity -= lines[product]
+        rows[(to_store.id, product.id)].quantity += lines[product]
+    StoreProduct.objects.bulk_update(
+        rows.values(), ['quantity', 'average_cost', 'fifo_value']
+    )
+
+    TransactionProduct.objects.bulk_create(
+        TransactionProduct(
+            trx_id=trx,
+            product_id=product,
+            quantity=lines[product],
+            created_at=trx.created_at,
+        )
+        for trx in (trx_out, trx_in)
+        for product in products
+    )
+
+    changes = Change.objects.bulk_create(
+        Change(
+            kind=Change.STOCK,
+            store_id=row.store_id_id,
+            product_id=row.product_id_id,
+            quantity=row.quantity,
+        )
+        for row in rows.values()
+    )
+    for product in products:
+        StockAlert.objects.record_crossing(
+            rows[(from_store.id, product.id)],
+            before[(from_store.id, product.id)],
+        )
+    audit.record(
+        audit.stock_change(row, before[key]) for key, row in rows.items()
+    )
+
+    transaction.on_commit(lambda: events.publish_stock(changes))
+    bump_stock_version(from_store.id, to_store.id)
+    return trx_out, trx_in
@@ -1,15 +1,33 @@
 #TODO: must refactor this file.
 
+import datetime
+from decimal import Decimal
+
 from django.db import IntegrityError, transaction
+from django.db.models import OuterRef
+from django.db.models.functions import Coalesce
 from django import forms
 from django.core.exceptions import SuspiciousOperation, ValidationError
-from rest_framework import viewsets
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import exceptions
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Transaction, TransactionProduct, StoreProduct, User, Store, Product
+from core import audit, events
+from core.mixins import ConditionalGetMixin, FastListModelMixin
+from core.versions import bump_stock_version
+from core.models import (
+    Transaction, TransactionProduct, StoreProduct, User, Store, Product,
+    ProductPrice, Change, StockAlert, CostLayer, Lot, Reservation,
+)
 
+from product import quotes
 from transaction import serializers
+from transaction.transfers import transfer_stock
 
 
 def validate_trx_type(value):
@@ -30,17 +48,60 @@ def validate_out_transaction_enough_quantity_in_store(quantity, store_product):
     else:
         raise SuspiciousOperation()
 
+def validate_out_transaction_available_to_promise(quantity, store_product):
+    if store_product.quantity - store_product.reserved < int(quantity):
+        raise SuspiciousOperation()
+
 def validate_trx_type_calculations(amount, store, trx_type):
     if trx_type == 'IN':
         return validate_in_transaction_enough_money_in_store(amount, store)
 
     return True
 
-def validate_transaction_calculations(amount, quantity, product, store, trx_type):
-    if float(amount) == int(quantity) * float(product.price) and validate_trx_type_calculations(float(amount), store, trx_type):
-        return True
-    else:
+def validate_quote(quote, product):
+    """Return the time to price a transaction at: its quote's or now"""
+    if not quote:
+        return timezone.now()
+    priced_at = quotes.read_quote(quote, product.id)
+    if priced_at is None:
+        raise SuspiciousOperation()
+    return priced_at
+
+def validate_transaction_calculations(
+    amount, quantity, price, store, trx_type
+):
+    if float(amount) != int(quantity) * float(price):
         return False
+    return validate_trx_type_calculations(float(amount), store, trx_type)
+
+
+def parse_created_at(param, value):
+    """Parse an ISO 8601 date or datetime parameter into an aware datetime"""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            parsed = None
+            if date:
+                parsed = datetime.datetime.combine(date, datetime.time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise exceptions.ValidationError(
+            {param: 'Must be an ISO 8601 date or datetime.'}
+        )
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def receive_cost_layer(store_product, trx, quantity, amount):
+    """Record the units of an IN transaction as a layer at amount / quantity"""
+    if int(quantity) > 0:
+        CostLayer.objects.receive(
+            store_product,
+            trx,
+            int(quantity),
+            Decimal(str(amount)) / int(quantity),
+        )
 
 
 class TransactionValidationForm(forms.Form):
@@ -51,14 +112,47 @@ class TransactionValidationForm(forms.Form):
     quantity = forms.IntegerField(min_value=0)
     amount = forms.DecimalField(min_value=0)
     trx_type = forms.CharField(validators=[validate_trx_type])
+    quote = forms.CharField(required=False)
+    lot = forms.CharField(required=False, max_length=50)
+    expires_on = forms.DateField(required=False)
+    reservation = forms.IntegerField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('expires_on') and not cleaned_data.get('lot'):
+            raise ValidationError('An expiry date needs a lot code.')
+        return cleaned_data
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(
+    ConditionalGetMixin, FastListModelMixin, viewsets.ModelViewSet
+):
 
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.order_by('created_at', 'id')
     serializer_class = serializers.TransactionSerializer
+    values_serializer_class = serializers.TransactionValuesSerializer
+    version_fields = (
+        'created_at',
+        'store__updated_at',
+        'created_by__updated_at',
+        'party__updated_at',
+    )
+
+    def filter_queryset(self, queryset):
+        """Filter on ?created_after= / ?created_before= to prune partitions"""
+        queryset = super().filter_queryset(queryset)
+        for param, lookup in (
+            ('created_after', 'created_at__gte'),
+            ('created_before', 'created_at__lt'),
+        ):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(
+                    **{lookup: parse_created_at(param, value)}
+                )
+        return queryset
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -78,8 +172,20 @@ class TransactionViewSet(viewsets.ModelViewSet):
         amount = self.request.data['amount']
         quantity = self.request.data['quantity']
 
+        # Price the transaction as quoted, so a price change does not break
+        # in-flight transactions
+        priced_at = validate_quote(data.cleaned_data['quote'], product_id)
+        prices = ProductPrice.objects.prices_at([product_id.id], priced_at)
+        price = prices[product_id.id]
+
         # Validate transaction calculations
-        if validate_transaction_calculations(amount=amount, quantity=quantity, product=product_id, store=store_id, trx_type=trx_type):
+        if validate_transaction_calculations(
+            amount=amount,
+            quantity=quantity,
+            price=price,
+            store=store_id,
+            trx_type=trx_type,
+        ):
             pass
         else:
             raise SuspiciousOperation()
@@ -100,6 +206,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
                     trx_id=trx,
                     product_id=product_id,
                     quantity=quantity,
+                    created_at=trx.created_at,
                 )
                 trx_product.save()
 
@@ -108,33 +215,166 @@ class TransactionViewSet(viewsets.ModelViewSet):
                     product_id=product_id
                 ).exists()
                 if store_products_exists:
-                    store_product = StoreProduct.objects.get(
-                    store_id=store_id,
-                    product_id=product_id
-                )
+                    # Reservations are committed before the stock row is
+                    # locked, in the same order as the sweeper
+                    reservation_id = data.cleaned_data['reservation']
+                    if trx_type == 'OUT' and reservation_id:
+                        committed = Reservation.objects.commit(
+                            reservation_id, store_id, product_id, party_id
+                        )
+                        if committed is None:
+                            raise SuspiciousOperation()
+
+                    locked = StoreProduct.objects.select_for_update()
+                    store_product = locked.get(
+                        store_id=store_id, product_id=product_id
+                    )
                     validate_out_transaction_enough_quantity_in_store(quantity=quantity, store_product=store_product)
 
+                    previous_quantity = store_product.quantity
                     if trx_type == 'IN':
+                        receive_cost_layer(
+                            store_product, trx, quantity, amount
+                        )
                         store_product.quantity += int(quantity)
+                        store_product.save()
                     else:
+                        validate_out_transaction_available_to_promise(
+                            quantity=quantity, store_product=store_product
+                        )
+                        CostLayer.objects.consume(store_product, int(quantity))
+                        Lot.objects.consume(store_product, int(quantity))
                         store_product.quantity -= int(quantity)
-
-                    store_product.save()
+                        store_product.save()
+                        StockAlert.objects.record_crossing(
+                            store_product, previous_quantity
+                        )
                 else:
                     if trx_type == 'OUT':
                         raise SuspiciousOperation()
 
                     else:
+                        previous_quantity = 0
                         store_product = StoreProduct(
                             store_id=store_id,
                             product_id=product_id,
-                            quantity=quantity,
+                            quantity=0,
                         )
+                        receive_cost_layer(
+                            store_product, trx, quantity, amount
+                        )
+                        store_product.quantity = int(quantity)
                         store_product.save()
 
+                if trx_type == 'IN' and data.cleaned_data['lot']:
+                    try:
+                        lot = (
+                            product_id.id, data.cleaned_data['lot'],
+                            data.cleaned_data['expires_on'], int(quantity),
+                        )
+                        Lot.objects.receive_many(store_id.id, [lot])
+                    except ValueError as error:
+                        raise exceptions.ValidationError(
+                            {'expires_on': str(error)}
+                        )
+
+                change = Change.objects.record_stock(store_product)
+                audit.record(
+                    [audit.stock_change(store_product, previous_quantity)]
+                )
+                bump_stock_version(change.store_id)
+                transaction.on_commit(lambda: events.publish_stock([change]))
 
         except IntegrityError:
-            print('Something Went Wrong in Transactions View atomic handler.')
+            # Nothing of it was written, e.g. a concurrent transaction created
+            # the same stock row first
+            raise exceptions.ValidationError(
+                'The transaction conflicted with a concurrent one, please '
+                'retry it.'
+            )
+
+    @action(detail=False, methods=['post'])
+    def transfer(self, request):
+        """Move stock between two stores as one linked OUT/IN pair"""
+        serializer = serializers.TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        trx_out, trx_in = transfer_stock(**serializer.validated_data)
+
+        return Response({
+            'out': serializers.TransactionSerializer(trx_out).data,
+            'in': serializers.TransactionSerializer(trx_in).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, url_path='price-audit')
+    def price_audit(self, request):
+        """Re-price the transactions in ?created_after= / ?created_before=
+
+        Every line is priced at the price in effect when it was created, in
+        one query, and compared with the recorded transaction amount.
+        """
+        if not request.query_params.get('created_after'):
+            raise exceptions.ValidationError(
+                {'created_after': 'This parameter is required.'}
+            )
+        transactions = self.filter_queryset(self.get_queryset())
+        lines = TransactionProduct.objects.filter(
+            trx_id__in=transactions.values('id')
+        )
+        for param, lookup in (
+            ('created_after', 'created_at__gte'),
+            ('created_before', 'created_at__lt'),
+        ):
+            value = request.query_params.get(param)
+            if value:
+                lines = lines.filter(
+                    **{lookup: parse_created_at(param, value)}
+                )
+        lines = (
+            lines.annotate(
+                unit_price=Coalesce(
+                    ProductPrice.objects.price_at(
+                        OuterRef('product_id'), OuterRef('created_at')
+                    ),
+                    'product_id__price',
+                ),
+            )
+            .order_by('created_at', 'trx_id', 'id')
+            .values_list(
+                'trx_id',
+                'trx_id__trx_type',
+                'trx_id__amount',
+                'created_at',
+                'product_id',
+                'quantity',
+                'unit_price',
+            )
+        )
+
+        report = {}
+        for line in lines:
+            (trx_id, trx_type, amount, created_at, product, quantity,
+             unit_price) = line
+            entry = report.get(trx_id)
+            if entry is None:
+                entry = report[trx_id] = {
+                    'id': trx_id,
+                    'trx_type': trx_type,
+                    'created_at': created_at,
+                    'amount': amount,
+                    'priced_amount': Decimal(0),
+                    'lines': [],
+                }
+            entry['priced_amount'] += unit_price * quantity
+            entry['lines'].append({
+                'product': product,
+                'quantity': quantity,
+                'unit_price': unit_price,
+            })
+        for entry in report.values():
+            entry['difference'] = entry['amount'] - entry['priced_amount']
+        return Response(
+            serializers.PriceAuditSerializer(report.values(), many=True).data
+        )
 
 
 class MyTransactionViewSet(TransactionViewSet):
@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.serializers import ValuesSerializer
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializes the user object"""
 
@@ -47,4 +49,9 @@ class AuthTokenSerializer(serializers.Serializer):
             raise serializers.ValidationError(msg, code='authentication')
 
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+class UserValuesSerializer(ValuesSerializer):
+    """Fast read-only User rows, same output as UserSerializer"""
+    model = get_user_model()
+    fields = ('id', 'email', 'user_type', 'name')